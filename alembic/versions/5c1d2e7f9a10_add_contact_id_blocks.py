@@ -0,0 +1,38 @@
+"""Add contact id blocks for sharded contacts
+
+Revision ID: 5c1d2e7f9a10
+Revises: 33b88d729d7d
+Create Date: 2026-10-19 10:12:41.502113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d2e7f9a10'
+down_revision: Union[str, Sequence[str], None] = '33b88d729d7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('contact_id_blocks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('next_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Until now every contact lives on the primary, so continue after its highest id.
+    # Shards added later are checked again by `src.sharding.rebalance`.
+    op.execute(
+        "INSERT INTO contact_id_blocks (id, next_id) "
+        "SELECT 1, COALESCE(MAX(id), 0) + 1 FROM contacts"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('contact_id_blocks')
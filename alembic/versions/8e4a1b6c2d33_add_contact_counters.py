@@ -0,0 +1,37 @@
+"""Add per-owner contact counters
+
+Revision ID: 8e4a1b6c2d33
+Revises: 5c1d2e7f9a10
+Create Date: 2026-10-19 12:40:05.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4a1b6c2d33'
+down_revision: Union[str, Sequence[str], None] = '5c1d2e7f9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('contact_counters',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('owner_id')
+    )
+    op.execute(
+        "INSERT INTO contact_counters (owner_id, count) "
+        "SELECT owner_id, COUNT(*) FROM contacts GROUP BY owner_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('contact_counters')
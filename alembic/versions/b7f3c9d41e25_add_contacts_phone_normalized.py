@@ -0,0 +1,59 @@
+"""Add normalized phone column to contacts
+
+Revision ID: b7f3c9d41e25
+Revises: 8e4a1b6c2d33
+Create Date: 2026-10-19 14:02:37.640519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.phones import to_e164
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f3c9d41e25'
+down_revision: Union[str, Sequence[str], None] = '8e4a1b6c2d33'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('phone_normalized', sa.String(length=20), nullable=True))
+    op.create_index('ix_contacts_owner_id_phone_normalized', 'contacts', ['owner_id', 'phone_normalized'], unique=False)
+
+    # Backfill in id order, BATCH_SIZE rows at a time, so large tables are never read into memory at
+    # once. All batches run in the migration's transaction: updated rows stay locked until it commits.
+    conn = op.get_bind()
+    contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('phone', sa.String), sa.column('phone_normalized', sa.String))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(contacts.c.id, contacts.c.phone)
+            .where(contacts.c.id > last_id)
+            .order_by(contacts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = [{"row_id": row.id, "value": to_e164(row.phone)} for row in rows]
+        updates = [u for u in updates if u["value"] is not None]
+        if updates:
+            conn.execute(
+                contacts.update()
+                .where(contacts.c.id == sa.bindparam("row_id"))
+                .values(phone_normalized=sa.bindparam("value")),
+                updates,
+            )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_owner_id_phone_normalized', table_name='contacts')
+    op.drop_column('contacts', 'phone_normalized')
@@ -0,0 +1,28 @@
+"""Add token version to users
+
+Revision ID: c2e8f0a7b514
+Revises: b7f3c9d41e25
+Create Date: 2026-10-19 15:21:48.903377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8f0a7b514'
+down_revision: Union[str, Sequence[str], None] = 'b7f3c9d41e25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
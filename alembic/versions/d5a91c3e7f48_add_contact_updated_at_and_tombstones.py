@@ -0,0 +1,47 @@
+"""Add contact updated_at and tombstones for delta sync
+
+Revision ID: d5a91c3e7f48
+Revises: c2e8f0a7b514
+Create Date: 2026-10-19 16:48:05.217734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a91c3e7f48'
+down_revision: Union[str, Sequence[str], None] = 'c2e8f0a7b514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _utcnow():
+    # Timestamps are naive UTC; Postgres now() is in the session time zone.
+    if op.get_context().dialect.name == 'postgresql':
+        return sa.text("timezone('utc', now())")
+    return sa.text('CURRENT_TIMESTAMP')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(), server_default=_utcnow(), nullable=False))
+    op.create_index('ix_contacts_owner_id_updated_at', 'contacts', ['owner_id', 'updated_at', 'id'], unique=False)
+    op.create_table('contact_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_tombstones_owner_id_deleted_at', 'contact_tombstones', ['owner_id', 'deleted_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contact_tombstones_owner_id_deleted_at', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
+    op.drop_index('ix_contacts_owner_id_updated_at', table_name='contacts')
+    op.drop_column('contacts', 'updated_at')
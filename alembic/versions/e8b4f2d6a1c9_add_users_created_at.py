@@ -0,0 +1,40 @@
+"""Add signup time to users
+
+Revision ID: e8b4f2d6a1c9
+Revises: d5a91c3e7f48
+Create Date: 2026-10-19 18:04:12.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b4f2d6a1c9'
+down_revision: Union[str, Sequence[str], None] = 'd5a91c3e7f48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _utcnow():
+    # Timestamps are naive UTC; Postgres now() is in the session time zone.
+    if op.get_context().dialect.name == 'postgresql':
+        return sa.text("timezone('utc', now())")
+    return sa.text('CURRENT_TIMESTAMP')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing users keep NULL: their signup time is unknown, so they are left out of the timeline.
+    op.add_column('users', sa.Column('created_at', sa.DateTime(), nullable=True))
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('created_at', server_default=_utcnow())
+    op.create_index('ix_users_created_at', 'users', ['created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_column('users', 'created_at')
@@ -0,0 +1,96 @@
+"""
+Per-call overhead of the hot crud queries: legacy ``db.query()`` vs prebuilt cached statements.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_crud_queries [--calls 5000]
+"""
+import argparse
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, or_
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models
+from src.db import Base
+
+
+def legacy_search_contacts(db, owner_id, q=None, skip=0, limit=100):
+    query = db.query(models.Contact).filter(models.Contact.owner_id == owner_id)
+    if q:
+        like = f"%{q}%"
+        query = query.filter(
+            or_(
+                models.Contact.first_name.ilike(like),
+                models.Contact.last_name.ilike(like),
+                models.Contact.email.ilike(like),
+            )
+        )
+    return query.offset(skip).limit(limit).all()
+
+
+def legacy_get_user_by_email(db, email):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
+def legacy_get_user_by_id(db, user_id):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+
+def _seed(db):
+    db.add(models.User(id=1, email="owner@example.com", hashed_password="x"))
+    db.add_all(
+        models.Contact(
+            first_name=f"First{i}", last_name=f"Last{i}", email=f"c{i}@example.com",
+            phone=str(i), birthday=date(1990, 1, 1), owner_id=1,
+        )
+        for i in range(50)
+    )
+    db.commit()
+
+
+def _per_call_us(fn, calls):
+    fn()
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    _seed(db)
+
+    cases = {
+        "search_contacts(q=None, limit=10)": (
+            lambda: legacy_search_contacts(db, 1, limit=10),
+            lambda: crud.search_contacts(db, 1, limit=10),
+        ),
+        "search_contacts(q='First1', limit=10)": (
+            lambda: legacy_search_contacts(db, 1, q="First1", limit=10),
+            lambda: crud.search_contacts(db, 1, q="First1", limit=10),
+        ),
+        "get_user_by_email": (
+            lambda: legacy_get_user_by_email(db, "owner@example.com"),
+            lambda: crud.get_user_by_email(db, "owner@example.com"),
+        ),
+        "get_user_by_id": (
+            lambda: legacy_get_user_by_id(db, 1),
+            lambda: crud.get_user_by_id(db, 1),
+        ),
+    }
+    print(f"{'query':40} {'db.query() us':>14} {'cached us':>10} {'speedup':>8}")
+    for name, (before, after) in cases.items():
+        b, a = _per_call_us(before, args.calls), _per_call_us(after, args.calls)
+        print(f"{name:40} {b:14.1f} {a:10.1f} {b / a:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
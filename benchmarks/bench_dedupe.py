@@ -0,0 +1,51 @@
+"""
+Duplicate detection throughput on a synthetic address book.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_dedupe [--contacts 100000] [--duplicate-rate 0.05]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from src import dedupe
+
+
+def _book(size, duplicate_rate, seed=1):
+    rng = random.Random(seed)
+    first = [f"first{i}" for i in range(2000)]
+    last = [f"last{i}" for i in range(5000)]
+    rows = []
+    for i in range(size):
+        if rows and rng.random() < duplicate_rate:
+            original = rng.choice(rows)
+            rows.append(SimpleNamespace(
+                id=i, first_name=original.last_name, last_name=original.first_name,
+                email=original.email.replace("@", "+dup@"), phone="0" + original.phone[-9:],
+            ))
+            continue
+        rows.append(SimpleNamespace(
+            id=i, first_name=rng.choice(first), last_name=rng.choice(last),
+            email=f"user{i}@example.com", phone=f"+380{rng.randrange(10**9):09d}",
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    for size in (args.contacts // 4, args.contacts // 2, args.contacts):
+        rows = _book(size, args.duplicate_rate)
+        start = time.perf_counter()
+        clusters = list(dedupe.find_duplicates(dedupe.candidate(r) for r in rows))
+        elapsed = time.perf_counter() - start
+        print(f"{size:>8} contacts  {len(clusters):>6} clusters  {elapsed:6.2f} s  {elapsed / size * 1e6:6.1f} us/contact")
+
+
+if __name__ == "__main__":
+    main()
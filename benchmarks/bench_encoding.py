@@ -0,0 +1,65 @@
+"""
+Payload size and encode time of contact pages as JSON, MessagePack and CBOR.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_encoding [--repeat 200]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import date
+
+from fastapi.encoders import jsonable_encoder
+
+from src import encoding, schemas
+from src.settings import Settings
+
+
+def _page(size, seed=1):
+    rng = random.Random(seed)
+    return [
+        schemas.ContactResponse(
+            id=i, first_name=f"first{rng.randrange(2000)}", last_name=f"last{rng.randrange(5000)}",
+            email=f"user{i}@example.com", phone=f"+380{rng.randrange(10**9):09d}",
+            birthday=date(1950 + rng.randrange(60), 1 + rng.randrange(12), 1 + rng.randrange(28)),
+            extra_data=None if rng.random() < 0.7 else "met at a conference",
+        )
+        for i in range(size)
+    ]
+
+
+def _encoders():
+    encoders = {"json": lambda data: json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()}
+    for name, media_type in (("msgpack", encoding.MSGPACK), ("cbor", encoding.CBOR)):
+        if media_type in encoding.ENCODERS:
+            encoders[name] = encoding.ENCODERS[media_type]
+    return encoders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument(
+        "--level", type=int, default=Settings.__fields__["GZIP_COMPRESS_LEVEL"].default,
+        help="gzip compression level, as GZIP_COMPRESS_LEVEL",
+    )
+    args = parser.parse_args()
+
+    print(f"{'contacts':>8}  {'format':<8} {'bytes':>9} {'gzip':>9} {'encode us':>10}")
+    for size in (10, 100, 1000):
+        data = jsonable_encoder(_page(size))
+        for name, encode in _encoders().items():
+            body = encode(data)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                encode(data)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            compressed = len(gzip.compress(body, compresslevel=args.level))
+            print(f"{size:>8}  {name:<8} {len(body):>9} {compressed:>9} {elapsed * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
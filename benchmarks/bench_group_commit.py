@@ -0,0 +1,109 @@
+"""
+Throughput and latency of contact creates with and without group commit.
+
+Concurrent writer threads create contacts in a temporary SQLite database,
+first committing each write on its own, then through a WriteCoalescer at
+several batch windows. Longer windows trade per-write latency for fewer
+commits; the gain grows with the cost of a commit (fsync), so measure on
+the storage that matters.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_group_commit [--writers 16] [--writes 100] [--windows 1,2,5,10]
+"""
+import argparse
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date
+
+from benchmarks.loadtest import _configure, _percentile
+
+
+def _contact():
+    from src import schemas
+
+    return schemas.ContactCreate(
+        first_name="Bench", last_name="Write", email=f"{uuid.uuid4().hex}@example.com",
+        phone="+380671234567", birthday=date(1990, 5, 17),
+    )
+
+
+def _run(write, writers, writes):
+    latencies = []
+    barrier = threading.Barrier(writers)
+
+    def writer():
+        barrier.wait()
+        for _ in range(writes):
+            start = time.perf_counter()
+            write()
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=16, help="Concurrent writer threads")
+    parser.add_argument("--writes", type=int, default=100, help="Writes per writer")
+    parser.add_argument("--windows", default="1,2,5,10", help="Comma separated batch windows in ms")
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure(f"sqlite:///{tmp}/group_commit.db")
+
+        from src import crud, models
+        from src.db import Base, SessionLocal, engine
+        from src.group_commit import WriteCoalescer
+
+        Base.metadata.create_all(engine)
+        db = SessionLocal()
+        owner = models.User(email="bench@example.com", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        owner_id = owner.id
+        db.close()
+
+        def direct():
+            session = SessionLocal()
+            try:
+                crud.create_contact(session, _contact(), owner_id=owner_id)
+            finally:
+                session.close()
+
+        configs = [("off", None)] + [(f"{window} ms", float(window)) for window in args.windows.split(",")]
+        print(f"{'window':>8} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, window in configs:
+            if window is None:
+                write, coalescer = direct, None
+            else:
+                coalescer = WriteCoalescer(SessionLocal, window / 1000, args.max_batch)
+
+                def write(coalescer=coalescer):
+                    contact = _contact()
+                    crud.contact_created(
+                        coalescer.submit(owner_id, lambda session: crud.stage_create_contact(session, contact, owner_id))
+                    )
+
+            latencies, elapsed = _run(write, args.writers, args.writes)
+            if coalescer is not None:
+                coalescer.close()
+            latencies = [latency * 1000 for latency in latencies]
+            print(
+                f"{label:>8} {len(latencies) / elapsed:>9.1f} "
+                f"{_percentile(latencies, 50):>8.2f} {_percentile(latencies, 99):>8.2f}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
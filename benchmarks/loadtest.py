@@ -0,0 +1,228 @@
+"""
+End-to-end load test of the API with throughput and latency regression gates.
+
+Boots ``src.main.app`` in-process against a temporary SQLite database and
+fakeredis, seeds users and contacts with faker, then runs a weighted mix of
+login, list, search, create and birthday requests at a fixed concurrency.
+Exits with status 1 when throughput or tail latency regress past the stored
+baseline by more than the tolerance. Baselines are machine specific; refresh
+the stored one with ``--save-baseline`` on the machine that runs the gate.
+
+Run from the repository root::
+
+    python -m benchmarks.loadtest [--duration 20] [--concurrency 16] [--save-baseline]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+BASELINE = Path(__file__).with_name("loadtest_baseline.json")
+PASSWORD = "loadtest-password"
+SCENARIOS = {"login": 5, "list": 40, "search": 20, "create": 15, "birthdays": 20}
+
+# Settings the app requires; only used when the environment does not provide them.
+ENV_DEFAULTS = {
+    "POSTGRES_USER": "loadtest", "POSTGRES_PASSWORD": "loadtest", "POSTGRES_DB": "loadtest",
+    "SECRET_KEY": "loadtest-secret", "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "CLOUDINARY_CLOUD_NAME": "loadtest", "CLOUDINARY_API_KEY": "loadtest", "CLOUDINARY_API_SECRET": "loadtest",
+    "FRONTEND_URL": "http://localhost",
+}
+
+
+def _configure(database_url):
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("SHARD_URLS", None)
+    for name, value in ENV_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+
+    import fakeredis
+    from src.utils import redis_pool
+
+    server = fakeredis.FakeServer()
+    redis_pool._redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    redis_pool._sync_redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+
+
+def _seed(users, contacts_per_user, seed):
+    from faker import Faker
+
+    from src import models
+    from src.db import Base, SessionLocal, engine
+    from src.security import get_password_hash
+
+    Base.metadata.create_all(engine)
+    fake = Faker()
+    Faker.seed(seed)
+    hashed = get_password_hash(PASSWORD)
+    today = date.today()
+    emails = []
+    db = SessionLocal()
+    try:
+        for n in range(users):
+            user = models.User(email=f"load{n}@example.com", hashed_password=hashed, is_verified=True)
+            db.add(user)
+            db.flush()
+            db.add_all(
+                models.Contact(
+                    first_name=fake.first_name(), last_name=fake.last_name(),
+                    email=f"{n}.{i}.{fake.user_name()}@example.com", phone=fake.phone_number()[:50],
+                    birthday=fake.date_of_birth() if i % 10 else today + timedelta(days=i % 7),
+                    extra_data=fake.sentence(), owner_id=user.id,
+                )
+                for i in range(contacts_per_user)
+            )
+            db.add(models.ContactCounter(owner_id=user.id, count=contacts_per_user))
+            emails.append(user.email)
+        db.commit()
+    finally:
+        db.close()
+    return emails
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+async def _login(client, email):
+    resp = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    resp.raise_for_status()
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def _request(client, scenario, email, headers, rng):
+    if scenario == "login":
+        return await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    if scenario == "list":
+        return await client.get("/contacts/", params={"limit": 50}, headers=headers)
+    if scenario == "search":
+        return await client.get("/contacts/", params={"q": rng.choice("aeiouln"), "limit": 20}, headers=headers)
+    if scenario == "create":
+        return await client.post("/contacts/", headers=headers, json={
+            "first_name": "Load", "last_name": "Test", "email": f"{uuid.uuid4().hex}@example.com",
+            "phone": "+380671234567", "birthday": "1990-05-17",
+        })
+    return await client.get("/contacts/upcoming-birthdays", headers=headers)
+
+
+async def _worker(client, emails, deadline, results, seed):
+    rng = random.Random(seed)
+    email = rng.choice(emails)
+    headers = await _login(client, email)
+    names, weights = list(SCENARIOS), list(SCENARIOS.values())
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        resp = await _request(client, scenario, email, headers, rng)
+        results[scenario].append((time.perf_counter() - start, resp.status_code < 400))
+
+
+async def run(emails, duration, concurrency, warmup):
+    from asgi_lifespan import LifespanManager
+    from httpx import AsyncClient
+
+    from src.main import app
+
+    async with LifespanManager(app, startup_timeout=60):
+        async with AsyncClient(app=app, base_url="http://loadtest", timeout=60) as client:
+            if warmup:
+                await asyncio.gather(*(
+                    _worker(client, emails, time.perf_counter() + warmup, defaultdict(list), n)
+                    for n in range(concurrency)
+                ))
+            results = defaultdict(list)
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                _worker(client, emails, start + duration, results, 1000 + n) for n in range(concurrency)
+            ))
+            elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def summarize(results, elapsed):
+    """Compute request rate, error rate and latency percentiles (in ms) overall and per scenario."""
+    def stats(samples):
+        latencies = [latency * 1000 for latency, _ in samples]
+        return {
+            "requests": len(samples),
+            "errors": sum(not ok for _, ok in samples),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+        }
+
+    everything = [sample for samples in results.values() for sample in samples]
+    summary = stats(everything)
+    summary["rps"] = round(len(everything) / elapsed, 1)
+    summary["scenarios"] = {name: stats(samples) for name, samples in sorted(results.items()) if samples}
+    return summary
+
+
+def regressions(summary, baseline, tolerance):
+    """Return a description of every metric that regressed past the baseline."""
+    failures = []
+    if summary["rps"] < baseline["rps"] * (1 - tolerance):
+        failures.append(f"rps {summary['rps']} < baseline {baseline['rps']} - {tolerance:.0%}")
+    for metric in ("p95_ms", "p99_ms"):
+        if summary[metric] > baseline[metric] * (1 + tolerance):
+            failures.append(f"{metric} {summary[metric]} > baseline {baseline[metric]} + {tolerance:.0%}")
+    if summary["errors"] > summary["requests"] * 0.01:
+        failures.append(f"{summary['errors']} of {summary['requests']} requests failed")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=20, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=200, help="Contacts seeded per user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression, as a fraction")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure(f"sqlite:///{tmp}/loadtest.db")
+        emails = _seed(args.users, args.contacts, args.seed)
+        results, elapsed = asyncio.run(run(emails, args.duration, args.concurrency, args.warmup))
+
+    summary = summarize(results, elapsed)
+    summary["config"] = {"concurrency": args.concurrency, "users": args.users, "contacts": args.contacts}
+    print(f"{'scenario':<10} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in [*summary["scenarios"].items(), ("total", summary)]:
+        print(
+            f"{name:<10} {stats['requests']:>8} {stats['errors']:>6} "
+            f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+        )
+    print(f"{summary['rps']} requests/s at concurrency {args.concurrency}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("config") != summary["config"]:
+        print(f"warning: baseline was recorded with {baseline.get('config')}")
+    failures = regressions(summary, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src import tracing
+from src.settings import settings
+
+logger = logging.getLogger("access")
+
+
+class RequestStats:
+    """Per-request values collected for the access log."""
+
+    __slots__ = ("user_id", "queries")
+
+    def __init__(self):
+        self.user_id: Optional[int] = None
+        self.queries = 0
+
+
+# The object is shared with threadpool workers through the copied context, so
+# counts made by synchronous endpoints are seen by the middleware.
+_stats: ContextVar[Optional[RequestStats]] = ContextVar("access_log_stats", default=None)
+
+
+def set_user(user_id: int) -> None:
+    """Record the authenticated user of the current request."""
+    stats = _stats.get()
+    if stats is not None:
+        stats.user_id = user_id
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _stats.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including any `extra` fields."""
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in self._RESERVED)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def start() -> None:
+    """
+    Route the access log and the application loggers through a queue.
+
+    Records are only put on an unbounded in-memory queue on the request path;
+    a background listener thread formats them as JSON and writes them to
+    stdout.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    for name, level in (("access", settings.ACCESS_LOG_LEVEL), ("src", settings.LOG_LEVEL)):
+        target = logging.getLogger(name)
+        target.handlers = [logging.handlers.QueueHandler(log_queue)]
+        target.setLevel(level.upper())
+        target.propagate = False
+
+
+def stop() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for name in ("access", "src"):
+        target = logging.getLogger(name)
+        target.handlers = []
+        target.propagate = True
+
+
+class AccessLogMiddleware:
+    """
+    Log one structured record per HTTP request.
+
+    Each record has the method, route template, path, status, latency in ms,
+    authenticated user ID, number of database queries and trace ID.
+    Successful requests are logged at INFO and sampled at
+    ACCESS_LOG_SAMPLE_RATE; client errors (WARNING), server errors (ERROR) and
+    requests slower than ACCESS_LOG_SLOW_MS are always logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not logger.isEnabledFor(logging.ERROR):
+            return await self.app(scope, receive, send)
+        rate = settings.ACCESS_LOG_SAMPLE_RATE
+        sampled = rate >= 1 or random.random() < rate
+        stats = RequestStats()
+        token = _stats.set(stats)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _stats.reset(token)
+            latency_ms = (time.perf_counter() - start) * 1000
+            code = status["code"]
+            level = logging.ERROR if code >= 500 else logging.WARNING if code >= 400 else logging.INFO
+            if latency_ms >= settings.ACCESS_LOG_SLOW_MS:
+                level = max(level, logging.WARNING)
+            if (sampled or level > logging.INFO) and logger.isEnabledFor(level):
+                route = scope.get("route")
+                logger.log(level, "%s %s %s", scope["method"], scope["path"], code, extra={
+                    "method": scope["method"],
+                    "route": getattr(route, "path", None),
+                    "path": scope["path"],
+                    "status": code,
+                    "latency_ms": round(latency_ms, 2),
+                    "user_id": stats.user_id,
+                    "db_queries": stats.queries,
+                    "trace_id": tracing.current_trace_id(),
+                })
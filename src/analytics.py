@@ -0,0 +1,145 @@
+import json
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from src import models
+from src.settings import settings
+from src.sharding import each_shard
+from src.utils.redis_pool import get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "analytics:"
+
+_CONTACTS_PER_USER = (
+    select(models.ContactCounter.count, func.count())
+    .where(models.ContactCounter.count > 0)
+    .group_by(models.ContactCounter.count)
+)
+_VERIFICATION = select(models.User.is_verified, func.count()).group_by(models.User.is_verified)
+_BIRTHDAY_MONTH = extract("month", models.Contact.birthday)
+_BIRTHDAYS_BY_MONTH = select(_BIRTHDAY_MONTH, func.count()).group_by(_BIRTHDAY_MONTH)
+_SIGNUP_DAY = func.date(models.User.created_at)
+
+
+def cached(name: str, compute: Callable[[], object]):
+    """
+    Return a report from Redis, computing and storing it on a miss.
+
+    Reports are kept for ANALYTICS_CACHE_TTL seconds, so dashboards polling
+    every few seconds share one computation.
+
+    Redis errors are logged and the report is computed from the database.
+
+    Args:
+        name (str): Cache key suffix identifying the report and its parameters.
+        compute (Callable[[], object]): Builds the JSON-serializable report.
+
+    Returns:
+        The cached or freshly computed report.
+    """
+    from redis.exceptions import RedisError
+
+    key = KEY_PREFIX + name
+    try:
+        redis = get_sync_redis()
+        hit = redis.get(key)
+        if hit is not None:
+            return json.loads(hit)
+    except RedisError as exc:
+        logger.warning("Analytics cache lookup of %s failed: %r", name, exc)
+        redis = None
+
+    report = compute()
+    if redis is not None:
+        try:
+            redis.set(key, json.dumps(report, separators=(",", ":")), ex=settings.ANALYTICS_CACHE_TTL)
+        except RedisError as exc:
+            logger.warning("Analytics cache store of %s failed: %r", name, exc)
+    return report
+
+
+def contacts_per_user(db: Session) -> List[dict]:
+    """
+    Count users by the number of contacts they own.
+
+    Reads the maintained per-owner counters, one grouped query per shard, so
+    the contacts table is not scanned. Users without contacts are omitted.
+
+    Args:
+        db (Session): SQLAlchemy session.
+
+    Returns:
+        List[dict]: {"contacts": n, "users": number of users with n contacts}, ascending by n.
+    """
+    users: Counter = Counter()
+    with each_shard(db) as shards:
+        for _ in shards:
+            users.update(dict(db.execute(_CONTACTS_PER_USER).all()))
+    return [{"contacts": contacts, "users": count} for contacts, count in sorted(users.items())]
+
+
+def signup_timeline(db: Session, days: int = 30, today: Optional[date] = None) -> List[dict]:
+    """
+    Count signups per day over the last `days` days, including days without any.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        days (int, optional): Number of days covered, ending today. Defaults to 30.
+        today (Optional[date]): Last day of the timeline. Defaults to today (UTC).
+
+    Returns:
+        List[dict]: {"date": ISO date, "signups": n}, oldest first.
+    """
+    today = today or datetime.utcnow().date()
+    first = today - timedelta(days=days - 1)
+    counts = {
+        str(day): count for day, count in db.execute(
+            select(_SIGNUP_DAY, func.count())
+            .where(models.User.created_at >= datetime.combine(first, datetime.min.time()))
+            .group_by(_SIGNUP_DAY)
+        ).all()
+    }
+    timeline = []
+    for offset in range(days):
+        day = (first + timedelta(days=offset)).isoformat()
+        timeline.append({"date": day, "signups": counts.get(day, 0)})
+    return timeline
+
+
+def verification(db: Session) -> Dict[str, float]:
+    """
+    Count verified and unverified users.
+
+    Args:
+        db (Session): SQLAlchemy session.
+
+    Returns:
+        Dict[str, float]: "verified" and "unverified" counts and the verified "ratio" (0 with no users).
+    """
+    counts = {bool(verified): count for verified, count in db.execute(_VERIFICATION).all()}
+    verified, unverified = counts.get(True, 0), counts.get(False, 0)
+    total = verified + unverified
+    return {"verified": verified, "unverified": unverified, "ratio": round(verified / total, 4) if total else 0}
+
+
+def birthdays_by_month(db: Session) -> List[dict]:
+    """
+    Count contacts by birthday month across all owners and shards.
+
+    Args:
+        db (Session): SQLAlchemy session.
+
+    Returns:
+        List[dict]: {"month": 1..12, "contacts": n} for every month.
+    """
+    months: Counter = Counter()
+    with each_shard(db) as shards:
+        for _ in shards:
+            months.update({int(month): count for month, count in db.execute(_BIRTHDAYS_BY_MONTH).all()})
+    return [{"month": month, "contacts": months[month]} for month in range(1, 13)]
@@ -1,37 +1,73 @@
-from itsdangerous import URLSafeTimedSerializer
 import os
-from src.utils.redis_pool import get_redis
-from datetime import timedelta
+from typing import Optional, Tuple
 
 SECRET = os.getenv("SECRET_KEY", "change_me")
 SALT = "password-reset-salt"
-s = URLSafeTimedSerializer(SECRET)
+_serializer = None
 
-def generate_reset_token(email: str) -> str:
+
+def get_serializer():
+    """
+    Get the singleton token serializer, importing itsdangerous on first use.
+
+    Returns:
+        URLSafeTimedSerializer: Serializer signing reset tokens with SECRET.
+    """
+    global _serializer
+    if _serializer is None:
+        from itsdangerous import URLSafeTimedSerializer
+
+        _serializer = URLSafeTimedSerializer(SECRET)
+    return _serializer
+
+
+def generate_reset_token(email: str, version: int = 0) -> str:
     """
     Generate a time-limited token for password reset.
 
     Args:
         email (str): User's email address.
+        version (int, optional): The user's current token version; resetting the
+            password bumps it, which makes the token single-use without Redis.
+            Defaults to 0.
 
     Returns:
         str: Token that can be used to verify password reset requests.
     """
-    return s.dumps(email, salt=SALT)
+    return get_serializer().dumps({"email": email, "ver": version}, salt=SALT)
 
-def verify_reset_token(token: str, max_age: int = 3600) -> str:
+
+def load_reset_token(token: str, max_age: int = 3600) -> Optional[Tuple[str, int]]:
     """
-    Verify a password reset token and extract the email.
+    Verify a password reset token and extract its email and token version.
 
     Args:
         token (str): The token generated by `generate_reset_token`.
         max_age (int, optional): Maximum age of the token in seconds. Defaults to 3600.
 
     Returns:
-        str | None: Email if the token is valid; otherwise, None.
+        Optional[Tuple[str, int]]: Email and token version if the token is valid; otherwise, None.
     """
     try:
-        email = s.loads(token, salt=SALT, max_age=max_age)
+        data = get_serializer().loads(token, salt=SALT, max_age=max_age)
     except Exception:
         return None
-    return email
+    if isinstance(data, str):
+        # Tokens issued before versions were embedded.
+        return data, 0
+    return data["email"], data["ver"]
+
+
+def verify_reset_token(token: str, max_age: int = 3600) -> str:
+    """
+    Verify a password reset token and extract the email.
+
+    Args:
+        token (str): The token generated by `generate_reset_token`.
+        max_age (int, optional): Maximum age of the token in seconds. Defaults to 3600.
+
+    Returns:
+        str | None: Email if the token is valid; otherwise, None.
+    """
+    loaded = load_reset_token(token, max_age)
+    return loaded[0] if loaded else None
@@ -0,0 +1,171 @@
+import json
+import logging
+from typing import Iterable, List
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from src import models
+from src.sharding import bind_owner
+from src.utils.redis_pool import get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+INDEX_TTL = 24 * 3600
+# Always present in a complete index; an index without it is rebuilt from the database.
+SENTINEL = ""
+# Highest UTF-8 code point, so "[prefix" .. "[prefix<MAX>" covers every term starting with prefix.
+MAX_CHAR = "\U0010ffff"
+
+
+def _key(owner_id: int) -> str:
+    return f"autocomplete:{owner_id}"
+
+
+def members(contact) -> List[str]:
+    """
+    Build the sorted set members indexing one contact.
+
+    Each member is a lowercase search term (first name, last name, full name or
+    email) followed by a NUL byte and the JSON suggestion payload, so a prefix
+    lookup needs no second round trip.
+
+    Args:
+        contact: Contact model or row with id, first_name, last_name and email.
+
+    Returns:
+        List[str]: Sorted set members for the contact.
+    """
+    payload = json.dumps(
+        [contact.id, contact.first_name, contact.last_name, contact.email], separators=(",", ":")
+    )
+    terms = {contact.first_name, contact.last_name, f"{contact.first_name} {contact.last_name}", contact.email}
+    return [f"{term.strip().lower()}\x00{payload}" for term in terms if term and term.strip()]
+
+
+def update_index(owner_id: int, removed: Iterable[str] = (), added: Iterable[str] = ()) -> None:
+    """
+    Apply a contact change to the owner's index, if the index is built.
+
+    Redis errors are logged and ignored so contact writes never fail because of
+    the index; the index TTL bounds how long a missed update can be visible.
+
+    Args:
+        owner_id (int): ID of the contact owner.
+        removed (Iterable[str]): Members of the contact before the change.
+        added (Iterable[str]): Members of the contact after the change.
+    """
+    from redis.exceptions import RedisError
+
+    removed, added = set(removed), set(added)
+    stale, fresh = removed - added, added - removed
+    if not stale and not fresh:
+        return
+    key = _key(owner_id)
+    try:
+        redis = get_sync_redis()
+        if not redis.exists(key):
+            return
+        pipe = redis.pipeline(transaction=True)
+        if stale:
+            pipe.zrem(key, *stale)
+        if fresh:
+            pipe.zadd(key, {member: 0 for member in fresh})
+        pipe.execute()
+    except RedisError as exc:
+        logger.warning("Autocomplete index update for owner %s failed: %r", owner_id, exc)
+
+
+def build_index(db: Session, owner_id: int) -> None:
+    """
+    Rebuild an owner's index from the database.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+    """
+    bind_owner(db, owner_id)
+    rows = db.execute(
+        select(models.Contact.id, models.Contact.first_name, models.Contact.last_name, models.Contact.email)
+        .where(models.Contact.owner_id == owner_id)
+    ).all()
+    mapping = {SENTINEL: 0}
+    for row in rows:
+        mapping.update((member, 0) for member in members(row))
+    key = _key(owner_id)
+    pipe = get_sync_redis().pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.zadd(key, mapping)
+    pipe.expire(key, INDEX_TTL)
+    pipe.execute()
+
+
+def _suggestions(found: Iterable[str], limit: int) -> List[dict]:
+    results, seen = [], set()
+    for member in found:
+        contact_id, first_name, last_name, email = json.loads(member.split("\x00", 1)[1])
+        if contact_id in seen:
+            continue
+        seen.add(contact_id)
+        results.append({"id": contact_id, "first_name": first_name, "last_name": last_name, "email": email})
+        if len(results) == limit:
+            break
+    return results
+
+
+def _complete_sql(db: Session, owner_id: int, prefix: str, limit: int) -> List[dict]:
+    bind_owner(db, owner_id)
+    like = f"{prefix}%"
+    rows = db.execute(
+        select(models.Contact.id, models.Contact.first_name, models.Contact.last_name, models.Contact.email)
+        .where(
+            models.Contact.owner_id == owner_id,
+            or_(
+                models.Contact.first_name.ilike(like),
+                models.Contact.last_name.ilike(like),
+                models.Contact.email.ilike(like),
+            ),
+        )
+        .order_by(models.Contact.first_name, models.Contact.last_name)
+        .limit(limit)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def complete(db: Session, owner_id: int, prefix: str, limit: int = 10) -> List[dict]:
+    """
+    Return up to `limit` contacts whose name or email starts with `prefix`.
+
+    Served from the owner's Redis sorted set with a single ZRANGEBYLEX; the set
+    is built on first use. Falls back to an SQL prefix query when Redis fails.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+        prefix (str): Typed prefix, matched case-insensitively.
+        limit (int, optional): Maximum number of suggestions. Defaults to 10.
+
+    Returns:
+        List[dict]: Suggestions with id, first_name, last_name and email, in term order.
+    """
+    from redis.exceptions import RedisError
+
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    key = _key(owner_id)
+    # One contact matches at most four terms, so this always yields `limit` distinct contacts if they exist.
+    lex_range = (f"[{prefix}", f"[{prefix}{MAX_CHAR}")
+    try:
+        redis = get_sync_redis()
+        pipe = redis.pipeline(transaction=False)
+        pipe.zscore(key, SENTINEL)
+        pipe.zrangebylex(key, *lex_range, start=0, num=limit * 4)
+        built, found = pipe.execute()
+        if built is None:
+            build_index(db, owner_id)
+            found = redis.zrangebylex(key, *lex_range, start=0, num=limit * 4)
+    except RedisError as exc:
+        logger.warning("Autocomplete index for owner %s unavailable: %r", owner_id, exc)
+        return _complete_sql(db, owner_id, prefix, limit)
+    return _suggestions(found, limit)
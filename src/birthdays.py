@@ -0,0 +1,186 @@
+import json
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src import crud, models, schemas
+from src.sharding import each_shard
+from src.utils.redis_pool import get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+# Days ahead covered by the digest; requests looking further ahead use SQL.
+DIGEST_DAYS = 7
+DIGEST_TTL = 36 * 3600
+
+
+def _key(owner_id: int) -> str:
+    return f"birthdays:{owner_id}"
+
+
+def _generation_key(owner_id: int) -> str:
+    return f"birthdays:gen:{owner_id}"
+
+
+def digest(contacts: Iterable[models.Contact], today: date, days: int) -> List[dict]:
+    """
+    Order contacts by their next birthday and serialize them.
+
+    Args:
+        contacts (Iterable[Contact]): Contacts with a birthday in the period.
+        today (date): First day of the period.
+        days (int): Number of days ahead the period covers.
+
+    Returns:
+        List[dict]: `ContactResponse` dicts with the number of days until the
+        birthday under "in_days", soonest first.
+    """
+    offsets = {((today + timedelta(days=i)).month, (today + timedelta(days=i)).day): i for i in range(days + 1)}
+    entries = []
+    for contact in contacts:
+        in_days = offsets.get((contact.birthday.month, contact.birthday.day))
+        if in_days is not None:
+            entries.append({**schemas.ContactResponse.from_orm(contact).dict(), "in_days": in_days})
+    entries.sort(key=lambda e: (e["in_days"], e["last_name"], e["first_name"], e["id"]))
+    return entries
+
+
+def _store(pipe, owner_id: int, today: date, entries: List[dict]) -> None:
+    value = json.dumps({"date": today.isoformat(), "contacts": entries}, default=str, separators=(",", ":"))
+    pipe.set(_key(owner_id), value, ex=DIGEST_TTL)
+
+
+def _store_current(redis, today: date, generations: Dict[int, Optional[str]], entries: Dict[int, List[dict]]) -> int:
+    """
+    Store digests computed from reads that started at the given generations.
+
+    Owners whose generation moved since, because a contact changed while the
+    digest was computed, are skipped so a stale digest never outlives the
+    invalidation. WATCH makes the check and the SETs atomic.
+
+    Returns:
+        int: Number of digests stored.
+    """
+    from redis.exceptions import WatchError
+
+    if not generations:
+        return 0
+    owner_ids = list(generations)
+    keys = [_generation_key(owner_id) for owner_id in owner_ids]
+    with redis.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(*keys)
+                current = pipe.mget(keys)
+                fresh = [owner_id for owner_id, value in zip(owner_ids, current) if value == generations[owner_id]]
+                pipe.multi()
+                for owner_id in fresh:
+                    _store(pipe, owner_id, today, entries[owner_id])
+                pipe.execute()
+                return len(fresh)
+            except WatchError:
+                continue
+
+
+def invalidate(owner_id: int) -> None:
+    """
+    Drop an owner's digest after one of their contacts changed.
+
+    The owner's generation is bumped too, so a digest computed before the
+    change and stored after it is discarded. Redis errors are logged and
+    ignored; the digest TTL bounds how long a missed invalidation can be visible.
+
+    Args:
+        owner_id (int): ID of the contact owner.
+    """
+    from redis.exceptions import RedisError
+
+    try:
+        pipe = get_sync_redis().pipeline(transaction=False)
+        pipe.incr(_generation_key(owner_id))
+        pipe.expire(_generation_key(owner_id), DIGEST_TTL)
+        pipe.delete(_key(owner_id))
+        pipe.execute()
+    except RedisError as exc:
+        logger.warning("Birthday digest invalidation for owner %s failed: %r", owner_id, exc)
+
+
+def upcoming(db: Session, owner_id: int, days: int = 7, today: Optional[date] = None) -> List[dict]:
+    """
+    Return an owner's contacts with a birthday in the next `days` days.
+
+    Served from today's digest in Redis. On a miss the digest is computed with
+    SQL and stored, so only the first request of the day per owner reaches the
+    database. Periods longer than DIGEST_DAYS, and Redis failures, use SQL.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+        days (int, optional): Number of days ahead to check. Defaults to 7.
+        today (Optional[date]): First day of the period. Defaults to today.
+
+    Returns:
+        List[dict]: Contacts soonest birthday first, see `digest`.
+    """
+    from redis.exceptions import RedisError
+
+    today = today or date.today()
+    if days > DIGEST_DAYS:
+        return digest(crud.get_upcoming_birthdays(db, days=days, owner_id=owner_id, today=today), today, days)
+    try:
+        redis = get_sync_redis()
+        cached, generation = redis.mget([_key(owner_id), _generation_key(owner_id)])
+        if cached is not None:
+            stored = json.loads(cached)
+            if stored["date"] == today.isoformat():
+                return [e for e in stored["contacts"] if e["in_days"] <= days]
+    except RedisError as exc:
+        logger.warning("Birthday digest lookup for owner %s failed: %r", owner_id, exc)
+        redis = None
+
+    entries = digest(crud.get_upcoming_birthdays(db, days=DIGEST_DAYS, owner_id=owner_id, today=today), today, DIGEST_DAYS)
+    if redis is not None:
+        try:
+            _store_current(redis, today, {owner_id: generation}, {owner_id: entries})
+        except RedisError as exc:
+            logger.warning("Birthday digest store for owner %s failed: %r", owner_id, exc)
+    return [e for e in entries if e["in_days"] <= days]
+
+
+def build_digests(db: Session, today: Optional[date] = None) -> int:
+    """
+    Precompute the digest of every owner with contacts.
+
+    Runs one birthday query per shard for all owners and writes the digests
+    in one transaction per shard, so the first request of the day is served
+    from Redis. Owners whose contacts changed during the query are skipped.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        today (Optional[date]): First day of the period. Defaults to today.
+
+    Returns:
+        int: Number of digests written.
+    """
+    today = today or date.today()
+    written = 0
+    redis = get_sync_redis()
+    with each_shard(db) as shards:
+        for _ in shards:
+            owner_ids = db.execute(
+                select(models.ContactCounter.owner_id).where(models.ContactCounter.count > 0)
+            ).scalars().all()
+            if not owner_ids:
+                continue
+            generations = dict(zip(owner_ids, redis.mget([_generation_key(owner_id) for owner_id in owner_ids])))
+            by_owner: Dict[int, List[models.Contact]] = {owner_id: [] for owner_id in owner_ids}
+            # The session is pinned to this shard, so only its contacts are searched.
+            for contact in crud.get_upcoming_birthdays(db, days=DIGEST_DAYS, today=today):
+                if contact.owner_id in by_owner:
+                    by_owner[contact.owner_id].append(contact)
+            entries = {owner_id: digest(contacts, today, DIGEST_DAYS) for owner_id, contacts in by_owner.items()}
+            written += _store_current(redis, today, generations, entries)
+    return written
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import re
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+from src.utils.redis_pool import get_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "contacts:changes:"
+STREAM_PREFIX = "contacts:events:"
+# Events kept per owner for clients reconnecting with Last-Event-ID.
+STREAM_MAXLEN = 1000
+STREAM_TTL = 7 * 24 * 3600
+HEARTBEAT_INTERVAL = 15
+QUEUE_SIZE = 100
+RETRY_MS = 5000
+
+_EVENT_ID = re.compile(r"^\d+-\d+$")
+
+Event = Tuple[str, str, str]
+
+
+def _channel(owner_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{owner_id}"
+
+
+def _stream(owner_id: int) -> str:
+    return f"{STREAM_PREFIX}{owner_id}"
+
+
+def _id_key(event_id: str) -> Tuple[int, int]:
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq)
+
+
+def publish(owner_id: int, event: str, data: dict) -> Optional[str]:
+    """
+    Record a contact change and notify the owner's open streams.
+
+    The event is appended to the owner's capped Redis stream, which is what
+    reconnecting clients replay from, and then published on the owner's
+    channel. Redis errors are logged and ignored so contact writes never fail
+    because of the feed.
+
+    Args:
+        owner_id (int): ID of the contact owner.
+        event (str): Event name: "created", "updated" or "deleted".
+        data (dict): JSON-serializable event payload.
+
+    Returns:
+        Optional[str]: Stream id of the event, or None if it was not recorded.
+    """
+    from redis.exceptions import RedisError
+
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    try:
+        redis = get_sync_redis()
+        event_id = redis.xadd(
+            _stream(owner_id), {"event": event, "data": payload}, maxlen=STREAM_MAXLEN, approximate=True
+        )
+        pipe = redis.pipeline(transaction=False)
+        pipe.expire(_stream(owner_id), STREAM_TTL)
+        pipe.publish(_channel(owner_id), json.dumps([event_id, event, payload]))
+        pipe.execute()
+        return event_id
+    except RedisError as exc:
+        logger.warning("Change feed publish for owner %s failed: %r", owner_id, exc)
+        return None
+
+
+class ChangeFeed:
+    """
+    Fans contact changes out to the SSE streams open in this worker.
+
+    A worker holds a single pattern subscription for all owners, started with
+    the first stream, instead of one Redis connection per client. Each stream
+    only costs a bounded queue; a stream whose client falls behind is closed
+    and the client catches up from the Redis stream when it reconnects.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, owner_id: int) -> asyncio.Queue:
+        """
+        Register a stream for an owner's changes.
+
+        Args:
+            owner_id (int): ID of the contact owner.
+
+        Returns:
+            asyncio.Queue: Queue receiving `(event_id, event, data)` tuples, or
+            None when the stream has to be closed.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[owner_id].add(queue)
+        return queue
+
+    def unsubscribe(self, owner_id: int, queue: asyncio.Queue) -> None:
+        """Remove a stream registered with `subscribe`."""
+        queues = self._subscribers.get(owner_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[owner_id]
+
+    def _close(self, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def _dispatch(self, message: dict) -> None:
+        owner_id = int(message["channel"][len(CHANNEL_PREFIX):])
+        event = tuple(json.loads(message["data"]))
+        for queue in list(self._subscribers.get(owner_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.unsubscribe(owner_id, queue)
+                self._close(queue)
+
+    def _close_all(self) -> None:
+        for owner_id, queues in list(self._subscribers.items()):
+            for queue in list(queues):
+                self.unsubscribe(owner_id, queue)
+                self._close(queue)
+
+    async def _listen(self) -> None:
+        backoff = 1
+        subscribed_before = False
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub()
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                if subscribed_before:
+                    # Changes published while disconnected were missed; make clients replay them.
+                    self._close_all()
+                subscribed_before = True
+                backoff = 1
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Change feed listener disconnected: %r", exc)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    async def close(self) -> None:
+        """Stop the listener and close every open stream."""
+        self._close_all()
+        task, self._task = self._task, None
+        # A cancellation arriving while the subscription is being set up can be
+        # swallowed by the Redis client, so keep cancelling until the task ends.
+        while task is not None and not task.done():
+            task.cancel()
+            await asyncio.wait({task}, timeout=0.1)
+
+
+feed = ChangeFeed()
+
+
+def format_event(event_id: str, event: str, data: str) -> str:
+    """Format one change as a Server-Sent Events message."""
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+async def replay(owner_id: int, last_event_id: str) -> AsyncIterator[Event]:
+    """
+    Yield the recorded changes of an owner made after a given event.
+
+    Args:
+        owner_id (int): ID of the contact owner.
+        last_event_id (str): Id of the last event the client received.
+
+    Yields:
+        Event: `(event_id, event, data)` tuples in order.
+    """
+    start = f"({last_event_id}"
+    while True:
+        entries = await get_redis().xrange(_stream(owner_id), min=start, max="+", count=100)
+        for event_id, fields in entries:
+            yield event_id, fields["event"], fields["data"]
+        if len(entries) < 100:
+            return
+        start = f"({entries[-1][0]}"
+
+
+async def stream(owner_id: int, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Produce the Server-Sent Events stream of an owner's contact changes.
+
+    The stream subscribes before replaying, so no change is lost between the
+    replay and the live events; duplicates are skipped by event id. A comment
+    line is sent every HEARTBEAT_INTERVAL seconds to keep proxies from closing
+    idle connections.
+
+    Args:
+        owner_id (int): ID of the contact owner.
+        last_event_id (Optional[str]): Value of the `Last-Event-ID` header, if any.
+
+    Yields:
+        str: SSE messages.
+    """
+    queue = feed.subscribe(owner_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        last = (0, 0)
+        if last_event_id and _EVENT_ID.match(last_event_id):
+            last = _id_key(last_event_id)
+            async for event_id, event, data in replay(owner_id, last_event_id):
+                last = _id_key(event_id)
+                yield format_event(event_id, event, data)
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            event_id, event, data = item
+            if _id_key(event_id) <= last:
+                continue
+            last = _id_key(event_id)
+            yield format_event(event_id, event, data)
+    finally:
+        feed.unsubscribe(owner_id, queue)
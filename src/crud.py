@@ -1,10 +1,54 @@
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, extract, and_
-from datetime import date, timedelta
+from sqlalchemy import or_, extract, and_, bindparam, func, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime, timedelta
 from fastapi import HTTPException
-from . import models, schemas
+from . import autocomplete, birthdays, changefeed, models, schemas
+from .singleflight import shared
+from .phones import to_e164
 from .security import get_password_hash, verify_password
+from .sharding import bind_owner, each_shard
+
+# Hot statements are built once at import. Executing the same statement object lets
+# SQLAlchemy reuse its memoized cache key and compiled SQL, so a call only binds parameters.
+_CONTACTS_BY_OWNER = (
+    select(models.Contact)
+    .where(models.Contact.owner_id == bindparam("owner_id"))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+_CONTACTS_BY_OWNER_AND_QUERY = (
+    select(models.Contact)
+    .where(
+        models.Contact.owner_id == bindparam("owner_id"),
+        or_(
+            models.Contact.first_name.ilike(bindparam("like")),
+            models.Contact.last_name.ilike(bindparam("like")),
+            models.Contact.email.ilike(bindparam("like")),
+        ),
+    )
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+_CONTACTS_BY_PHONE = select(models.Contact).where(
+    models.Contact.owner_id == bindparam("owner_id"),
+    models.Contact.phone_normalized == bindparam("phone"),
+)
+_CONTACT_BY_ID = select(models.Contact).where(
+    models.Contact.id == bindparam("contact_id"),
+    models.Contact.owner_id == bindparam("owner_id"),
+)
+_CONTACT_COUNT = select(models.ContactCounter.count).where(models.ContactCounter.owner_id == bindparam("owner_id"))
+_USER_BY_EMAIL = select(models.User).where(models.User.email == bindparam("email")).limit(1)
+_USER_BY_ID = select(models.User).where(models.User.id == bindparam("user_id")).limit(1)
+
+
+@lru_cache(maxsize=512)
+def _project(statement, fields: Tuple[str, ...]):
+    """Return a copy of a contact statement selecting only some columns, built once per field set."""
+    return statement.with_only_columns(*(getattr(models.Contact, name) for name in fields))
 
 
 def create_contact(db: Session, contact_in: schemas.ContactCreate, owner_id) -> models.Contact:
@@ -19,14 +63,42 @@ def create_contact(db: Session, contact_in: schemas.ContactCreate, owner_id) ->
     Returns:
         Contact: Created contact model instance.
     """
-    db_obj = models.Contact(**contact_in.dict(), owner_id=owner_id)
-    db.add(db_obj)
+    db_obj = stage_create_contact(db, contact_in, owner_id)
     db.commit()
     db.refresh(db_obj)
+    return contact_created(db_obj)
+
+
+def stage_create_contact(db: Session, contact_in: schemas.ContactCreate, owner_id: int) -> models.Contact:
+    """
+    Add a contact and bump its owner's counter without committing.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        contact_in (ContactCreate): Pydantic schema with contact data.
+        owner_id (int): ID of the user who owns the contact.
+
+    Returns:
+        Contact: The pending contact; pass it to `contact_created` after the commit.
+    """
+    bind_owner(db, owner_id)
+    db_obj = models.Contact(**contact_in.dict(), owner_id=owner_id, phone_normalized=to_e164(contact_in.phone))
+    db.add(db_obj)
+    adjust_contact_count(db, owner_id, 1)
+    return db_obj
+
+
+def contact_created(db_obj: models.Contact) -> models.Contact:
+    """Update the search index, birthday digest and change feed after a committed create."""
+    autocomplete.update_index(db_obj.owner_id, added=autocomplete.members(db_obj))
+    birthdays.invalidate(db_obj.owner_id)
+    changefeed.publish(db_obj.owner_id, "created", schemas.ContactResponse.from_orm(db_obj).dict())
     return db_obj
 
 
-def get_contact(db: Session, contact_id: int, owner_id: int) -> Optional[models.Contact]:
+def get_contact(
+    db: Session, contact_id: int, owner_id: int, fields: Optional[Tuple[str, ...]] = None
+) -> Optional[models.Contact]:
     """
     Retrieve a contact by its ID and owner.
 
@@ -34,47 +106,87 @@ def get_contact(db: Session, contact_id: int, owner_id: int) -> Optional[models.
         db (Session): SQLAlchemy session.
         contact_id (int): ID of the contact to retrieve.
         owner_id (int): ID of the contact owner.
+        fields (Tuple[str, ...], optional): Only select these columns and return a row
+            instead of a model. Defaults to None, which loads the whole contact.
 
     Returns:
-        Optional[Contact]: Contact if found, else None.
+        Optional[Contact]: Contact (or row) if found, else None.
     """
+    bind_owner(db, owner_id)
+    if fields:
+        return db.execute(
+            _project(_CONTACT_BY_ID, fields), {"contact_id": contact_id, "owner_id": owner_id}
+        ).first()
     obj = db.get(models.Contact, contact_id)
     if not obj or obj.owner_id != owner_id:
         return None
     return obj
 
 
+@shared
 def search_contacts(
     db: Session,
     owner_id: int,
     q: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[Tuple[str, ...]] = None,
 ) -> List[models.Contact]:
     """
     Search contacts for a user optionally by a query string.
 
+    Concurrent identical searches share one query.
+
     Args:
         db (Session): SQLAlchemy session.
         owner_id (int): ID of the contact owner.
         q (str, optional): Search query (first name, last name, email). Defaults to None.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 100.
+        fields (Tuple[str, ...], optional): Only select these columns and return rows
+            instead of models. Defaults to None, which loads whole contacts.
 
     Returns:
-        List[Contact]: List of contacts matching criteria.
+        List[Contact]: List of contacts (or rows) matching criteria.
     """
-    query = db.query(models.Contact).filter(models.Contact.owner_id == owner_id)
+    bind_owner(db, owner_id)
+    params = {"owner_id": owner_id, "skip": skip, "limit": limit}
+    statement = _CONTACTS_BY_OWNER
     if q:
-        like = f"%{q}%"
-        query = query.filter(
-            or_(
-                models.Contact.first_name.ilike(like),
-                models.Contact.last_name.ilike(like),
-                models.Contact.email.ilike(like),
-            )
-        )
-    return query.offset(skip).limit(limit).all()
+        params["like"] = f"%{q}%"
+        statement = _CONTACTS_BY_OWNER_AND_QUERY
+    if fields:
+        return db.execute(_project(statement, fields), params).all()
+    return db.execute(statement, params).scalars().all()
+
+
+def get_contacts_by_phone(
+    db: Session, phone: str, owner_id: int, fields: Optional[Tuple[str, ...]] = None
+) -> List[models.Contact]:
+    """
+    Find an owner's contacts with a given phone number.
+
+    The number is normalized to E.164 and looked up through the
+    (owner_id, phone_normalized) index.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        phone (str): Phone number in any format.
+        owner_id (int): ID of the contact owner.
+        fields (Tuple[str, ...], optional): Only select these columns and return rows
+            instead of models. Defaults to None, which loads whole contacts.
+
+    Returns:
+        List[Contact]: Matching contacts (or rows), empty if the number cannot be parsed.
+    """
+    normalized = to_e164(phone)
+    if normalized is None:
+        return []
+    bind_owner(db, owner_id)
+    params = {"owner_id": owner_id, "phone": normalized}
+    if fields:
+        return db.execute(_project(_CONTACTS_BY_PHONE, fields), params).all()
+    return db.execute(_CONTACTS_BY_PHONE, params).scalars().all()
 
 
 def update_contact(db: Session, contact_id: int, contact_in: schemas.ContactUpdate, owner_id: int) -> Optional[models.Contact]:
@@ -90,20 +202,55 @@ def update_contact(db: Session, contact_id: int, contact_in: schemas.ContactUpda
     Returns:
         Optional[Contact]: Updated contact if successful, else None.
     """
+    staged = stage_update_contact(db, contact_id, contact_in, owner_id)
+    if staged is None:
+        return None
+    db.commit()
+    db.refresh(staged[0])
+    return contact_updated(staged)
+
+
+def stage_update_contact(
+    db: Session, contact_id: int, contact_in: schemas.ContactUpdate, owner_id: int
+) -> Optional[Tuple[models.Contact, List[str]]]:
+    """
+    Apply changes to an owner's contact without committing.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        contact_id (int): ID of the contact to update.
+        contact_in (ContactUpdate): Pydantic schema with updated fields.
+        owner_id (int): ID of the contact owner.
+
+    Returns:
+        Optional[Tuple[Contact, List[str]]]: The contact and its previous autocomplete
+        entries, to pass to `contact_updated` after the commit; None if not found.
+    """
+    bind_owner(db, owner_id)
     db_obj = db.get(models.Contact, contact_id)
     if not db_obj or db_obj.owner_id != owner_id:
         return None
+    indexed = autocomplete.members(db_obj)
     for key, value in contact_in.dict(exclude_unset=True).items():
         setattr(db_obj, key, value)
+        if key == "phone":
+            db_obj.phone_normalized = to_e164(value)
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    return db_obj, indexed
+
+
+def contact_updated(staged: Tuple[models.Contact, List[str]]) -> models.Contact:
+    """Update the search index, birthday digest and change feed after a committed update."""
+    db_obj, indexed = staged
+    autocomplete.update_index(db_obj.owner_id, removed=indexed, added=autocomplete.members(db_obj))
+    birthdays.invalidate(db_obj.owner_id)
+    changefeed.publish(db_obj.owner_id, "updated", schemas.ContactResponse.from_orm(db_obj).dict())
     return db_obj
 
 
 def delete_contact(db: Session, contact_id: int, owner_id: int) -> bool:
     """
-    Delete a contact by ID.
+    Delete a contact by ID, leaving a tombstone for delta sync.
 
     Args:
         db (Session): SQLAlchemy session.
@@ -113,32 +260,164 @@ def delete_contact(db: Session, contact_id: int, owner_id: int) -> bool:
     Returns:
         bool: True if deleted, False if not found or not owned by user.
     """
+    bind_owner(db, owner_id)
     db_obj = db.get(models.Contact, contact_id)
     if not db_obj or db_obj.owner_id != owner_id:
         return False
+    indexed = autocomplete.members(db_obj)
     db.delete(db_obj)
+    # merge, not add: SQLite may hand a deleted contact's id out again.
+    db.merge(models.ContactTombstone(id=contact_id, owner_id=owner_id, deleted_at=datetime.utcnow()))
+    adjust_contact_count(db, owner_id, -1)
     db.commit()
+    autocomplete.update_index(owner_id, removed=indexed)
+    birthdays.invalidate(owner_id)
+    changefeed.publish(owner_id, "deleted", {"id": contact_id})
     return True
 
 
-def get_upcoming_birthdays(db: Session, days: int = 7) -> List[models.Contact]:
+def adjust_contact_count(db: Session, owner_id: int, delta: int) -> None:
+    """
+    Change an owner's contact counter inside the caller's transaction.
+
+    Call it next to every insert or delete of contacts, before the commit. A
+    missing counter row is initialised from the owner's current rows, in a
+    savepoint so that losing the race to another transaction creating it
+    only falls back to updating that row instead of failing the write.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+        delta (int): Number of contacts added (positive) or removed (negative).
+    """
+    bind_owner(db, owner_id)
+    result = db.execute(
+        update(models.ContactCounter)
+        .where(models.ContactCounter.owner_id == owner_id)
+        .values(count=models.ContactCounter.count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.flush()
+        total = db.execute(
+            select(func.count(models.Contact.id)).where(models.Contact.owner_id == owner_id)
+        ).scalar_one()
+        try:
+            with db.begin_nested():
+                db.add(models.ContactCounter(owner_id=owner_id, count=total))
+        except IntegrityError:
+            # The other transaction counted its own rows; add ours to its counter.
+            db.execute(
+                update(models.ContactCounter)
+                .where(models.ContactCounter.owner_id == owner_id)
+                .values(count=models.ContactCounter.count + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def count_contacts(db: Session, owner_id: int, q: Optional[str] = None, cap: int = 1000) -> Tuple[int, bool]:
+    """
+    Count an owner's contacts, optionally matching a search query.
+
+    Without a query the maintained counter is read. With a query at most `cap`
+    matching rows are counted, so the cost stays bounded for large address books.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+        q (str, optional): Search query (first name, last name, email). Defaults to None.
+        cap (int, optional): Maximum number of matches to count. Defaults to 1000.
+
+    Returns:
+        Tuple[int, bool]: The count and whether it is exact (False when capped).
+    """
+    bind_owner(db, owner_id)
+    if not q:
+        return db.execute(_CONTACT_COUNT, {"owner_id": owner_id}).scalar() or 0, True
+    like = f"%{q}%"
+    matches = (
+        select(models.Contact.id)
+        .where(
+            models.Contact.owner_id == owner_id,
+            or_(
+                models.Contact.first_name.ilike(like),
+                models.Contact.last_name.ilike(like),
+                models.Contact.email.ilike(like),
+            ),
+        )
+        .limit(cap + 1)
+        .subquery()
+    )
+    total = db.execute(select(func.count()).select_from(matches)).scalar_one()
+    return min(total, cap), total <= cap
+
+
+def reconcile_contact_counts(db: Session) -> Dict[int, Tuple[int, int]]:
+    """
+    Recompute every contact counter from the contacts table and fix drift.
+
+    Args:
+        db (Session): SQLAlchemy session.
+
+    Returns:
+        Dict[int, Tuple[int, int]]: Owner ID mapped to (stored, actual) for each corrected counter.
+    """
+    fixed = {}
+    with each_shard(db) as shards:
+        for _ in shards:
+            actual = dict(
+                db.execute(
+                    select(models.Contact.owner_id, func.count(models.Contact.id)).group_by(models.Contact.owner_id)
+                ).all()
+            )
+            counters = {c.owner_id: c for c in db.execute(select(models.ContactCounter)).scalars()}
+            for owner_id in set(actual) | set(counters):
+                expected = actual.get(owner_id, 0)
+                counter = counters.get(owner_id)
+                if counter is None:
+                    db.add(models.ContactCounter(owner_id=owner_id, count=expected))
+                    fixed[owner_id] = (0, expected)
+                elif counter.count != expected:
+                    fixed[owner_id] = (counter.count, expected)
+                    counter.count = expected
+            db.commit()
+    return fixed
+
+
+def get_upcoming_birthdays(
+    db: Session, days: int = 7, owner_id: Optional[int] = None, today: Optional[date] = None
+) -> List[models.Contact]:
     """
     Retrieve contacts with birthdays in the upcoming days.
 
     Args:
         db (Session): SQLAlchemy session.
         days (int, optional): Number of days ahead to check. Defaults to 7.
+        owner_id (int, optional): Only return contacts of this owner. Defaults to None,
+            which searches all owners: on the shard the session is pinned to by
+            `each_shard`, otherwise on every shard when sharding is enabled.
+        today (date, optional): First day of the period. Defaults to today.
 
     Returns:
         List[Contact]: Contacts with birthdays in the given period.
     """
-    today = date.today()
+    today = today or date.today()
     dates = [( (today + timedelta(days=i)).month, (today + timedelta(days=i)).day ) for i in range(days + 1)]
     
     conds = [and_(extract('month', models.Contact.birthday) == m, extract('day', models.Contact.birthday) == d)
              for m, d in dates]
-    query = db.query(models.Contact).filter(or_(*conds))
-    return query.all()
+    if owner_id is not None:
+        bind_owner(db, owner_id)
+        query = db.query(models.Contact).filter(models.Contact.owner_id == owner_id, or_(*conds))
+        return query.all()
+    if db.info.get("shard") is not None:
+        return db.query(models.Contact).filter(or_(*conds)).all()
+
+    results = []
+    with each_shard(db) as shards:
+        for _ in shards:
+            results.extend(db.query(models.Contact).filter(or_(*conds)).all())
+    return results
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
@@ -152,13 +431,16 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     Returns:
         Optional[User]: User if found, else None.
     """
-    return db.query(models.User).filter(models.User.email == email).first()
+    return db.execute(_USER_BY_EMAIL, {"email": email}).scalars().first()
 
 
+@shared
 def get_user_by_id(db: Session, user_id: int) -> Optional[models.User]:
     """
     Retrieve a user by ID.
 
+    Concurrent lookups of the same user share one query.
+
     Args:
         db (Session): SQLAlchemy session.
         user_id (int): User ID.
@@ -166,7 +448,7 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[models.User]:
     Returns:
         Optional[User]: User if found, else None.
     """
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.execute(_USER_BY_ID, {"user_id": user_id}).scalars().first()
 
 
 def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
@@ -232,6 +514,41 @@ def set_user_verified(db: Session, user: models.User):
     return user
 
 
+def bump_token_version(db: Session, user: models.User) -> int:
+    """
+    Invalidate all tokens issued to a user so far.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        user (User): User model.
+
+    Returns:
+        int: The user's new token version.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user.token_version
+
+
+def set_user_role(db: Session, user: models.User, role: str) -> models.User:
+    """
+    Change a user's role and invalidate the tokens carrying the old one.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        user (User): User model.
+        role (str): New role, e.g. 'user' or 'admin'.
+
+    Returns:
+        User: Updated user model.
+    """
+    user.role = role
+    bump_token_version(db, user)
+    return user
+
+
 def update_user_avatar(db: Session, user: models.User, avatar_url: str):
     """
     Update the user's avatar URL.
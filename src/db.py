@@ -1,19 +1,63 @@
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
+from src.settings import settings
+from src.sharding import IdAllocator, ShardMap, ShardRoutingSession, assign_ids, parse_shard_urls
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 
 
 engine = create_engine(DATABASE_URL, future=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+
+
+@lru_cache()
+def get_shard_map() -> Optional[ShardMap]:
+    """
+    Build the shard map from SHARD_URLS once, on first use.
+
+    Returns:
+        Optional[ShardMap]: Shard map, or None when sharding is disabled.
+    """
+    return ShardMap(parse_shard_urls(settings.SHARD_URLS)) if settings.SHARD_URLS else None
+
+
+@lru_cache()
+def _get_id_allocator() -> IdAllocator:
+    return IdAllocator(shards=get_shard_map().engines.values())
+
+
+class _SessionFactory(sessionmaker):
+    """Session factory that reads the shard map when the first session is created, not on import."""
+
+    def __call__(self, **local_kw):
+        self.kw.setdefault("info", {}).setdefault("shard_map", get_shard_map())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _SessionFactory(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    future=True,
+    class_=ShardRoutingSession,
+)
 Base = declarative_base()
 
 
+@event.listens_for(SessionLocal, "before_flush")
+def _assign_contact_ids(session, flush_context, instances):
+    if session.info.get("shard_map") is not None:
+        assign_ids(session, _get_id_allocator())
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,219 @@
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src import models
+from src.sharding import bind_owner
+
+EMAIL_WEIGHT = 0.4
+PHONE_WEIGHT = 0.35
+NAME_WEIGHT = 0.25
+
+
+class Candidate(NamedTuple):
+    """Normalized contact fields used for duplicate detection."""
+    id: int
+    name: frozenset
+    email: str
+    phone: str
+
+
+def normalize_name(first_name: str, last_name: str) -> frozenset:
+    """
+    Normalize a contact name into a set of lowercase tokens without accents.
+
+    Args:
+        first_name (str): Contact's first name.
+        last_name (str): Contact's last name.
+
+    Returns:
+        frozenset: Name tokens, order-insensitive so swapped names still match.
+    """
+    text = unicodedata.normalize("NFKD", f"{first_name} {last_name}".lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return frozenset(re.findall(r"\w+", text))
+
+
+def normalize_email(email: str) -> str:
+    """
+    Normalize an email address: lowercase and without a "+tag" suffix.
+
+    Args:
+        email (str): Email address.
+
+    Returns:
+        str: Normalized email address.
+    """
+    local, _, domain = email.strip().lower().partition("@")
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Normalize a phone number to its last nine digits.
+
+    Comparing the subscriber part ignores country codes and trunk prefixes, so
+    "+380 67 123 4567" and "067-123-45-67" match.
+
+    Args:
+        phone (str): Free-form phone number.
+
+    Returns:
+        str: Last nine digits, or "" when the number is too short to compare.
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-9:] if len(digits) >= 7 else ""
+
+
+def candidate(row) -> Candidate:
+    """
+    Build a `Candidate` from a contact model or row.
+
+    Args:
+        row: Object with id, first_name, last_name, email and phone.
+
+    Returns:
+        Candidate: Normalized contact fields.
+    """
+    return Candidate(
+        row.id, normalize_name(row.first_name, row.last_name), normalize_email(row.email), normalize_phone(row.phone)
+    )
+
+
+def blocking_keys(c: Candidate) -> List[str]:
+    """
+    Return the blocks a contact belongs to; only contacts sharing a block are compared.
+
+    Args:
+        c (Candidate): Normalized contact.
+
+    Returns:
+        List[str]: Blocking keys for the email, phone and name.
+    """
+    keys = [f"e:{c.email}"]
+    if c.phone:
+        keys.append(f"p:{c.phone}")
+    if c.name:
+        keys.append("n:" + " ".join(sorted(c.name)))
+    return keys
+
+
+def score(a: Candidate, b: Candidate) -> float:
+    """
+    Score how likely two contacts are the same person.
+
+    Args:
+        a (Candidate): First contact.
+        b (Candidate): Second contact.
+
+    Returns:
+        float: Weighted similarity between 0 and 1.
+    """
+    name = len(a.name & b.name) / len(a.name | b.name) if a.name and b.name else 0.0
+    return (
+        EMAIL_WEIGHT * (a.email == b.email)
+        + PHONE_WEIGHT * (bool(a.phone) and a.phone == b.phone)
+        + NAME_WEIGHT * name
+    )
+
+
+def _find(parent: Dict[int, int], x: int) -> int:
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def find_duplicates(
+    candidates: Iterable[Candidate], threshold: float = 0.6, window: int = 50
+) -> Iterator[dict]:
+    """
+    Group likely duplicate contacts into clusters.
+
+    Contacts are only compared within a block. Blocks larger than `window` are
+    compared with a sliding window instead of all pairs, so the work is
+    O(n * window) in the worst case and close to O(n) for real address books.
+
+    Blocks can only be formed once every candidate has been read, but each
+    cluster is yielded as soon as all blocks of its members have been compared,
+    so clusters stream out while the remaining blocks are still being scored.
+
+    Args:
+        candidates (Iterable[Candidate]): Normalized contacts of one owner.
+        threshold (float, optional): Minimum pair score to link two contacts. Defaults to 0.6.
+        window (int, optional): Comparison window inside large blocks. Defaults to 50.
+
+    Yields:
+        dict: Cluster with "contact_ids" and the linking "pairs" as [id_a, id_b, score].
+    """
+    by_id: Dict[int, Candidate] = {}
+    blocks: Dict[str, List[int]] = defaultdict(list)
+    # Blocks not compared yet per cluster root; a cluster is complete at zero.
+    pending: Dict[int, int] = {}
+    for c in candidates:
+        by_id[c.id] = c
+        keys = blocking_keys(c)
+        pending[c.id] = len(keys)
+        for key in keys:
+            blocks[key].append(c.id)
+
+    parent: Dict[int, int] = {}
+    clusters: Dict[int, dict] = {}
+    seen: Set[Tuple[int, int]] = set()
+    for ids in blocks.values():
+        ids.sort()
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:i + 1 + window]:
+                if (a, b) in seen:
+                    continue
+                seen.add((a, b))
+                pair_score = score(by_id[a], by_id[b])
+                if pair_score < threshold:
+                    continue
+                root_a, root_b = _find(parent, parent.setdefault(a, a)), _find(parent, parent.setdefault(b, b))
+                cluster = clusters.setdefault(root_a, {"contact_ids": set(), "pairs": []})
+                if root_a != root_b:
+                    parent[root_b] = root_a
+                    pending[root_a] += pending.pop(root_b)
+                    merged = clusters.pop(root_b, None)
+                    if merged is not None:
+                        cluster["contact_ids"] |= merged["contact_ids"]
+                        cluster["pairs"] += merged["pairs"]
+                cluster["contact_ids"].update((a, b))
+                cluster["pairs"].append([a, b, round(pair_score, 3)])
+
+        for a in ids:
+            root = _find(parent, a) if a in parent else a
+            pending[root] -= 1
+            if pending[root] == 0 and root in clusters:
+                cluster = clusters.pop(root)
+                yield {"contact_ids": sorted(cluster["contact_ids"]), "pairs": cluster["pairs"]}
+
+
+def owner_candidates(db: Session, owner_id: int, batch_size: int = 1000) -> Iterator[Candidate]:
+    """
+    Stream an owner's contacts as candidates, loading only the compared columns.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+        batch_size (int, optional): Rows fetched per round trip. Defaults to 1000.
+
+    Yields:
+        Candidate: Normalized contact.
+    """
+    bind_owner(db, owner_id)
+    result = db.execute(
+        select(
+            models.Contact.id, models.Contact.first_name, models.Contact.last_name,
+            models.Contact.email, models.Contact.phone,
+        )
+        .where(models.Contact.owner_id == owner_id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in result:
+        yield candidate(row)
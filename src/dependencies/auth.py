@@ -1,15 +1,38 @@
 import json
+import logging
+import random
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from src.db import get_db
 from src import crud
+from src.security import decode_access_token
+from src.revocation import revocations, token_versions
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.local_cache import LocalCache
 from src.settings import settings
-from src.utils.redis_pool import get_redis
+from src.utils.redis_pool import get_redis, get_redis_breaker
+from src.sharding import bind_owner
+from src import access_log
+
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+USER_CACHE_TTL = 3600
+# Serves users while Redis is unavailable; short-lived because it is never invalidated.
+_local_users = LocalCache(maxsize=10000, ttl=30)
+# During the last seconds of a cached user's TTL, requests refresh it early with a
+# probability growing to 1, so a hot entry is renewed by a few requests instead of
+# expiring under all of them at once.
+EARLY_REFRESH_WINDOW = 60
+
+
+def _refresh_early(ttl: int) -> bool:
+    return 0 <= ttl < EARLY_REFRESH_WINDOW and random.random() * EARLY_REFRESH_WINDOW >= ttl
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -17,44 +40,96 @@ async def get_current_user(
     """
     Get the current authenticated user based on JWT token.
 
-    This function decodes the JWT token, retrieves the user from cache (Redis)
-    or database, and returns a dictionary representing the user.
+    This function decodes the JWT token and rejects revoked or outdated tokens.
+    If the token carries embedded authorization claims they are returned
+    directly; otherwise the user is retrieved from cache (Redis) or database.
+    Entries close to expiry are refreshed early by a few requests, and
+    concurrent database lookups of the same user share one query. Redis calls,
+    including the revocation check, time out after REDIS_CALL_TIMEOUT and go
+    through the Redis circuit breaker; while Redis is unavailable users come
+    from the database and a short-lived in-process cache.
 
     Args:
         token (str): JWT token from the request Authorization header.
         db (Session): SQLAlchemy database session.
 
     Raises:
-        HTTPException: If the token is invalid (401) or user not found (404).
+        HTTPException: If the token is invalid or revoked (401) or user not found (404).
 
     Returns:
         dict: User information including id, email, role, and avatar URL.
     """
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token)
         user_id: int = int(payload.get("sub"))
-    except JWTError:
+    except (ValueError, TypeError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    redis = get_redis()
+    jti = payload.get("jti")
+    if jti and await revocations.is_revoked_async(jti):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    if not token_versions.is_current(user_id, payload.get("ver", 0)):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    access_log.set_user(user_id)
+
+    if "role" in payload:
+        # Claims embedded at login (JWT_EMBED_CLAIMS) authorize the request without Redis or the database.
+        return {
+            "id": user_id,
+            "email": payload.get("email"),
+            "role": payload["role"],
+            "is_verified": payload.get("is_verified", False),
+            "is_active": payload.get("is_active", True),
+            "avatar": None,
+        }
+
+    from redis.exceptions import RedisError
+
+    bind_owner(db, user_id)
     cache_key = f"user:{user_id}"
-    cached = await redis.get(cache_key)
-    if cached:
-        return json.loads(cached)
+    redis_up = True
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.get(cache_key)
+        pipe.ttl(cache_key)
+        cached, ttl = await get_redis_breaker().call(pipe.execute, timeout=settings.REDIS_CALL_TIMEOUT)
+        if cached and not _refresh_early(ttl):
+            return json.loads(cached)
+    except (CircuitOpenError, RedisError, TimeoutError) as exc:
+        redis_up = False
+        if not isinstance(exc, CircuitOpenError):
+            logger.warning("User cache lookup failed, using the database: %r", exc)
+        cached = _local_users.get(user_id)
+        if cached is not None:
+            return cached
 
-    user = crud.get_user_by_id(db, user_id)
+    # Off the event loop; concurrent lookups of the same user in this worker share one query.
+    user = await run_in_threadpool(crud.get_user_by_id, db, user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    # The row is authoritative even when the version broadcast was missed.
+    token_versions.update(user.id, user.token_version or 0)
+    if payload.get("ver", 0) < (user.token_version or 0):
+        raise HTTPException(status_code=401, detail="Token revoked")
 
     user_dict = {
         "id": user.id,
         "email": user.email,
         "role": getattr(user, "role", "user"),
+        "is_verified": bool(user.is_verified),
+        "is_active": bool(user.is_active),
         "avatar": getattr(user, "avatar", None)
     }
 
-    await redis.set(cache_key, json.dumps(user_dict), ex=3600)
+    if not redis_up:
+        _local_users.set(user_id, user_dict)
+        return user_dict
+    try:
+        await get_redis_breaker().call(
+            lambda: get_redis().set(cache_key, json.dumps(user_dict), ex=USER_CACHE_TTL),
+            timeout=settings.REDIS_CALL_TIMEOUT,
+        )
+    except (CircuitOpenError, RedisError, TimeoutError) as exc:
+        logger.warning("User cache store failed: %r", exc)
     return user_dict
@@ -1,10 +1,12 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 from src.db import get_db
 from src import models
-from src.settings import settings
+from src.security import decode_access_token
+from src.revocation import revocations, token_versions
+from src.sharding import bind_owner
+from src import access_log
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -18,7 +20,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         db (Session): Database session.
 
     Raises:
-        HTTPException: 401 Unauthorized if token is invalid or user not found.
+        HTTPException: 401 Unauthorized if token is invalid, revoked or user not found.
 
     Returns:
         models.User: Authenticated user object from the database.
@@ -30,15 +32,27 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise credentials_exception
         user_id = int(user_id)
-    except (JWTError, ValueError):
+    except ValueError:
         raise credentials_exception
 
+    jti = payload.get("jti")
+    if jti and revocations.is_revoked(jti):
+        raise credentials_exception
+    if not token_versions.is_current(user_id, payload.get("ver", 0)):
+        raise credentials_exception
+    access_log.set_user(user_id)
+
     user = db.get(models.User, user_id)
     if user is None:
         raise credentials_exception
+    # The row is authoritative even when the version broadcast was missed.
+    token_versions.update(user.id, user.token_version or 0)
+    if payload.get("ver", 0) < (user.token_version or 0):
+        raise credentials_exception
+    bind_owner(db, user.id)
     return user
@@ -0,0 +1,120 @@
+import importlib.util
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.middleware.gzip import GZipMiddleware as _GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.settings import settings
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+
+def _encode_msgpack(content: Any) -> bytes:
+    import msgpack
+
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def _encode_cbor(content: Any) -> bytes:
+    import cbor2
+
+    return cbor2.dumps(content)
+
+
+def _available() -> Dict[str, Callable[[Any], bytes]]:
+    encoders = {}
+    if importlib.util.find_spec("msgpack") is not None:
+        encoders[MSGPACK] = _encode_msgpack
+    if importlib.util.find_spec("cbor2") is not None:
+        encoders[CBOR] = _encode_cbor
+    return encoders
+
+
+ENCODERS = _available()
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    ranges = []
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            ranges.append((_ALIASES.get(media_type.lower(), media_type.lower()), quality))
+    return ranges
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the response media type for an `Accept` header.
+
+    Args:
+        accept (Optional[str]): Value of the request's `Accept` header.
+
+    Returns:
+        str: The supported type with the highest quality, the first listed on
+        ties. MessagePack and CBOR are only offered when their encoder is
+        installed; anything else, including wildcards, gets JSON.
+    """
+    best, best_quality = JSON, 0.0
+    for media_type, quality in _parse_accept(accept or ""):
+        if quality > best_quality and (media_type in ENCODERS or media_type == JSON):
+            best, best_quality = media_type, quality
+    return best
+
+
+def render(
+    request: Request, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """
+    Build a response in the format negotiated from the request's `Accept` header.
+
+    The content is reduced with `jsonable_encoder` first, so every format
+    carries the same shape as the JSON response (dates as ISO strings).
+
+    Args:
+        request (Request): Incoming request.
+        content (Any): Pydantic models, lists or dicts to send.
+        status_code (int, optional): HTTP status code. Defaults to 200.
+        headers (Optional[Mapping[str, str]]): Extra response headers.
+
+    Returns:
+        Response: JSON, MessagePack or CBOR response with `Vary: Accept`.
+    """
+    headers = {**(headers or {}), "Vary": "Accept"}
+    data = jsonable_encoder(content)
+    media_type = negotiate(request.headers.get("accept"))
+    if media_type == JSON:
+        return JSONResponse(data, status_code=status_code, headers=headers)
+    return Response(ENCODERS[media_type](data), status_code=status_code, headers=headers, media_type=media_type)
+
+
+# OpenAPI description of the alternative formats, for the `responses` argument of negotiated routes.
+BINARY_RESPONSES = {
+    200: {"content": {MSGPACK: {}, CBOR: {}}, "description": "Also available as MessagePack or CBOR via Accept"}
+}
+
+
+class GZipMiddleware(_GZipMiddleware):
+    """
+    GZip middleware configured from GZIP_MINIMUM_SIZE and GZIP_COMPRESS_LEVEL.
+
+    The settings are read when the middleware stack is built on the first
+    request, not when the app is created, so importing the app does not load them.
+    """
+
+    def __init__(self, app):
+        super().__init__(app, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=settings.GZIP_COMPRESS_LEVEL)
@@ -0,0 +1,233 @@
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from src import crud, models, schemas
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("owner_id", "stage", "context", "future")
+
+    def __init__(self, owner_id: int, stage: Callable[[Session], Any]):
+        self.owner_id = owner_id
+        self.stage = stage
+        self.context = contextvars.copy_context()
+        self.future: Future = Future()
+
+
+class WriteCoalescer:
+    """
+    Commit concurrent writes together to pay for one transaction instead of one per write.
+
+    Callers hand in a staging function and block until it is committed. A
+    background thread waits up to `window` seconds for more writes (at most
+    `max_batch`), runs each in its own savepoint of one session per shard and
+    commits them together. A write that fails is rolled back to its savepoint
+    and only its caller gets the error; if the commit itself fails, every
+    caller in that batch gets it. A dead background thread (e.g. in a forked
+    worker) is restarted, and a write not picked up within `timeout` seconds
+    is committed on its own by its caller.
+    """
+
+    def __init__(
+        self, session_factory: Callable[..., Session], window: float, max_batch: int, timeout: float = 5.0
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue: "queue.SimpleQueue[Optional[_Job]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, owner_id: int, stage: Callable[[Session], Any]) -> Any:
+        """
+        Stage a write in the next batch and wait for it to be committed.
+
+        Args:
+            owner_id (int): Owner whose shard the write goes to.
+            stage (Callable[[Session], Any]): Adds the changes to the session without committing.
+
+        Returns:
+            Any: What `stage` returned, loaded and detached after the commit.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="write-coalescer", daemon=True)
+                    self._thread.start()
+        job = _Job(owner_id, stage)
+        self._queue.put(job)
+        try:
+            return job.future.result(timeout=self.window + self.timeout)
+        except FutureTimeoutError:
+            if not job.future.cancel():
+                # Already being committed by the background thread.
+                return job.future.result()
+        logger.warning("Write coalescer did not pick up a write in %.1fs, committing it directly", self.timeout)
+        job = _Job(owner_id, stage)
+        self._commit(None, [job])
+        return job.future.result()
+
+    def close(self) -> None:
+        """Commit queued writes and stop the background thread."""
+        with self._lock:
+            if self._thread is not None:
+                if self._thread.is_alive():
+                    self._queue.put(None)
+                    self._thread.join()
+                self._thread = None
+
+    def _collect(self, first: _Job) -> List[_Job]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            # Sessions do not connect until used, so this only reads the factory's shard map.
+            probe = self.session_factory()
+            shard_map = probe.info.get("shard_map")
+            probe.close()
+            groups: Dict[Optional[str], List[_Job]] = {}
+            for job in batch:
+                shard = shard_map.shard_for(job.owner_id) if shard_map is not None else None
+                groups.setdefault(shard, []).append(job)
+            for shard, jobs in groups.items():
+                self._commit(shard, jobs)
+
+    def _commit(self, shard: Optional[str], jobs: List[_Job]) -> None:
+        db = self.session_factory(expire_on_commit=False)
+        if shard is not None:
+            db.info["shard"] = shard
+        staged = []
+        try:
+            for job in jobs:
+                if not job.future.set_running_or_notify_cancel():
+                    # Its caller gave up waiting and commits it directly.
+                    continue
+                savepoint = db.begin_nested()
+                try:
+                    # Run in the caller's context so access logs and traces attribute the queries to it.
+                    value = job.context.run(job.stage, db)
+                    db.flush()
+                    savepoint.commit()
+                except Exception as exc:
+                    savepoint.rollback()
+                    job.future.set_exception(exc)
+                else:
+                    staged.append((job, value))
+            db.commit()
+        except Exception as exc:
+            logger.warning("Group commit of %d write(s) failed: %r", len(staged), exc)
+            db.rollback()
+            for job, _ in staged:
+                job.future.set_exception(exc)
+            return
+        finally:
+            db.close()
+        for job, value in staged:
+            job.future.set_result(value)
+
+
+_coalescer: Optional[WriteCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer() -> Optional[WriteCoalescer]:
+    """
+    Get the process wide coalescer, or None when WRITE_COALESCE_WINDOW_MS is 0.
+
+    Returns:
+        Optional[WriteCoalescer]: Singleton coalescer writing through `SessionLocal`.
+    """
+    global _coalescer
+    if _coalescer is None and settings.WRITE_COALESCE_WINDOW_MS > 0:
+        with _coalescer_lock:
+            if _coalescer is None:
+                from src.db import SessionLocal
+
+                _coalescer = WriteCoalescer(
+                    SessionLocal,
+                    settings.WRITE_COALESCE_WINDOW_MS / 1000,
+                    settings.WRITE_COALESCE_MAX_BATCH,
+                    settings.WRITE_COALESCE_TIMEOUT,
+                )
+    return _coalescer
+
+
+def close() -> None:
+    """Flush and stop the coalescer, if one was started."""
+    global _coalescer
+    if _coalescer is not None:
+        _coalescer.close()
+        _coalescer = None
+
+
+def create_contact(db: Session, contact_in: schemas.ContactCreate, owner_id: int) -> models.Contact:
+    """
+    Create a contact, in a shared transaction when write coalescing is enabled.
+
+    Args:
+        db (Session): Request session, used when coalescing is disabled.
+        contact_in (ContactCreate): Pydantic schema with contact data.
+        owner_id (int): ID of the user who owns the contact.
+
+    Returns:
+        Contact: Created contact.
+    """
+    coalescer = get_coalescer()
+    if coalescer is None:
+        return crud.create_contact(db, contact_in, owner_id=owner_id)
+    return crud.contact_created(
+        coalescer.submit(owner_id, lambda session: crud.stage_create_contact(session, contact_in, owner_id))
+    )
+
+
+def update_contact(
+    db: Session, contact_id: int, contact_in: schemas.ContactUpdate, owner_id: int
+) -> Optional[models.Contact]:
+    """
+    Update a contact, in a shared transaction when write coalescing is enabled.
+
+    Args:
+        db (Session): Request session, used when coalescing is disabled.
+        contact_id (int): ID of the contact to update.
+        contact_in (ContactUpdate): Pydantic schema with updated fields.
+        owner_id (int): ID of the contact owner.
+
+    Returns:
+        Optional[Contact]: Updated contact, None if not found.
+    """
+    coalescer = get_coalescer()
+    if coalescer is None:
+        return crud.update_contact(db, contact_id, contact_in, owner_id=owner_id)
+    staged = coalescer.submit(
+        owner_id, lambda session: crud.stage_update_contact(session, contact_id, contact_in, owner_id)
+    )
+    return crud.contact_updated(staged) if staged is not None else None
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Tuple
+from uuid import uuid4
+
+from src.settings import settings
+from src.utils.redis_pool import get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+KEY_PREFIX = "idempotency:"
+POLL_INTERVAL = 0.05
+
+
+class IdempotencyError(ValueError):
+    """An idempotency key cannot be used for this request."""
+
+
+class RequestInProgress(IdempotencyError):
+    """Another request with the same key has not finished in time."""
+
+
+class KeyReused(IdempotencyError):
+    """The key was already used for a request with a different body."""
+
+
+def fingerprint(payload: Any) -> str:
+    """
+    Hash a request body so retries can be told apart from key reuse.
+
+    Args:
+        payload (Any): JSON-serializable request body.
+
+    Returns:
+        str: Hex SHA-256 of the canonical JSON encoding.
+    """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _replay(stored: str, request_fingerprint: str) -> Any:
+    entry = json.loads(stored)
+    if entry["fingerprint"] != request_fingerprint:
+        raise KeyReused("Idempotency-Key was already used with a different request body")
+    return entry["response"]
+
+
+def _if_owner(redis, lock_key: str, token: str, update: Callable[[Any, bool], None]) -> bool:
+    """Run `update(pipe, owned)` in a transaction that fails if the lock changes hands meanwhile."""
+    from redis.exceptions import WatchError
+
+    with redis.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(lock_key)
+                owned = pipe.get(lock_key) == token
+                pipe.multi()
+                update(pipe, owned)
+                pipe.execute()
+                return owned
+            except WatchError:
+                continue
+
+
+def _release(redis, lock_key: str, token: str) -> None:
+    _if_owner(redis, lock_key, token, lambda pipe, owned: owned and pipe.delete(lock_key))
+
+
+class _LockKeeper(threading.Thread):
+    """Extend a held lock until stopped, so a slow action does not lose it to a retry."""
+
+    def __init__(self, redis, lock_key: str, token: str):
+        super().__init__(name="idempotency-lock", daemon=True)
+        self.redis = redis
+        self.lock_key = lock_key
+        self.token = token
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        from redis.exceptions import RedisError
+
+        while not self.stopped.wait(settings.IDEMPOTENCY_LOCK_TTL / 3):
+            try:
+                extend = lambda pipe, owned: owned and pipe.expire(self.lock_key, settings.IDEMPOTENCY_LOCK_TTL)
+                if not _if_owner(self.redis, self.lock_key, self.token, extend):
+                    logger.warning("Idempotency lock %s was lost while its request ran", self.lock_key)
+                    return
+            except RedisError as exc:
+                logger.warning("Idempotency lock extension of %s failed: %r", self.lock_key, exc)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def execute(scope: str, key: str, request_fingerprint: str, action: Callable[[], Any]) -> Tuple[Any, bool]:
+    """
+    Run `action` once per idempotency key and replay its result for retries.
+
+    The first request takes a lock and runs the action; its result is
+    stored for IDEMPOTENCY_TTL seconds. Retries, including concurrent ones that
+    wait for the lock holder, get the stored result without running the
+    action. The lock carries a token unique to its holder, is extended while
+    the action runs and only released by its holder. A failed action stores
+    nothing, so it can be retried. When Redis is unavailable the action runs
+    without idempotency protection.
+
+    Args:
+        scope (str): Namespace of the key, e.g. the user and endpoint.
+        key (str): Client supplied idempotency key.
+        request_fingerprint (str): `fingerprint` of the request body.
+        action (Callable[[], Any]): Produces the JSON-serializable response.
+
+    Raises:
+        KeyReused: If the key was used for a different request body.
+        RequestInProgress: If the request holding the key did not finish within IDEMPOTENCY_WAIT_TIMEOUT.
+
+    Returns:
+        Tuple[Any, bool]: The response and whether it was replayed.
+    """
+    from redis.exceptions import RedisError
+
+    result_key = f"{KEY_PREFIX}{scope}:{key}"
+    lock_key = result_key + ":lock"
+    token = uuid4().hex
+    try:
+        redis = get_sync_redis()
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            stored = redis.get(result_key)
+            if stored is not None:
+                return _replay(stored, request_fingerprint), True
+            if redis.set(lock_key, token, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL):
+                break
+            if time.monotonic() >= deadline:
+                raise RequestInProgress("A request with this Idempotency-Key is still being processed")
+            time.sleep(POLL_INTERVAL)
+        # The holder may have finished between the lookup and taking the lock.
+        stored = redis.get(result_key)
+        if stored is not None:
+            _release(redis, lock_key, token)
+            return _replay(stored, request_fingerprint), True
+    except RedisError as exc:
+        logger.warning("Idempotency lookup of %s failed, running without it: %r", result_key, exc)
+        return action(), False
+
+    keeper = _LockKeeper(redis, lock_key, token)
+    keeper.start()
+    try:
+        response = action()
+    except BaseException:
+        keeper.stop()
+        try:
+            _release(redis, lock_key, token)
+        except RedisError as exc:
+            logger.warning("Idempotency lock release of %s failed: %r", result_key, exc)
+        raise
+    keeper.stop()
+    value = json.dumps({"fingerprint": request_fingerprint, "response": response})
+
+    def store(pipe, owned: bool) -> None:
+        pipe.set(result_key, value, ex=settings.IDEMPOTENCY_TTL)
+        if owned:
+            pipe.delete(lock_key)
+
+    try:
+        _if_owner(redis, lock_key, token, store)
+    except RedisError as exc:
+        logger.warning("Idempotency store of %s failed: %r", result_key, exc)
+    return response, False
@@ -1,8 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.routes import contacts, auth, users  # абсолютні імпорти!
+from src.routes import contacts, auth, users, health, admin  # абсолютні імпорти!
+from src import access_log, changefeed, encoding, group_commit, profiling, revocation, tracing
+from src.warmup import warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up connection pools, bcrypt and hot queries before reporting ready,
+    and keep the token revocation filter in sync while the app runs.
+    Logs and traces are written by background threads; open change streams
+    are closed and queued writes and records flushed on shutdown.
+    """
+    access_log.start()
+    tracing.start()
+    app.state.ready = False
+    revocation_listener = asyncio.create_task(revocation.listen())
+    version_refresher = asyncio.create_task(revocation.refresh_token_versions())
+    app.state.warmup_checks = await warm_up()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await changefeed.feed.close()
+    group_commit.close()
+    for task in (revocation_listener, version_refresher):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    tracing.stop()
+    access_log.stop()
+
 
-app = FastAPI(title="Contacts API")
+app = FastAPI(title="Contacts API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,8 +43,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Exact", "X-Trace-Id", "traceparent", "Idempotent-Replayed"],
 )
+app.add_middleware(encoding.GZipMiddleware)
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(access_log.AccessLogMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
 
+app.include_router(health.router)
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(contacts.router)
+app.include_router(admin.router)
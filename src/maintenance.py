@@ -0,0 +1,77 @@
+import argparse
+import json
+from datetime import timedelta
+from typing import List, Optional
+
+from src import birthdays, crud, dedupe, sync
+from src.db import SessionLocal
+from src.settings import settings
+
+
+def reconcile_counts(args: argparse.Namespace) -> None:
+    """Recompute per-owner contact counters and report the corrected ones."""
+    db = SessionLocal()
+    try:
+        fixed = crud.reconcile_contact_counts(db)
+    finally:
+        db.close()
+    for owner_id, (stored, actual) in sorted(fixed.items()):
+        print(f"owner {owner_id}: {stored} -> {actual}")
+    print(f"{len(fixed)} counter(s) fixed")
+
+
+def find_duplicates(args: argparse.Namespace) -> None:
+    """Print duplicate contact clusters of one owner as newline-delimited JSON."""
+    db = SessionLocal()
+    try:
+        for cluster in dedupe.find_duplicates(dedupe.owner_candidates(db, args.owner), threshold=args.threshold):
+            print(json.dumps(cluster), flush=True)
+    finally:
+        db.close()
+
+
+def purge_tombstones(args: argparse.Namespace) -> None:
+    """Delete tombstones of contacts deleted longer ago than the retention period."""
+    db = SessionLocal()
+    try:
+        purged = sync.purge_tombstones(db, timedelta(days=args.days))
+    finally:
+        db.close()
+    print(f"{purged} tombstone(s) purged")
+
+
+def build_birthday_digests(args: argparse.Namespace) -> None:
+    """Precompute today's upcoming-birthday digest of every owner into Redis."""
+    db = SessionLocal()
+    try:
+        written = birthdays.build_digests(db)
+    finally:
+        db.close()
+    print(f"{written} digest(s) written")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point for maintenance tasks."""
+    parser = argparse.ArgumentParser(description="Contacts API maintenance tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reconcile-counts", help="Fix drift in per-owner contact counters").set_defaults(
+        handler=reconcile_counts
+    )
+    duplicates = commands.add_parser("find-duplicates", help="Print clusters of likely duplicate contacts")
+    duplicates.add_argument("--owner", type=int, required=True, help="ID of the contact owner")
+    duplicates.add_argument("--threshold", type=float, default=0.6, help="Minimum pair score")
+    duplicates.set_defaults(handler=find_duplicates)
+    purge = commands.add_parser("purge-tombstones", help="Delete expired delta sync tombstones")
+    purge.add_argument(
+        "--days", type=int, default=settings.TOMBSTONE_RETENTION_DAYS, help="Retention period in days"
+    )
+    purge.set_defaults(handler=purge_tombstones)
+    commands.add_parser(
+        "build-birthday-digests", help="Precompute upcoming birthdays; run daily shortly after midnight"
+    ).set_defaults(handler=build_birthday_digests)
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,30 @@
-from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey, Boolean, Index
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.expression import FunctionElement
 from .db import Base
 
 
+class utcnow(FunctionElement):
+    """Current UTC time as a naive timestamp, for server defaults that must match `datetime.utcnow`."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    # now() is in the session time zone.
+    return "timezone('utc', now())"
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC.
+    return "CURRENT_TIMESTAMP"
+
+
 class User(Base):
     """
     Represents a user in the system.
@@ -16,6 +38,8 @@ class User(Base):
         full_name (str): Full name of the user.
         avatar_url (str): URL of the user's avatar image.
         role (str): Role of the user, e.g., 'user' or 'admin'. Default 'user'.
+        token_version (int): Incremented to invalidate all previously issued tokens. Default 0.
+        created_at (datetime): UTC signup time, None for users created before it was recorded.
         contacts (List[Contact]): List of contacts owned by the user.
     """
     __tablename__ = "users"
@@ -28,6 +52,8 @@ class User(Base):
     full_name = Column(String(200), nullable=True)
     avatar_url = Column(String(500), nullable=True)
     role: str = Column(String, default="user")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, nullable=True, index=True, default=datetime.utcnow, server_default=utcnow())
 
     contacts = relationship("Contact", back_populates="owner")
 
@@ -42,20 +68,76 @@ class Contact(Base):
         last_name (str): Last name of the contact.
         email (str): Email of the contact.
         phone (str): Phone number.
+        phone_normalized (str): Phone number in E.164 format, None if it cannot be parsed.
         birthday (date): Birthday of the contact.
         extra_data (str): Additional optional information.
+        updated_at (datetime): UTC time of the last change, used by delta sync.
         owner_id (int): Foreign key to the User who owns this contact.
         owner (User): Relationship to the owner user.
     """
     __tablename__ = "contacts"
+    __table_args__ = (
+        Index("ix_contacts_owner_id_phone_normalized", "owner_id", "phone_normalized"),
+        Index("ix_contacts_owner_id_updated_at", "owner_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     phone = Column(String(50), unique=False, nullable=False)
+    phone_normalized = Column(String(20), nullable=True)
     birthday = Column(Date, nullable=False)
     extra_data = Column(Text, nullable=True)
+    updated_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=utcnow()
+    )
 
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     owner = relationship("User", back_populates="contacts")
+
+
+class ContactIdBlock(Base):
+    """
+    Counter on the primary database used to reserve contact id blocks
+    when contacts are sharded across several databases.
+
+    Attributes:
+        id (int): Primary key, always 1.
+        next_id (int): First contact id that has not been reserved yet.
+    """
+    __tablename__ = "contact_id_blocks"
+
+    id = Column(Integer, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+
+class ContactCounter(Base):
+    """
+    Number of contacts owned by a user, maintained by the contact crud functions.
+
+    Attributes:
+        owner_id (int): Primary key and foreign key to the owning User.
+        count (int): Number of contacts the owner has.
+    """
+    __tablename__ = "contact_counters"
+
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ContactTombstone(Base):
+    """
+    Marker left behind by a deleted contact so delta sync can report the deletion.
+
+    Attributes:
+        id (int): ID of the deleted contact.
+        owner_id (int): ID of the user who owned the contact.
+        deleted_at (datetime): UTC time of the deletion.
+    """
+    __tablename__ = "contact_tombstones"
+    __table_args__ = (Index("ix_contact_tombstones_owner_id_deleted_at", "owner_id", "deleted_at", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from src.settings import settings
+
+
+def to_e164(phone: Optional[str], region: Optional[str] = None) -> Optional[str]:
+    """
+    Normalize a free-form phone number to E.164.
+
+    Numbers without a country code are read as numbers of `region`.
+
+    Args:
+        phone (str, optional): Phone number as entered by the user.
+        region (str, optional): ISO 3166 region used for national numbers.
+            Defaults to the DEFAULT_PHONE_REGION setting.
+
+    Returns:
+        Optional[str]: Number such as "+380671234567", or None if it cannot be parsed.
+    """
+    if not phone:
+        return None
+    import phonenumbers
+
+    region = region or settings.DEFAULT_PHONE_REGION
+
+    try:
+        number = phonenumbers.parse(phone, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_possible_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
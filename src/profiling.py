@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from src.settings import settings
+from src.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"x-profile"
+KEY_PREFIX = "profile:"
+INDEX_KEY = "profiles"
+PROFILE_TTL = 24 * 3600
+MAX_STORED = 100
+MAX_DEPTH = 128
+
+Frame = Tuple[str, str, int]
+
+# Leaf frames of threads waiting for work; samples ending here are not CPU time.
+_IDLE = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+# Only one request is profiled at a time per worker, bounding the overhead.
+_busy = threading.Lock()
+
+
+class Sampler:
+    """
+    Statistical profiler sampling the stacks of every thread in the process.
+
+    A background thread records the stack of each busy thread every
+    `interval` seconds. Covering all threads captures both the event loop and
+    the threadpool running synchronous endpoints; concurrent requests show up
+    too, so profiles are clearest on a quiet worker.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: Dict[str, Counter] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started = self.stopped = 0.0
+
+    def _stack(self, frame) -> Tuple[Frame, ...]:
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, frame.f_lineno))
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+                    continue
+                if ident not in names:
+                    names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                name = names.get(ident, str(ident))
+                self.samples.setdefault(name, Counter())[self._stack(frame)] += 1
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread to exit."""
+        self.stopped = time.perf_counter()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def to_speedscope(self, name: str) -> dict:
+        """
+        Export the samples in the speedscope file format, one profile per thread.
+
+        Args:
+            name (str): Title shown in speedscope.
+
+        Returns:
+            dict: Document loadable by https://www.speedscope.app.
+        """
+        frames: List[dict] = []
+        index: Dict[Frame, int] = {}
+        profiles = []
+        weight = round(self.interval * 1000, 3)
+        for thread, stacks in sorted(self.samples.items()):
+            samples, weights = [], []
+            for stack, count in stacks.items():
+                ids = []
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    ids.append(index[frame])
+                samples.append(ids)
+                weights.append(count * weight)
+            profiles.append({
+                "type": "sampled", "name": thread, "unit": "milliseconds",
+                "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "contacts-api",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+async def _is_admin(scope) -> bool:
+    from fastapi import HTTPException
+
+    from src.db import SessionLocal
+    from src.dependencies.auth import get_current_user
+    from src.dependencies.roles import admin_required
+
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode()
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    db = SessionLocal()
+    try:
+        await admin_required(await get_current_user(token=token, db=db))
+        return True
+    except HTTPException:
+        return False
+    finally:
+        await run_in_threadpool(db.close)
+
+
+async def store(profile_id: str, meta: dict, document: dict) -> None:
+    """
+    Save a profile in Redis, where every worker can serve it.
+
+    Args:
+        profile_id (str): Profile ID returned in the `X-Profile-Id` header.
+        meta (dict): Request summary listed by the admin endpoint.
+        document (dict): Speedscope document.
+    """
+    redis = get_redis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.set(KEY_PREFIX + profile_id, json.dumps(document, separators=(",", ":")), ex=PROFILE_TTL)
+    pipe.lpush(INDEX_KEY, json.dumps(meta))
+    pipe.ltrim(INDEX_KEY, 0, MAX_STORED - 1)
+    pipe.expire(INDEX_KEY, PROFILE_TTL)
+    await pipe.execute()
+
+
+async def recent(limit: int = MAX_STORED) -> List[dict]:
+    """Return summaries of the most recently stored profiles, newest first."""
+    return [json.loads(item) for item in await get_redis().lrange(INDEX_KEY, 0, limit - 1)]
+
+
+async def load(profile_id: str) -> Optional[str]:
+    """Return a stored speedscope document as JSON, or None if it expired."""
+    return await get_redis().get(KEY_PREFIX + profile_id)
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests on demand.
+
+    A request is profiled when it carries an `X-Profile` header and its token
+    passes `admin_required`, or when it is picked by 1-in-PROFILE_SAMPLE_RATE
+    sampling. Sampling deliberately covers every user's requests, since
+    profiles of real traffic are what it is for; they only hold code
+    locations and the request path, are listed under GET /admin/profiles and
+    readable by admins only. The ID of a requested profile is returned in
+    `X-Profile-Id`; sampled responses do not reveal that they were profiled.
+    Other requests only pay for a header lookup and, with sampling enabled,
+    one random number. Stopping the sampler and building the document run in
+    the threadpool, off the event loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        requested = any(name == HEADER for name, _ in scope["headers"])
+        rate = settings.PROFILE_SAMPLE_RATE
+        sampled = not requested and rate > 0 and random.random() * rate < 1
+        if not (requested or sampled) or (requested and not await _is_admin(scope)):
+            return await self.app(scope, receive, send)
+        if not _busy.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if requested:
+                    message.setdefault("headers", [])
+                    message["headers"] = [*message["headers"], (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            try:
+                await run_in_threadpool(sampler.stop)
+            finally:
+                _busy.release()
+            name = f"{scope['method']} {scope['path']}"
+            meta = {
+                "id": profile_id, "request": name, "status": status["code"],
+                "duration_ms": round((sampler.stopped - sampler.started) * 1000, 2),
+                "created_at": int(time.time()), "sampled": sampled,
+            }
+            try:
+                await store(profile_id, meta, await run_in_threadpool(sampler.to_speedscope, name))
+            except Exception as exc:
+                logger.warning("Could not store profile %s: %r", profile_id, exc)
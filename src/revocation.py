@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Dict
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from src.settings import settings
+from src.utils.redis_pool import get_redis, get_redis_breaker, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "auth:revoked"
+VERSION_CHANNEL = "auth:token-version"
+KEY_PREFIX = "revoked:"
+RELOAD_INTERVAL = 3600
+# Token versions are also reloaded from the database on this interval, so
+# bumps missed while Redis pub/sub is down still take effect.
+VERSION_RELOAD_INTERVAL = 60
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Membership tests never give false negatives; false positives happen at
+    roughly `error_rate` once `capacity` items have been added.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    """
+    Denylist of revoked token ids (jti).
+
+    Revoked jtis are stored in Redis with a TTL equal to the token's remaining
+    lifetime and broadcast over pub/sub. Each worker mirrors them into a local
+    Bloom filter, so checking a token that was never revoked needs no network
+    call; only Bloom filter hits are confirmed against Redis. Until the filter
+    has been loaded once, every jti is checked against Redis.
+
+    Redis lookups go through the Redis circuit breaker. When Redis cannot
+    answer, a Bloom filter hit counts as revoked, while a worker that never
+    loaded its filter lets the token through and relies on `TokenVersions`.
+    """
+
+    def __init__(self):
+        self.bloom = BloomFilter()
+        self.loaded = False
+
+    def might_be_revoked(self, jti: str) -> bool:
+        """Return False when the jti is certainly not revoked."""
+        return not self.loaded or jti in self.bloom
+
+    def _unconfirmed(self, jti: str, exc: Exception) -> bool:
+        logger.warning("Could not confirm revocation of %s: %r", jti, exc)
+        # Without a loaded filter every token would be rejected while Redis is down.
+        return self.loaded
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        Check a jti from synchronous code.
+
+        Args:
+            jti (str): Token id.
+
+        Returns:
+            bool: True if the token was revoked. When Redis cannot confirm a
+            Bloom filter hit, the token is treated as revoked; before the filter
+            was loaded, it is treated as not revoked.
+        """
+        if not self.might_be_revoked(jti):
+            return False
+        try:
+            return bool(get_redis_breaker().call_sync(get_sync_redis().exists, KEY_PREFIX + jti))
+        except Exception as exc:
+            return self._unconfirmed(jti, exc)
+
+    async def is_revoked_async(self, jti: str) -> bool:
+        """
+        Check a jti from asynchronous code, waiting at most REDIS_CALL_TIMEOUT for Redis.
+
+        Args:
+            jti (str): Token id.
+
+        Returns:
+            bool: True if the token was revoked, see `is_revoked`.
+        """
+        if not self.might_be_revoked(jti):
+            return False
+        try:
+            exists = await get_redis_breaker().call(
+                get_redis().exists, KEY_PREFIX + jti, timeout=settings.REDIS_CALL_TIMEOUT
+            )
+            return bool(exists)
+        except Exception as exc:
+            return self._unconfirmed(jti, exc)
+
+    async def revoke(self, jti: str, expires_at: int) -> None:
+        """
+        Revoke a token until it expires.
+
+        Args:
+            jti (str): Token id.
+            expires_at (int): Token expiration as a UNIX timestamp.
+        """
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return
+        redis = get_redis()
+        await redis.set(KEY_PREFIX + jti, "1", ex=ttl)
+        await redis.publish(CHANNEL, jti)
+        self.bloom.add(jti)
+
+    async def reload(self) -> None:
+        """Rebuild the Bloom filter from the jtis currently revoked in Redis, dropping expired ones."""
+        bloom = BloomFilter()
+        async for key in get_redis().scan_iter(match=KEY_PREFIX + "*", count=1000):
+            bloom.add(key[len(KEY_PREFIX):])
+        self.bloom = bloom
+        self.loaded = True
+
+
+class TokenVersions:
+    """
+    Minimum valid token version per user.
+
+    Bumping a user's `token_version` (on role change or password reset)
+    invalidates every token issued with a lower `ver` claim. Only users with a
+    bumped version are kept, loaded from the database and updated over pub/sub.
+    """
+
+    def __init__(self):
+        self.versions: Dict[int, int] = {}
+
+    def is_current(self, user_id: int, version: int) -> bool:
+        """
+        Check a token's `ver` claim against the user's current version.
+
+        Args:
+            user_id (int): ID of the token subject.
+            version (int): Version stored in the token, 0 for tokens without one.
+
+        Returns:
+            bool: True if the token has not been invalidated.
+        """
+        return version >= self.versions.get(user_id, 0)
+
+    def update(self, user_id: int, version: int) -> None:
+        """Record a new current version for a user."""
+        if version > self.versions.get(user_id, 0):
+            self.versions[user_id] = version
+
+    def reload(self) -> None:
+        """Load the current versions of all users with invalidated tokens from the database."""
+        from src import models
+        from src.db import SessionLocal
+
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(models.User.id, models.User.token_version).where(models.User.token_version > 0)
+            ).all()
+        finally:
+            db.close()
+        versions = {user_id: version for user_id, version in rows}
+        # Versions only grow, so keep bumps applied locally while the query ran.
+        for user_id, version in self.versions.items():
+            versions[user_id] = max(version, versions.get(user_id, 0))
+        self.versions = versions
+
+    def publish(self, user_id: int, version: int) -> None:
+        """
+        Apply a version bump locally and broadcast it to the other workers.
+
+        The user's cached profile is dropped as well, so the new role is seen
+        by the database-backed authentication path too.
+
+        Args:
+            user_id (int): ID of the user.
+            version (int): New token version.
+        """
+        self.update(user_id, version)
+        try:
+            pipe = get_sync_redis().pipeline(transaction=False)
+            pipe.delete(f"user:{user_id}")
+            pipe.publish(VERSION_CHANNEL, f"{user_id}:{version}")
+            pipe.execute()
+        except Exception as exc:
+            logger.warning("Could not broadcast token version of user %s: %r", user_id, exc)
+
+
+revocations = RevocationList()
+token_versions = TokenVersions()
+
+
+def _handle(message: dict) -> None:
+    if message["channel"] == CHANNEL:
+        revocations.bloom.add(message["data"])
+    elif message["channel"] == VERSION_CHANNEL:
+        user_id, _, version = message["data"].partition(":")
+        token_versions.update(int(user_id), int(version))
+
+
+async def _reload() -> None:
+    await run_in_threadpool(token_versions.reload)
+    await revocations.reload()
+
+
+async def refresh_token_versions() -> None:
+    """
+    Reload token versions from the database every VERSION_RELOAD_INTERVAL.
+
+    Runs until cancelled. It does not depend on Redis, so invalidated tokens
+    stop working within the interval even while the listener is disconnected.
+    """
+    while True:
+        await asyncio.sleep(VERSION_RELOAD_INTERVAL)
+        try:
+            await run_in_threadpool(token_versions.reload)
+        except Exception as exc:
+            logger.warning("Could not reload token versions: %r", exc)
+
+
+async def listen() -> None:
+    """
+    Keep the local revocation state in sync with changes made by other workers.
+
+    Runs until cancelled, reconnecting with backoff when Redis is unavailable
+    and reloading after every (re)subscription and every RELOAD_INTERVAL.
+    """
+    loop = asyncio.get_running_loop()
+    backoff = 1
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_redis().pubsub()
+            await pubsub.subscribe(CHANNEL, VERSION_CHANNEL)
+            await _reload()
+            backoff = 1
+            next_reload = loop.time() + RELOAD_INTERVAL
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    _handle(message)
+                if loop.time() >= next_reload:
+                    await _reload()
+                    next_reload = loop.time() + RELOAD_INTERVAL
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Revocation listener disconnected: %r", exc)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
@@ -1,2 +1,2 @@
 
-from . import contacts, auth, users
+from . import contacts, auth, users, health, admin
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+
+from src import analytics, profiling
+from src.db import get_db
+from src.dependencies.roles import admin_required
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/profiles")
+async def list_profiles(limit: int = Query(20, ge=1, le=profiling.MAX_STORED), current_admin=Depends(admin_required)):
+    """
+    List the most recent request profiles, newest first (admin-only).
+
+    Send any request with an `X-Profile` header and an admin token to profile
+    it; its ID comes back in the `X-Profile-Id` response header.
+    """
+    return await profiling.recent(limit)
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, current_admin=Depends(admin_required)):
+    """
+    Download a request profile as a speedscope file (admin-only).
+
+    Open it at https://www.speedscope.app to view it as a flame graph.
+    """
+    document = await profiling.load(profile_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        document,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+    )
+
+
+@router.get("/analytics/contacts-per-user")
+def contacts_per_user(db: Session = Depends(get_db), current_admin=Depends(admin_required)):
+    """
+    Distribution of users by number of contacts (admin-only, cached briefly).
+    """
+    return analytics.cached("contacts-per-user", lambda: analytics.contacts_per_user(db))
+
+
+@router.get("/analytics/signups")
+def signup_timeline(
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_db),
+    current_admin=Depends(admin_required),
+):
+    """
+    Signups per day over the last `days` days (admin-only, cached briefly).
+    """
+    today = datetime.utcnow().date()
+    return analytics.cached(
+        f"signups:{days}:{today.isoformat()}", lambda: analytics.signup_timeline(db, days=days, today=today)
+    )
+
+
+@router.get("/analytics/verification")
+def verification(db: Session = Depends(get_db), current_admin=Depends(admin_required)):
+    """
+    Verified and unverified user counts and their ratio (admin-only, cached briefly).
+    """
+    return analytics.cached("verification", lambda: analytics.verification(db))
+
+
+@router.get("/analytics/birthdays-by-month")
+def birthdays_by_month(db: Session = Depends(get_db), current_admin=Depends(admin_required)):
+    """
+    Number of contacts with a birthday in each month (admin-only, cached briefly).
+    """
+    return analytics.cached("birthdays-by-month", lambda: analytics.birthdays_by_month(db))
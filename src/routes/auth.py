@@ -1,21 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
+import logging
+import time
 from datetime import timedelta
 from os import getenv
 from fastapi.security import OAuth2PasswordRequestForm
-from jose import jwt, JWTError
 
 from src import schemas, crud, models
 from src.db import get_db
-from src.security import create_access_token
+from src.security import MAX_TOKEN_LIFETIME, authorization_claims, create_access_token, decode_access_token
+from src.revocation import revocations, token_versions
 from src.settings import settings
-from src.auth.password_reset import generate_reset_token, verify_reset_token
-from src.utils.redis_pool import get_redis
-from src.dependencies.auth import get_current_user
+from src.auth.password_reset import generate_reset_token, load_reset_token
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.local_cache import LocalCache
+from src.utils.redis_pool import get_redis_breaker, get_sync_redis
+from src.dependencies.auth import get_current_user, oauth2_scheme
 from src.dependencies.roles import admin_required
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+RESET_TOKEN_TTL = 3600
+# Reset tokens issued while Redis was unavailable.
+_local_reset_tokens = LocalCache(maxsize=10000, ttl=RESET_TOKEN_TTL)
+
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=201)
 def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -42,7 +52,8 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
 
-    access_token = create_access_token({"sub": str(user.id)})
+    claims = authorization_claims(user, embed=settings.JWT_EMBED_CLAIMS)
+    access_token = create_access_token({"sub": str(user.id), **claims})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -52,9 +63,9 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     Verify user's email via token.
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token)
         user_id = int(payload.get("sub"))
-    except JWTError:
+    except (ValueError, TypeError):
         raise HTTPException(status_code=400, detail="Invalid token")
 
     user = db.get(models.User, user_id)
@@ -65,22 +76,34 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     return {"detail": "Email verified"}
 
 
+def _reset_key(token: str) -> str:
+    return f"pwdreset:{token}"
+
+
 @router.post("/password-reset-request")
 def password_reset_request(payload: dict, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     Request a password reset link for a user.
+
+    The token is recorded in Redis through the Redis circuit breaker. While
+    Redis is unavailable it is kept in this worker's memory instead; the token
+    version embedded in it keeps it single-use either way.
     """
+    from redis.exceptions import RedisError
+
     email = payload.get("email")
     user = crud.get_user_by_email(db, email)
     if not user:
         return {"status": "ok"}  # не показуємо наявність юзера
 
-    token = generate_reset_token(email)
+    token = generate_reset_token(email, user.token_version or 0)
     reset_link = f"{getenv('FRONTEND_URL')}/reset-password?token={token}"
 
-    redis = get_redis()
-    import asyncio
-    asyncio.run(redis.set(f"pwdreset:{token}", email, ex=3600))
+    try:
+        get_redis_breaker().call_sync(lambda: get_sync_redis().set(_reset_key(token), email, ex=RESET_TOKEN_TTL))
+    except (CircuitOpenError, RedisError) as exc:
+        logger.warning("Storing a password reset token in Redis failed, keeping it in memory: %r", exc)
+        _local_reset_tokens.set(_reset_key(token), email)
 
     # Можна додати background task для відправки листа
     return {"reset_token": token, "detail": "Check your email for reset link"}
@@ -90,32 +113,74 @@ def password_reset_request(payload: dict, background_tasks: BackgroundTasks, db:
 def password_reset(payload: dict, db: Session = Depends(get_db)):
     """
     Reset user password using token.
+
+    The token must be recorded in Redis (or in this worker's memory if it was
+    issued during a Redis outage) and carry the user's current token version.
+    While Redis is unavailable only the version is checked, against the database.
     """
+    from redis.exceptions import RedisError
+
     token = payload.get("token")
     new_password = payload.get("password")
-    email = verify_reset_token(token)
-    if not email:
+    loaded = load_reset_token(token) if token else None
+    if not loaded:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
+    email, version = loaded
 
-    redis = get_redis()
-    import asyncio
-    stored = asyncio.run(redis.get(f"pwdreset:{token}"))
+    key = _reset_key(token)
+    try:
+        stored = get_redis_breaker().call_sync(get_sync_redis().get, key) or _local_reset_tokens.get(key)
+    except (CircuitOpenError, RedisError) as exc:
+        logger.warning("Checking a password reset token in Redis failed, using the database: %r", exc)
+        stored = email
     if not stored:
         raise HTTPException(status_code=400, detail="Token invalid or used")
 
     user = crud.get_user_by_email(db, email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if version != (user.token_version or 0):
+        raise HTTPException(status_code=400, detail="Token invalid or used")
 
     user.hashed_password = crud.get_password_hash(new_password)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    token_versions.publish(user.id, crud.bump_token_version(db, user))
 
-    asyncio.run(redis.delete(f"pwdreset:{token}"))
+    _local_reset_tokens.pop(key)
+    try:
+        get_redis_breaker().call_sync(get_sync_redis().delete, key)
+    except (CircuitOpenError, RedisError) as exc:
+        logger.warning("Deleting a used password reset token failed: %r", exc)
     return {"status": "ok", "detail": "Password updated successfully"}
 
 
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme), current_user: dict = Depends(get_current_user)):
+    """
+    Revoke the access token used for this request.
+    """
+    payload = decode_access_token(token)
+    if payload.get("jti"):
+        try:
+            await revocations.revoke(payload["jti"], payload["exp"])
+        except Exception:
+            raise HTTPException(status_code=503, detail="Token revocation unavailable")
+    return {"status": "ok", "detail": "Logged out"}
+
+
+@router.post("/tokens/revoke")
+async def revoke_token(payload: schemas.TokenRevoke, current_admin=Depends(admin_required)):
+    """
+    Revoke any token by its jti (admin-only).
+    """
+    expires_at = time.time() + MAX_TOKEN_LIFETIME.total_seconds()
+    try:
+        await revocations.revoke(payload.jti, expires_at)
+    except Exception:
+        raise HTTPException(status_code=503, detail="Token revocation unavailable")
+    return {"status": "ok", "detail": f"Token {payload.jti} revoked"}
+
+
 @router.get("/me", response_model=schemas.UserResponse)
 def get_me(current_user: dict = Depends(get_current_user)):
     """
@@ -124,6 +189,20 @@ def get_me(current_user: dict = Depends(get_current_user)):
     return current_user
 
 
+@router.put("/users/{user_id}/role", response_model=schemas.UserResponse)
+def set_role(user_id: int, payload: schemas.RoleUpdate, db: Session = Depends(get_db), current_admin=Depends(admin_required)):
+    """
+    Change a user's role and invalidate their existing tokens (admin-only).
+    """
+    user = db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    crud.set_user_role(db, user, payload.role)
+    token_versions.publish(user.id, user.token_version)
+    return user
+
+
 @router.post("/users/{user_id}/avatar-default")
 def set_default_avatar(user_id: int, db: Session = Depends(get_db), current_admin=Depends(admin_required)):
     """
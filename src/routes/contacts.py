@@ -1,61 +1,323 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from src import crud, schemas
+from typing import List, Optional, Tuple
+from datetime import timedelta
+from src import autocomplete, birthdays, changefeed, crud, dedupe, encoding, group_commit, idempotency, schemas, sync
 from src.db import get_db
 from src.deps import get_current_user
 from src.models import User
+from src.settings import settings
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
 
+def contact_fields(
+    fields: Optional[str] = Query(None, description="Comma separated contact fields to return, e.g. first_name,phone"),
+) -> Optional[Tuple[str, ...]]:
+    """
+    Parse the sparse fieldset parameter of the contact read endpoints.
+
+    Args:
+        fields (Optional[str]): Comma separated field names; the ID is always included.
+
+    Raises:
+        HTTPException: 400 if a field does not exist.
+
+    Returns:
+        Optional[Tuple[str, ...]]: Requested fields in schema order, None for all fields.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(schemas.CONTACT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in schemas.CONTACT_FIELDS if name in requested)
+
+
+def _view(fields: Optional[Tuple[str, ...]]):
+    return schemas.contact_view(fields) if fields else schemas.ContactResponse
+
+
 @router.post("/", response_model=schemas.ContactResponse, status_code=201)
 def create_contact(
     contact: schemas.ContactCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Create a new contact for the current user.
 
+    With an `Idempotency-Key` header, retries of the request with the same key
+    and body get the first response back (marked `Idempotent-Replayed: true`)
+    instead of creating the contact again.
+
     Args:
         contact (schemas.ContactCreate): Contact creation data.
+        idempotency_key (Optional[str]): Client chosen key identifying the request.
         db (Session): Database session.
         current_user (User): Authenticated user.
 
+    Raises:
+        HTTPException: 409 if the email is taken or a request with the same key is
+            still running, 422 if the key was used with a different body.
+
     Returns:
         schemas.ContactResponse: The created contact.
     """
-    return crud.create_contact(db, contact, owner_id=current_user.id)
+    def create():
+        try:
+            created = group_commit.create_contact(db, contact, owner_id=current_user.id)
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="A contact with this email already exists")
+        return jsonable_encoder(schemas.ContactResponse.from_orm(created))
 
+    if idempotency_key is None:
+        return create()
+    try:
+        body, replayed = idempotency.execute(
+            f"contacts:{current_user.id}", idempotency_key, idempotency.fingerprint(contact.dict()), create
+        )
+    except idempotency.KeyReused as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except idempotency.RequestInProgress as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return JSONResponse(
+        body, status_code=201, headers={idempotency.REPLAYED_HEADER: "true" if replayed else "false"}
+    )
 
-@router.get("/", response_model=List[schemas.ContactResponse])
+
+@router.get("/", response_model=List[schemas.ContactResponse], responses=encoding.BINARY_RESPONSES)
 def get_contacts(
+    request: Request,
     q: Optional[str] = Query(None, description="Search by name, surname or email"),
     skip: int = 0,
     limit: int = 10,
+    fields: Optional[Tuple[str, ...]] = Depends(contact_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Get a list of contacts for the current user, optionally filtered by search query.
 
+    The total number of contacts is returned in the `X-Total-Count` header. For
+    filtered lists it is capped at CONTACT_COUNT_CAP and `X-Total-Count-Exact`
+    is "false" when the cap was reached. The list is sent as MessagePack or
+    CBOR when the `Accept` header asks for it. With `fields`, only those
+    columns are read from the database and returned.
+
     Args:
+        request (Request): Incoming request, used for content negotiation.
         q (Optional[str]): Search string for first name, last name, or email.
         skip (int): Number of records to skip.
         limit (int): Maximum number of records to return.
+        fields (Optional[Tuple[str, ...]]): Fields to return, all when None.
+        db (Session): Database session.
+        current_user (User): Authenticated user.
+
+    Returns:
+        Response: List of matching contacts in the negotiated format.
+    """
+    total, exact = crud.count_contacts(db, owner_id=current_user.id, q=q, cap=settings.CONTACT_COUNT_CAP)
+    contacts = crud.search_contacts(db, owner_id=current_user.id, q=q, skip=skip, limit=limit, fields=fields)
+    view = _view(fields)
+    return encoding.render(
+        request,
+        [view.from_orm(contact) for contact in contacts],
+        headers={"X-Total-Count": str(total), "X-Total-Count-Exact": "true" if exact else "false"},
+    )
+
+
+@router.get("/autocomplete", response_model=List[schemas.ContactSuggestion])
+def autocomplete_contacts(
+    q: str = Query(..., min_length=1, description="Prefix of a first name, last name or email"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Suggest contacts of the current user whose name or email starts with a prefix.
+
+    Args:
+        q (str): Typed prefix, matched case-insensitively.
+        limit (int): Maximum number of suggestions.
+        db (Session): Database session.
+        current_user (User): Authenticated user.
+
+    Returns:
+        List[schemas.ContactSuggestion]: Matching contacts in alphabetical order.
+    """
+    return autocomplete.complete(db, owner_id=current_user.id, prefix=q, limit=limit)
+
+
+@router.get("/by-phone", response_model=List[schemas.ContactResponse], responses=encoding.BINARY_RESPONSES)
+def get_contacts_by_phone(
+    request: Request,
+    phone: str = Query(..., min_length=1, description="Phone number in any format"),
+    fields: Optional[Tuple[str, ...]] = Depends(contact_fields),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Find the current user's contacts with a given phone number.
+
+    Args:
+        request (Request): Incoming request, used for content negotiation.
+        phone (str): Phone number, with or without country code.
+        fields (Optional[Tuple[str, ...]]): Fields to return, all when None.
+        db (Session): Database session.
+        current_user (User): Authenticated user.
+
+    Returns:
+        Response: Contacts whose normalized number matches, in the negotiated format.
+    """
+    view = _view(fields)
+    contacts = crud.get_contacts_by_phone(db, phone, owner_id=current_user.id, fields=fields)
+    return encoding.render(request, [view.from_orm(contact) for contact in contacts])
+
+
+@router.get("/duplicates")
+def find_duplicates(
+    threshold: float = Query(0.6, ge=0, le=1, description="Minimum similarity to link two contacts"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stream clusters of likely duplicate contacts of the current user.
+
+    Each line of the newline-delimited JSON response is one cluster with its
+    contact IDs and the scored pairs linking them. Contacts are read while the
+    response streams, and each cluster is sent once all of its candidate
+    pairs have been scored.
+
+    Args:
+        threshold (float): Minimum pair score, between 0 and 1.
+        db (Session): Database session.
+        current_user (User): Authenticated user.
+
+    Returns:
+        StreamingResponse: application/x-ndjson stream of clusters.
+    """
+    candidates = dedupe.owner_candidates(db, owner_id=current_user.id)
+    lines = (json.dumps(cluster) + "\n" for cluster in dedupe.find_duplicates(candidates, threshold=threshold))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.get("/upcoming-birthdays", response_model=List[schemas.ContactResponse])
+def get_birthdays(
+    days: int = Query(7, ge=0, le=366),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get contacts with birthdays in the next given number of days, soonest first.
+
+    Served from the daily digest precomputed in Redis when possible.
+
+    Args:
+        days (int): Number of days to look ahead for birthdays.
+        db (Session): Database session.
+        current_user (User): Authenticated user.
+
+    Returns:
+        List[schemas.ContactResponse]: Contacts with upcoming birthdays.
+    """
+    return birthdays.upcoming(db, owner_id=current_user.id, days=days)
+
+
+@router.get("/sync", response_model=schemas.ContactSync, responses=encoding.BINARY_RESPONSES)
+def sync_contacts(
+    request: Request,
+    since: Optional[str] = Query(None, description="next_token of the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Return the current user's contacts changed or deleted since a sync token.
+
+    Without `since` all contacts are returned. Clients should repeat the call
+    with `next_token` while `has_more` is true. The most recent changes are
+    sent again by the next sync so late commits are not missed, so clients
+    must apply them idempotently. The page is sent as MessagePack or CBOR
+    when the `Accept` header asks for it.
+
+    Args:
+        request (Request): Incoming request, used for content negotiation.
+        since (Optional[str]): Token returned by the previous sync.
+        limit (int): Maximum number of changed contacts and of deletions per page.
+        db (Session): Database session.
+        current_user (User): Authenticated user.
+
+    Raises:
+        HTTPException: 400 if the token is invalid, 410 if it is too old and a full sync is needed.
+
+    Returns:
+        Response: Changed contacts, deleted IDs and the next token in the negotiated format.
+    """
+    cursor = None
+    if since:
+        try:
+            cursor = sync.decode_token(since, timedelta(days=settings.TOMBSTONE_RETENTION_DAYS))
+        except sync.SyncTokenExpired as exc:
+            raise HTTPException(status_code=410, detail=str(exc))
+        except sync.SyncTokenError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    changed, deleted, next_cursor, has_more = sync.changes_since(
+        db, current_user.id, cursor, limit=limit, lag=timedelta(seconds=settings.SYNC_SAFETY_LAG_SECONDS)
+    )
+    return encoding.render(request, schemas.ContactSync(
+        changed=changed,
+        deleted=deleted,
+        next_token=sync.encode_token(next_cursor),
+        has_more=has_more,
+    ))
+
+
+@router.get("/stream")
+def stream_changes(
+    last_event_id: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stream changes to the current user's contacts as Server-Sent Events.
+
+    Each event is named "created", "updated" or "deleted" and carries the
+    contact (or its ID for deletions) as JSON. Clients reconnecting with a
+    `Last-Event-ID` header first receive the changes they missed.
+
+    Args:
+        last_event_id (Optional[str]): ID of the last event the client received.
         db (Session): Database session.
         current_user (User): Authenticated user.
 
     Returns:
-        List[schemas.ContactResponse]: List of matching contacts.
+        StreamingResponse: text/event-stream of contact changes.
     """
-    return crud.search_contacts(db, owner_id=current_user.id, q=q, skip=skip, limit=limit)
+    owner_id = current_user.id
+    # The stream never touches the database, so do not hold a pooled connection while it is open.
+    db.close()
+    return StreamingResponse(
+        changefeed.stream(owner_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-@router.get("/{contact_id}", response_model=schemas.ContactResponse)
+@router.get("/{contact_id}", response_model=schemas.ContactResponse, responses=encoding.BINARY_RESPONSES)
 def get_contact(
+    request: Request,
     contact_id: int,
+    fields: Optional[Tuple[str, ...]] = Depends(contact_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -63,7 +325,9 @@ def get_contact(
     Get a single contact by ID for the current user.
 
     Args:
+        request (Request): Incoming request, used for content negotiation.
         contact_id (int): ID of the contact.
+        fields (Optional[Tuple[str, ...]]): Fields to return, all when None.
         db (Session): Database session.
         current_user (User): Authenticated user.
 
@@ -71,12 +335,12 @@ def get_contact(
         HTTPException: 404 if contact is not found.
 
     Returns:
-        schemas.ContactResponse: The requested contact.
+        Response: The requested contact in the negotiated format.
     """
-    obj = crud.get_contact(db, contact_id, owner_id=current_user.id)
+    obj = crud.get_contact(db, contact_id, owner_id=current_user.id, fields=fields)
     if not obj:
         raise HTTPException(status_code=404, detail="Contact not found")
-    return obj
+    return encoding.render(request, _view(fields).from_orm(obj))
 
 
 @router.put("/{contact_id}", response_model=schemas.ContactResponse)
@@ -101,7 +365,7 @@ def update_contact(
     Returns:
         schemas.ContactResponse: Updated contact.
     """
-    obj = crud.update_contact(db, contact_id, contact, owner_id=current_user.id)
+    obj = group_commit.update_contact(db, contact_id, contact, owner_id=current_user.id)
     if not obj:
         raise HTTPException(status_code=404, detail="Contact not found")
     return obj
@@ -131,24 +395,3 @@ def delete_contact(
     if not ok:
         raise HTTPException(status_code=404, detail="Contact not found")
     return None
-
-
-@router.get("/upcoming-birthdays", response_model=List[schemas.ContactResponse])
-def get_birthdays(
-    days: int = 7,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Get contacts with birthdays in the next given number of days.
-
-    Args:
-        days (int): Number of days to look ahead for birthdays.
-        db (Session): Database session.
-        current_user (User): Authenticated user.
-
-    Returns:
-        List[schemas.ContactResponse]: Contacts with upcoming birthdays.
-    """
-    contacts = crud.get_upcoming_birthdays(db, days=days)
-    return [c for c in contacts if c.owner_id == current_user.id]
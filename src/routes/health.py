@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from src.utils.circuit_breaker import STATE_VALUES
+from src.utils.redis_pool import get_redis_breaker
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/live")
+def live():
+    """
+    Liveness probe: the process is up and serving requests.
+
+    Returns:
+        dict: Static status payload.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def ready(request: Request):
+    """
+    Readiness probe: warm-up has finished and the app can take traffic.
+
+    Args:
+        request (Request): Incoming request, used to reach the application state.
+
+    Returns:
+        JSONResponse: 200 with warm-up results once ready, 503 while warming up.
+    """
+    state = request.app.state
+    if not getattr(state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming up"})
+    return {"status": "ready", "checks": state.warmup_checks}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Worker metrics in the Prometheus text exposition format.
+
+    `redis_circuit_state` is 0 when the Redis circuit breaker is closed, 1 while
+    half-open and 2 while open; the counters are totals since the worker started.
+
+    Returns:
+        PlainTextResponse: Metrics of this worker process.
+    """
+    breaker = get_redis_breaker().metrics()
+    lines = [
+        "# HELP redis_circuit_state Redis circuit breaker state (0 closed, 1 half-open, 2 open).",
+        "# TYPE redis_circuit_state gauge",
+        f"redis_circuit_state {STATE_VALUES[breaker['state']]}",
+    ]
+    for name, help_text in (
+        ("failures", "Failed Redis calls seen by the circuit breaker."),
+        ("rejected", "Redis calls skipped while the circuit breaker was open."),
+        ("opened", "Times the Redis circuit breaker opened."),
+    ):
+        lines += [
+            f"# HELP redis_circuit_{name}_total {help_text}",
+            f"# TYPE redis_circuit_{name}_total counter",
+            f"redis_circuit_{name}_total {breaker[name]}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -2,8 +2,7 @@ from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from sqlalchemy.orm import Session
 from src.deps import get_current_user
 from src.db import get_db
-from src import crud, schemas
-from cloudinary.uploader import upload as cloud_upload
+from src import crud, schemas, tracing
 from os import getenv
 import time
 
@@ -80,15 +79,17 @@ def upload_avatar(
     api_secret = getenv("CLOUDINARY_API_SECRET")
     
     import cloudinary
+    from cloudinary.uploader import upload as cloud_upload
     cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
     
-    res = cloud_upload(
-        file.file, 
-        folder="avatars", 
-        public_id=f"user_{current_user.id}", 
-        overwrite=True, 
-        resource_type="image"
-    )
+    with tracing.span("cloudinary.upload", tracing.CLIENT, **{"cloudinary.folder": "avatars"}):
+        res = cloud_upload(
+            file.file, 
+            folder="avatars", 
+            public_id=f"user_{current_user.id}", 
+            overwrite=True, 
+            resource_type="image"
+        )
     url = res.get("secure_url")
     updated = crud.update_user_avatar(db, current_user, url)
     return updated
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from functools import lru_cache
+from pydantic import BaseModel, EmailStr, create_model
 from datetime import date
-from typing import Optional
+from typing import List, Literal, Optional, Tuple, Type
 
 class ContactBase(BaseModel):
     """
@@ -60,6 +61,55 @@ class ContactResponse(ContactBase):
     class Config:
         orm_mode = True
 
+CONTACT_FIELDS = tuple(ContactResponse.__fields__)
+
+@lru_cache(maxsize=None)
+def contact_view(fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Build a variant of ContactResponse limited to some fields, for sparse fieldsets.
+
+    Args:
+        fields (Tuple[str, ...]): Names from CONTACT_FIELDS to keep.
+
+    Returns:
+        Type[BaseModel]: Model with the selected fields, created once per field set.
+    """
+    definitions = {
+        name: (field.annotation, ... if field.required else field.default)
+        for name, field in ContactResponse.__fields__.items() if name in fields
+    }
+    return create_model("ContactView", __config__=ContactResponse.__config__, **definitions)
+
+class ContactSync(BaseModel):
+    """
+    Schema for a page of delta sync results.
+
+    Attributes:
+        changed (List[ContactResponse]): Contacts created or updated since the token.
+        deleted (List[int]): IDs of contacts deleted since the token.
+        next_token (str): Token to pass as `since` on the next sync.
+        has_more (bool): Whether more changes are waiting; sync again right away if true.
+    """
+    changed: List[ContactResponse]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+class ContactSuggestion(BaseModel):
+    """
+    Schema for an autocomplete suggestion.
+
+    Attributes:
+        id (int): Contact ID.
+        first_name (str): Contact's first name.
+        last_name (str): Contact's last name.
+        email (str): Contact's email address.
+    """
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+
 class UserCreate(BaseModel):
     """
     Schema for creating a new user.
@@ -115,3 +165,21 @@ class TokenData(BaseModel):
         user_id (Optional[int]): ID of the user associated with the token.
     """
     user_id: Optional[int] = None
+
+class RoleUpdate(BaseModel):
+    """
+    Schema for changing a user's role.
+
+    Attributes:
+        role (str): New role, "user" or "admin".
+    """
+    role: Literal["user", "admin"]
+
+class TokenRevoke(BaseModel):
+    """
+    Schema for revoking a token.
+
+    Attributes:
+        jti (str): Unique ID of the token to revoke.
+    """
+    jti: str
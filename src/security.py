@@ -1,13 +1,31 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from jose import jwt
 from os import getenv
+from uuid import uuid4
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src import tracing
 
 SECRET_KEY = getenv("SECRET_KEY")
 ALGORITHM = getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# Longest lifetime of any issued token (email verification tokens live 24 hours).
+MAX_TOKEN_LIFETIME = max(timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), timedelta(hours=24))
+
+_pwd_context = None
+
+
+def get_pwd_context():
+    """
+    Get the singleton passlib context, importing passlib on first use.
+
+    Returns:
+        CryptContext: Password hashing context configured for bcrypt.
+    """
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def get_password_hash(password: str) -> str:
@@ -20,7 +38,8 @@ def get_password_hash(password: str) -> str:
     Returns:
         str: Hashed password.
     """
-    return pwd_context.hash(password)
+    with tracing.span("bcrypt.hash"):
+        return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -34,13 +53,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: True if the password matches, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    with tracing.span("bcrypt.verify"):
+        return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """
     Create a JWT access token.
 
+    Every token gets a unique `jti` claim so it can be revoked individually.
+
     Args:
         data (dict): Data to encode in the token (e.g., user ID).
         expires_delta (timedelta, optional): Expiration time for the token.
@@ -49,11 +71,58 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     Returns:
         str: Encoded JWT token.
     """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+def authorization_claims(user, embed: bool = False) -> dict:
+    """
+    Build the token claims used to authorize requests without a database lookup.
+
+    Args:
+        user (User): User the token is issued for.
+        embed (bool, optional): Also embed email, role, is_verified and is_active.
+            Defaults to False, which only adds the token version.
+
+    Returns:
+        dict: Claims to merge into the token payload.
+    """
+    claims = {"ver": user.token_version or 0}
+    if embed:
+        claims.update(
+            email=user.email,
+            role=user.role or "user",
+            is_verified=bool(user.is_verified),
+            is_active=bool(user.is_active),
+        )
+    return claims
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Decode and verify a JWT access token.
+
+    Args:
+        token (str): Encoded JWT token.
+
+    Raises:
+        ValueError: If the token signature, format or expiration is invalid.
+
+    Returns:
+        dict: Token payload.
+    """
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as exc:
+        raise ValueError("Invalid token") from exc
@@ -0,0 +1,107 @@
+import importlib.util
+import os
+from typing import Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from src.settings import settings
+
+
+def _pick(implementation: str) -> str:
+    """Use an optional uvicorn implementation when it is installed, else "auto"."""
+    return implementation if importlib.util.find_spec(implementation) else "auto"
+
+
+def available_cores() -> int:
+    """
+    Count the CPU cores this process may run on.
+
+    Respects CPU affinity (e.g. container cpusets) where the platform exposes it.
+
+    Returns:
+        int: Number of usable cores, at least 1.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return max(len(os.sched_getaffinity(0)), 1)
+    return os.cpu_count() or 1
+
+
+def worker_count(cores: Optional[int] = None) -> int:
+    """
+    Compute the number of worker processes.
+
+    Args:
+        cores (int, optional): Number of available cores. Defaults to `available_cores()`.
+
+    Returns:
+        int: WEB_WORKERS if set, otherwise cores * WEB_WORKERS_PER_CORE capped by WEB_MAX_WORKERS.
+    """
+    if settings.WEB_WORKERS > 0:
+        return settings.WEB_WORKERS
+    workers = max(int((cores or available_cores()) * settings.WEB_WORKERS_PER_CORE), 1)
+    if settings.WEB_MAX_WORKERS > 0:
+        workers = min(workers, settings.WEB_MAX_WORKERS)
+    return workers
+
+
+class ServerWorker(UvicornWorker):
+    """
+    Uvicorn worker using uvloop and httptools with the limits from settings.
+
+    On SIGTERM the worker stops accepting connections and waits up to
+    WEB_GRACEFUL_TIMEOUT seconds for in-flight requests to finish.
+    """
+    CONFIG_KWARGS = {
+        "loop": _pick("uvloop"),
+        "http": _pick("httptools"),
+        "limit_concurrency": settings.WEB_LIMIT_CONCURRENCY,
+        "timeout_graceful_shutdown": settings.WEB_GRACEFUL_TIMEOUT,
+    }
+
+
+def server_options() -> dict:
+    """
+    Build the gunicorn configuration from settings.
+
+    Returns:
+        dict: Gunicorn settings.
+    """
+    return {
+        "bind": f"{settings.WEB_HOST}:{settings.WEB_PORT}",
+        "workers": worker_count(),
+        "worker_class": "src.serve.ServerWorker",
+        "preload_app": settings.WEB_PRELOAD,
+        "keepalive": settings.WEB_KEEPALIVE,
+        "backlog": settings.WEB_BACKLOG,
+        "timeout": settings.WEB_TIMEOUT,
+        "graceful_timeout": settings.WEB_GRACEFUL_TIMEOUT,
+        "max_requests": settings.WEB_MAX_REQUESTS,
+        "max_requests_jitter": settings.WEB_MAX_REQUESTS_JITTER,
+    }
+
+
+class Server(BaseApplication):
+    """Gunicorn application serving `src.main:app` with settings-driven options."""
+
+    def __init__(self, options: Optional[dict] = None):
+        self.options = options if options is not None else server_options()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from src.main import app
+
+        return app
+
+
+def main() -> None:
+    """Run the production server."""
+    Server().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Optional
+
 from pydantic import BaseSettings
 
 
@@ -10,6 +13,8 @@ class Settings(BaseSettings):
         POSTGRES_PASSWORD (str): PostgreSQL password.
         POSTGRES_DB (str): PostgreSQL database name.
         DATABASE_URL (str): Full database connection URL.
+        SHARD_URLS (str): Comma separated shard database URLs (``name=url`` or bare URLs)
+            contacts are spread over by owner; empty keeps them on DATABASE_URL.
 
         SECRET_KEY (str): Secret key for JWT encoding/decoding.
         ALGORITHM (str): JWT algorithm, e.g., HS256.
@@ -20,12 +25,82 @@ class Settings(BaseSettings):
         CLOUDINARY_API_SECRET (str): Cloudinary API secret.
 
         FRONTEND_URL (str): Frontend base URL for generating links.
+
+        WEB_HOST (str): Interface the production server binds to.
+        WEB_PORT (int): Port the production server listens on.
+        WEB_WORKERS (int): Number of worker processes, 0 to size from CPU cores.
+        WEB_WORKERS_PER_CORE (float): Workers per available core when sizing automatically.
+        WEB_MAX_WORKERS (int): Upper bound for automatically sized workers, 0 for no bound.
+        WEB_PRELOAD (bool): Import the app once in the master before forking workers.
+        WEB_KEEPALIVE (int): Seconds to keep idle HTTP connections open.
+        WEB_BACKLOG (int): Maximum number of pending connections.
+        WEB_TIMEOUT (int): Seconds before a silent worker is restarted.
+        WEB_GRACEFUL_TIMEOUT (int): Seconds to drain in-flight requests on shutdown.
+        WEB_LIMIT_CONCURRENCY (Optional[int]): Max concurrent connections per worker before 503.
+        WEB_MAX_REQUESTS (int): Requests after which a worker is recycled, 0 to disable.
+        WEB_MAX_REQUESTS_JITTER (int): Random jitter added to WEB_MAX_REQUESTS.
+
+        WARMUP_DB_CONNECTIONS (int): Database connections opened per engine at startup.
+        WARMUP_REDIS_CONNECTIONS (int): Redis connections opened at startup.
+        WARMUP_TIMEOUT (float): Seconds to wait for Redis during warm-up.
+
+        DEFAULT_PHONE_REGION (str): ISO 3166 region phone numbers without a country code belong to.
+
+        CONTACT_COUNT_CAP (int): Maximum number of matches counted for filtered contact lists.
+        TOMBSTONE_RETENTION_DAYS (int): Days deleted contacts are remembered for delta sync;
+            older sync tokens require a full sync.
+        SYNC_SAFETY_LAG_SECONDS (float): Changes this recent are sent again by the next sync,
+            so writes that commit late are not skipped; must exceed the longest write
+            transaction plus clock skew between servers.
+
+        GZIP_MINIMUM_SIZE (int): Responses smaller than this many bytes are sent uncompressed;
+            gzip headers would outweigh the savings.
+        GZIP_COMPRESS_LEVEL (int): gzip compression level, 1 (fastest) to 9 (smallest).
+
+        PROFILE_SAMPLE_RATE (int): Profile one in this many requests of any user, readable by
+            admins only; 0 profiles only admin requests sent with an X-Profile header.
+        PROFILE_INTERVAL_MS (float): Sampling interval of the request profiler.
+
+        LOG_LEVEL (str): Level of the application loggers.
+        ACCESS_LOG_LEVEL (str): Level of the access log; WARNING keeps only failed and slow requests.
+        ACCESS_LOG_SAMPLE_RATE (float): Fraction of successful requests written to the access log;
+            failed and slow requests are always written.
+        ACCESS_LOG_SLOW_MS (float): Requests slower than this are logged at WARNING.
+
+        TRACE_SAMPLE_RATE (float): Fraction of requests traced; requests with a sampled
+            traceparent header are always traced.
+        TRACE_EXPORT_PATH (str): File traces are appended to as OTLP/JSON lines.
+        TRACE_EXPORT_URL (Optional[str]): OTLP/HTTP JSON endpoint, e.g.
+            http://collector:4318/v1/traces, used instead of TRACE_EXPORT_PATH when set.
+
+        WRITE_COALESCE_WINDOW_MS (float): Milliseconds contact writes wait for others to share
+            their commit; 0 commits every write on its own.
+        WRITE_COALESCE_MAX_BATCH (int): Most writes committed in one transaction.
+        WRITE_COALESCE_TIMEOUT (float): Seconds a write waits beyond the window for its batch
+            before committing on its own.
+
+        ANALYTICS_CACHE_TTL (int): Seconds admin analytics reports are cached.
+
+        IDEMPOTENCY_TTL (int): Seconds a response is replayed for retries with the same Idempotency-Key.
+        IDEMPOTENCY_LOCK_TTL (int): Expiry of a key's lock if its holder dies; a live holder
+            extends it every third of this.
+        IDEMPOTENCY_WAIT_TIMEOUT (float): Seconds a concurrent retry waits for the request
+            holding its key before failing with 409.
+
+        REDIS_CALL_TIMEOUT (float): Seconds request-path Redis calls with a database or
+            in-process fallback wait before the fallback is used.
+        REDIS_BREAKER_FAILURES (int): Consecutive failed Redis calls that open the circuit breaker.
+        REDIS_BREAKER_RESET_SECONDS (float): Seconds the open breaker waits before probing Redis again.
+
+        JWT_EMBED_CLAIMS (bool): Embed role, is_verified and is_active in access tokens
+            so requests can be authorized from the token alone.
     """
 
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     DATABASE_URL: str
+    SHARD_URLS: str = ""
 
     SECRET_KEY: str
     ALGORITHM: str
@@ -37,9 +112,85 @@ class Settings(BaseSettings):
 
     FRONTEND_URL: str
 
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: int = 0
+    WEB_WORKERS_PER_CORE: float = 1.0
+    WEB_MAX_WORKERS: int = 0
+    WEB_PRELOAD: bool = False
+    WEB_KEEPALIVE: int = 5
+    WEB_BACKLOG: int = 2048
+    WEB_TIMEOUT: int = 60
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    WEB_LIMIT_CONCURRENCY: Optional[int] = None
+    WEB_MAX_REQUESTS: int = 0
+    WEB_MAX_REQUESTS_JITTER: int = 0
+
+    WARMUP_DB_CONNECTIONS: int = 5
+    WARMUP_REDIS_CONNECTIONS: int = 5
+    WARMUP_TIMEOUT: float = 5.0
+
+    DEFAULT_PHONE_REGION: str = "UA"
+
+    CONTACT_COUNT_CAP: int = 1000
+    TOMBSTONE_RETENTION_DAYS: int = 90
+    SYNC_SAFETY_LAG_SECONDS: float = 30.0
+
+    GZIP_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6
+
+    PROFILE_SAMPLE_RATE: int = 0
+    PROFILE_INTERVAL_MS: float = 1.0
+
+    LOG_LEVEL: str = "INFO"
+    ACCESS_LOG_LEVEL: str = "INFO"
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SLOW_MS: float = 1000.0
+
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_EXPORT_PATH: str = "traces.jsonl"
+    TRACE_EXPORT_URL: Optional[str] = None
+
+    WRITE_COALESCE_WINDOW_MS: float = 0.0
+    WRITE_COALESCE_MAX_BATCH: int = 64
+    WRITE_COALESCE_TIMEOUT: float = 5.0
+
+    ANALYTICS_CACHE_TTL: int = 30
+
+    IDEMPOTENCY_TTL: int = 24 * 3600
+    IDEMPOTENCY_LOCK_TTL: int = 10
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0
+
+    REDIS_CALL_TIMEOUT: float = 0.25
+    REDIS_BREAKER_FAILURES: int = 5
+    REDIS_BREAKER_RESET_SECONDS: float = 10.0
+
+    JWT_EMBED_CLAIMS: bool = False
+
     class Config:
         """Configuration for Pydantic settings to load from .env file."""
         env_file = ".env"
 
 
-settings = Settings()
+@lru_cache()
+def get_settings() -> Settings:
+    """
+    Create the application settings once, on first use.
+
+    Returns:
+        Settings: Validated application settings.
+    """
+    return Settings()
+
+
+class _LazySettings:
+    """Proxy that defers reading and validating the environment until an attribute is used."""
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+
+settings = _LazySettings()
@@ -0,0 +1,399 @@
+import argparse
+import bisect
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, delete, func, inspect, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+SHARDED_TABLES = {"contacts", "contact_counters", "contact_tombstones"}
+
+
+def _hash(key: str) -> int:
+    """Map a string key to a 64-bit position on the hash ring."""
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+def parse_shard_urls(value: str) -> Dict[str, str]:
+    """
+    Parse a comma separated list of shard URLs.
+
+    Each item is either ``name=url`` or a bare URL, in which case the shard
+    is named ``shard<index>``.
+
+    Args:
+        value (str): Raw value, e.g. ``"a=sqlite:///a.db,b=sqlite:///b.db"``.
+
+    Returns:
+        Dict[str, str]: Shard name to database URL mapping.
+    """
+    shards = {}
+    for index, item in enumerate(part.strip() for part in value.split(",")):
+        if not item:
+            continue
+        name, sep, url = item.partition("=")
+        if not sep or "://" in name:
+            name, url = f"shard{index}", item
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+class ShardMap:
+    """
+    Consistent-hash ring mapping owner ids to contact database shards.
+
+    Every shard is placed on the ring ``vnodes`` times, so adding or removing
+    a shard only moves the owners that hashed next to it.
+
+    Attributes:
+        urls (Dict[str, str]): Shard name to database URL mapping.
+        engines (Dict[str, Engine]): Shard name to SQLAlchemy engine mapping.
+    """
+
+    def __init__(self, urls: Dict[str, str], vnodes: int = 64, engines: Optional[Dict[str, Engine]] = None):
+        if not urls:
+            raise ValueError("ShardMap needs at least one shard")
+        self.urls = dict(urls)
+        engines = engines or {}
+        self.engines = {
+            name: engines.get(name) or create_engine(url, future=True)
+            for name, url in self.urls.items()
+        }
+        ring = sorted((_hash(f"{name}#{i}"), name) for name in self.urls for i in range(vnodes))
+        self._points = [point for point, _ in ring]
+        self._names = [name for _, name in ring]
+
+    @property
+    def names(self) -> List[str]:
+        """List[str]: Shard names in configuration order."""
+        return list(self.urls)
+
+    def shard_for(self, owner_id: int) -> str:
+        """
+        Return the name of the shard that stores an owner's contacts.
+
+        Args:
+            owner_id (int): ID of the contact owner.
+
+        Returns:
+            str: Shard name.
+        """
+        index = bisect.bisect(self._points, _hash(str(owner_id))) % len(self._points)
+        return self._names[index]
+
+    def engine_for(self, owner_id: int) -> Engine:
+        """
+        Return the engine of the shard that stores an owner's contacts.
+
+        Args:
+            owner_id (int): ID of the contact owner.
+
+        Returns:
+            Engine: SQLAlchemy engine for the owner's shard.
+        """
+        return self.engines[self.shard_for(owner_id)]
+
+
+def _highest_contact_id(engine: Engine) -> int:
+    from src.models import Contact, ContactTombstone
+
+    # Tombstones keep the ids of deleted contacts, which must not be handed out again.
+    tables = [t.__table__ for t in (Contact, ContactTombstone) if inspect(engine).has_table(t.__tablename__)]
+    with engine.connect() as conn:
+        return max([conn.execute(select(func.max(t.c.id))).scalar() or 0 for t in tables], default=0)
+
+
+def seed_contact_ids(primary: Engine, shards: Iterable[Engine] = ()) -> int:
+    """
+    Move the contact id counter past every contact id already stored.
+
+    Contacts created before sharding was enabled used the primary's
+    autoincrement ids; without seeding, the allocator would hand them out again.
+
+    Args:
+        primary (Engine): Primary database engine holding the id counter.
+        shards (Iterable[Engine], optional): Shard engines to check as well.
+
+    Returns:
+        int: First contact id the counter may hand out.
+    """
+    from src.models import ContactIdBlock
+
+    table = ContactIdBlock.__table__
+    highest = max([_highest_contact_id(engine) for engine in (primary, *shards)])
+    while True:
+        try:
+            with primary.begin() as conn:
+                row = conn.execute(select(table.c.next_id).where(table.c.id == 1)).first()
+                if row is None:
+                    conn.execute(insert(table).values(id=1, next_id=highest + 1))
+                    return highest + 1
+                if row.next_id > highest:
+                    return row.next_id
+                result = conn.execute(
+                    update(table).where(table.c.id == 1, table.c.next_id == row.next_id).values(next_id=highest + 1)
+                )
+                if result.rowcount == 1:
+                    return highest + 1
+        except IntegrityError:
+            # Another process created the counter row first; check it again.
+            continue
+
+
+class IdAllocator:
+    """
+    Hands out globally unique contact ids in blocks reserved on the primary.
+
+    Shards cannot rely on their own autoincrement counters, otherwise moving an
+    owner between shards could collide with ids already used there. A missing
+    counter is seeded past the ids already stored on the primary and `shards`.
+    """
+
+    def __init__(self, block_size: int = 1000, shards: Iterable[Engine] = ()):
+        self.block_size = block_size
+        self.shards = list(shards)
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, engine: Engine) -> None:
+        from src.models import ContactIdBlock
+
+        table = ContactIdBlock.__table__
+        while True:
+            with engine.begin() as conn:
+                row = conn.execute(select(table.c.next_id).where(table.c.id == 1)).first()
+                if row is not None:
+                    result = conn.execute(
+                        update(table)
+                        .where(table.c.id == 1, table.c.next_id == row.next_id)
+                        .values(next_id=row.next_id + self.block_size)
+                    )
+                    if result.rowcount == 1:
+                        start = row.next_id
+                        break
+                    continue
+            seed_contact_ids(engine, self.shards)
+        self._next, self._end = start, start + self.block_size
+
+    def next_id(self, engine: Engine) -> int:
+        """
+        Return the next free contact id.
+
+        Args:
+            engine (Engine): Primary database engine holding the id counter.
+
+        Returns:
+            int: Unique contact id.
+        """
+        with self._lock:
+            if self._next >= self._end:
+                self._reserve(engine)
+            value = self._next
+            self._next += 1
+            return value
+
+
+class ShardRoutingSession(Session):
+    """
+    Session that routes sharded tables to the shard of the bound owner.
+
+    Users and other global tables keep using the session's primary bind. The
+    shard map is taken from ``session.info["shard_map"]``; when it is ``None``
+    the session behaves like a plain ``Session``.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        shard_map = self.info.get("shard_map")
+        if shard_map is not None and mapper is not None and mapper.local_table.name in SHARDED_TABLES:
+            shard = self.info.get("shard")
+            if shard is not None:
+                return shard_map.engines[shard]
+            owner_id = self.info.get("owner_id")
+            if owner_id is None:
+                raise RuntimeError("No owner bound to the session for a sharded query")
+            return shard_map.engine_for(owner_id)
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def bind_owner(db: Session, owner_id: int) -> None:
+    """
+    Route the session's sharded queries to the given owner's shard.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+    """
+    db.info["owner_id"] = owner_id
+
+
+@contextmanager
+def each_shard(db: Session) -> Iterator[Optional[str]]:
+    """
+    Iterate over all shards, pinning the session to one shard at a time.
+
+    Yields a single ``None`` when sharding is disabled, so callers can use the
+    same loop for both modes.
+
+    Args:
+        db (Session): SQLAlchemy session.
+
+    Yields:
+        Iterator[Optional[str]]: Iterator over shard names.
+    """
+    shard_map = db.info.get("shard_map")
+
+    def _iterate():
+        if shard_map is None:
+            yield None
+            return
+        for name in shard_map.names:
+            db.info["shard"] = name
+            yield name
+
+    try:
+        yield _iterate()
+    finally:
+        db.info.pop("shard", None)
+
+
+def assign_ids(db: Session, allocator: IdAllocator) -> None:
+    """
+    Give pending contacts a globally unique id before they are flushed.
+
+    Args:
+        db (Session): SQLAlchemy session routed by a shard map.
+        allocator (IdAllocator): Allocator reserving ids on the primary.
+    """
+    for obj in db.new:
+        table = type(obj).__table__
+        # Only tables keyed by a contact id draw from the allocator (not e.g. contact_counters).
+        if table.name in SHARDED_TABLES and "id" in table.c and getattr(obj, "id", None) is None:
+            obj.id = allocator.next_id(db.bind)
+
+
+def create_shard_schema(engine: Engine) -> None:
+    """
+    Create the sharded tables on a shard database.
+
+    Foreign keys to the users table are left out because users live on the
+    primary database.
+
+    Args:
+        engine (Engine): Shard database engine.
+    """
+    from src.db import Base
+    import src.models  # noqa: F401
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in SHARDED_TABLES:
+                continue
+            conn.execute(CreateTable(table, include_foreign_key_constraints=[], if_not_exists=True))
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def move_owner(owner_id: int, source: Engine, target: Engine, primary: Engine) -> int:
+    """
+    Move all sharded rows of one owner from one shard to another.
+
+    Rows are first copied (replacing any leftovers from an interrupted run) and
+    only then deleted from the source, so the move can safely be retried. The
+    contact id counter is seeded past the moved ids before anything is written.
+
+    Args:
+        owner_id (int): ID of the contact owner.
+        source (Engine): Engine of the shard that currently holds the rows.
+        target (Engine): Engine of the destination shard.
+        primary (Engine): Primary database engine holding the contact id counter.
+
+    Returns:
+        int: Number of contact rows moved.
+    """
+    from src.db import Base
+    import src.models  # noqa: F401
+
+    if str(source.url) == str(target.url):
+        return 0
+    seed_contact_ids(primary, [source, target])
+    moved = 0
+    tables = [t for t in Base.metadata.sorted_tables if t.name in SHARDED_TABLES]
+    with source.connect() as src_conn, target.begin() as dst_conn:
+        for table in tables:
+            rows = [dict(r._mapping) for r in src_conn.execute(select(table).where(table.c.owner_id == owner_id))]
+            dst_conn.execute(delete(table).where(table.c.owner_id == owner_id))
+            if rows:
+                dst_conn.execute(insert(table), rows)
+            if table.name == "contacts":
+                moved = len(rows)
+    with source.begin() as src_conn:
+        for table in reversed(tables):
+            src_conn.execute(delete(table).where(table.c.owner_id == owner_id))
+    return moved
+
+
+def rebalance(old: ShardMap, new: ShardMap, primary: Engine) -> List[Tuple[int, str, str]]:
+    """
+    Move every owner whose shard changed between two shard maps.
+
+    The contact id counter is first seeded past the ids on the primary and
+    every shard of both maps, so ids moved off the primary are not reused.
+
+    Args:
+        old (ShardMap): Shard map the data is currently laid out with.
+        new (ShardMap): Shard map the data should be laid out with.
+        primary (Engine): Primary database engine holding the contact id counter.
+
+    Returns:
+        List[Tuple[int, str, str]]: ``(owner_id, source, target)`` for each moved owner.
+    """
+    from src.models import Contact
+
+    table = Contact.__table__
+    for engine in new.engines.values():
+        create_shard_schema(engine)
+    seed_contact_ids(primary, [*old.engines.values(), *new.engines.values()])
+    moves = []
+    for name, engine in old.engines.items():
+        with engine.connect() as conn:
+            owners = conn.execute(select(table.c.owner_id).distinct()).scalars().all()
+        for owner_id in owners:
+            target = new.shard_for(owner_id)
+            if new.urls[target] != old.urls[name]:
+                move_owner(owner_id, engine, new.engines[target], primary)
+                moves.append((owner_id, name, target))
+    return moves
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point for moving owners between shards."""
+    parser = argparse.ArgumentParser(description="Move contacts between shards")
+    parser.add_argument("--from", dest="old", required=True, help="Current SHARD_URLS value")
+    parser.add_argument("--to", dest="new", required=True, help="Target SHARD_URLS value")
+    parser.add_argument("--owner", type=int, help="Move a single owner only")
+    parser.add_argument("--primary", help="Primary database URL holding the contact id counter; defaults to DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    if args.primary:
+        primary = create_engine(args.primary, future=True)
+    else:
+        from src.db import engine as primary
+    old, new = ShardMap(parse_shard_urls(args.old)), ShardMap(parse_shard_urls(args.new))
+    if args.owner is not None:
+        source, target = old.shard_for(args.owner), new.shard_for(args.owner)
+        create_shard_schema(new.engines[target])
+        moved = move_owner(args.owner, old.engines[source], new.engines[target], primary)
+        print(f"owner {args.owner}: {source} -> {target} ({moved} contacts)")
+        return
+    for owner_id, source, target in rebalance(old, new, primary):
+        print(f"owner {owner_id}: {source} -> {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import Future
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import InstanceState, make_transient_to_detached
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller of a key runs the function; callers arriving while it is
+    in flight wait for it and get the same result or exception. Nothing is
+    cached: once the call returns, the next caller runs it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Run `fn`, or wait for the in-flight call with the same key.
+
+        Args:
+            key (Hashable): Identifies calls that are interchangeable.
+            fn (Callable[[], T]): The call to run.
+
+        Returns:
+            T: Result of the leading call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            call.set_exception(exc)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class _Detached:
+    """Column values of an ORM instance, copied while its session was not in use elsewhere."""
+
+    __slots__ = ("cls", "values")
+
+    def __init__(self, cls: type, values: Dict[str, Any]):
+        self.cls = cls
+        self.values = values
+
+
+def _detach(result: Any) -> Any:
+    if isinstance(result, list):
+        return [_detach(item) for item in result]
+    state = inspect(result, raiseerr=False)
+    if state is None or not isinstance(state, InstanceState):
+        return result
+    values = {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+    return _Detached(type(result), values)
+
+
+def _attach(db, result: Any) -> Any:
+    if isinstance(result, list):
+        return [_attach(db, item) for item in result]
+    if not isinstance(result, _Detached):
+        return result
+    obj = inspect(result.cls).class_manager.new_instance()
+    for key, value in result.values.items():
+        setattr(obj, key, value)
+    make_transient_to_detached(obj)
+    return db.merge(obj, load=False)
+
+
+def shared(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Let concurrent identical calls of a crud lookup share one query.
+
+    Calls are identical when all arguments after the session are equal; the
+    leader's session runs the query. The leader copies the loaded columns of
+    the ORM instances it returns, and every follower merges the copies into its
+    own session without querying, so no two sessions share an instance. Rows
+    and other plain results are shared as they are.
+
+    Args:
+        func (Callable[..., T]): Function taking a session first, then hashable arguments.
+
+    Returns:
+        Callable[..., T]: Wrapped function with the same signature.
+    """
+    flight = SingleFlight()
+
+    @wraps(func)
+    def wrapper(db, *args, **kwargs) -> Any:
+        led = []
+
+        def lead():
+            led.append(func(db, *args, **kwargs))
+            return _detach(led[0])
+
+        detached = flight.do((args, tuple(sorted(kwargs.items()))), lead)
+        return led[0] if led else _attach(db, detached)
+
+    wrapper.flight = flight
+    return wrapper
@@ -0,0 +1,199 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, select, tuple_
+from sqlalchemy.orm import Session
+
+from src import models
+from src.sharding import bind_owner, each_shard
+
+EPOCH = datetime(1970, 1, 1)
+
+_CHANGED = (
+    select(models.Contact)
+    .where(
+        models.Contact.owner_id == bindparam("owner_id"),
+        tuple_(models.Contact.updated_at, models.Contact.id) > tuple_(bindparam("after"), bindparam("after_id")),
+    )
+    .order_by(models.Contact.updated_at, models.Contact.id)
+    .limit(bindparam("limit"))
+)
+_DELETED = (
+    select(models.ContactTombstone.id, models.ContactTombstone.deleted_at)
+    .where(
+        models.ContactTombstone.owner_id == bindparam("owner_id"),
+        tuple_(models.ContactTombstone.deleted_at, models.ContactTombstone.id)
+        > tuple_(bindparam("after"), bindparam("after_id")),
+    )
+    .order_by(models.ContactTombstone.deleted_at, models.ContactTombstone.id)
+    .limit(bindparam("limit"))
+)
+_LAST_TOMBSTONE = (
+    select(models.ContactTombstone.deleted_at, models.ContactTombstone.id)
+    .where(models.ContactTombstone.owner_id == bindparam("owner_id"))
+    .order_by(models.ContactTombstone.deleted_at.desc(), models.ContactTombstone.id.desc())
+    .limit(1)
+)
+
+
+class SyncCursor(NamedTuple):
+    """
+    Position of a client in an owner's change history.
+
+    Attributes:
+        updated_at (datetime): `updated_at` of the last contact returned.
+        contact_id (int): ID of the last contact returned.
+        deleted_at (datetime): `deleted_at` of the last tombstone returned.
+        tombstone_id (int): ID of the last tombstone returned.
+        issued_at (datetime): When the token holding the cursor was issued.
+    """
+    updated_at: datetime
+    contact_id: int
+    deleted_at: datetime
+    tombstone_id: int
+    issued_at: datetime
+
+
+class SyncTokenError(ValueError):
+    """Raised for sync tokens that cannot be decoded."""
+
+
+class SyncTokenExpired(SyncTokenError):
+    """Raised for sync tokens older than the tombstone retention; the client must sync from scratch."""
+
+
+def encode_token(cursor: SyncCursor) -> str:
+    """
+    Encode a cursor as an opaque URL-safe token.
+
+    Args:
+        cursor (SyncCursor): Cursor to encode.
+
+    Returns:
+        str: Sync token.
+    """
+    raw = json.dumps([
+        cursor.updated_at.isoformat(), cursor.contact_id,
+        cursor.deleted_at.isoformat(), cursor.tombstone_id,
+        cursor.issued_at.isoformat(),
+    ], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(token: str, retention: timedelta) -> SyncCursor:
+    """
+    Decode a sync token.
+
+    Args:
+        token (str): Token returned by a previous sync.
+        retention (timedelta): How long tombstones are kept.
+
+    Raises:
+        SyncTokenError: If the token is malformed.
+        SyncTokenExpired: If the token is older than the retention, so
+            deletions may have been missed.
+
+    Returns:
+        SyncCursor: Decoded cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        updated_at, contact_id, deleted_at, tombstone_id, issued_at = json.loads(raw)
+        cursor = SyncCursor(
+            datetime.fromisoformat(updated_at), int(contact_id),
+            datetime.fromisoformat(deleted_at), int(tombstone_id),
+            datetime.fromisoformat(issued_at),
+        )
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise SyncTokenError("Invalid sync token") from exc
+    if cursor.issued_at < datetime.utcnow() - retention:
+        raise SyncTokenExpired("Sync token expired, perform a full sync")
+    return cursor
+
+
+def _capped(position: Tuple[datetime, int], horizon: datetime) -> Tuple[datetime, int]:
+    return min(position, (horizon, 0))
+
+
+def changes_since(
+    db: Session,
+    owner_id: int,
+    cursor: Optional[SyncCursor] = None,
+    limit: int = 500,
+    lag: timedelta = timedelta(0),
+) -> Tuple[List[models.Contact], List[int], SyncCursor, bool]:
+    """
+    Return an owner's contacts changed and deleted after a cursor.
+
+    Both lists are read in keyset order through the (owner_id, updated_at, id)
+    and (owner_id, deleted_at, id) indexes, so every page costs the same
+    regardless of how far into the history the client is. Without a cursor all
+    contacts are returned and deletions are tracked from now on.
+
+    Timestamps are taken when a row is flushed, not when it commits, so a
+    transaction that commits late can make rows appear behind a cursor that
+    already moved past them. Once a list is read to its end, its cursor is
+    therefore held back to `lag` before now, and the next sync reads that
+    window again; clients must apply changes idempotently.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        owner_id (int): ID of the contact owner.
+        cursor (Optional[SyncCursor]): Position returned by the previous sync.
+        limit (int, optional): Maximum number of contacts and of deletions returned. Defaults to 500.
+        lag (timedelta, optional): Longest time between stamping and committing a
+            change, including clock skew between servers. Defaults to 0.
+
+    Returns:
+        Tuple[List[Contact], List[int], SyncCursor, bool]: Changed contacts,
+        deleted contact IDs, the new cursor, and whether more changes are waiting.
+    """
+    bind_owner(db, owner_id)
+    if cursor is None:
+        last = db.execute(_LAST_TOMBSTONE, {"owner_id": owner_id}).first()
+        deleted_at, tombstone_id = (last.deleted_at, last.id) if last else (EPOCH, 0)
+        cursor = SyncCursor(EPOCH, 0, deleted_at, tombstone_id, datetime.utcnow())
+
+    changed = db.execute(_CHANGED, {
+        "owner_id": owner_id, "after": cursor.updated_at, "after_id": cursor.contact_id, "limit": limit + 1,
+    }).scalars().all()
+    deleted = db.execute(_DELETED, {
+        "owner_id": owner_id, "after": cursor.deleted_at, "after_id": cursor.tombstone_id, "limit": limit + 1,
+    }).all()
+    contacts_more, tombstones_more = len(changed) > limit, len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    now = datetime.utcnow()
+    contacts_at = (changed[-1].updated_at, changed[-1].id) if changed else cursor[:2]
+    tombstones_at = (deleted[-1].deleted_at, deleted[-1].id) if deleted else cursor[2:4]
+    if lag and not contacts_more:
+        contacts_at = _capped(contacts_at, now - lag)
+    if lag and not tombstones_more:
+        tombstones_at = _capped(tombstones_at, now - lag)
+    has_more = contacts_more or tombstones_more
+    next_cursor = SyncCursor(*contacts_at, *tombstones_at, now)
+    return changed, [row.id for row in deleted], next_cursor, has_more
+
+
+def purge_tombstones(db: Session, retention: timedelta) -> int:
+    """
+    Delete tombstones older than the retention period on every shard.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        retention (timedelta): How long tombstones are kept.
+
+    Returns:
+        int: Number of tombstones deleted.
+    """
+    cutoff = datetime.utcnow() - retention
+    purged = 0
+    with each_shard(db) as shards:
+        for _ in shards:
+            result = db.execute(delete(models.ContactTombstone).where(models.ContactTombstone.deleted_at < cutoff))
+            purged += result.rowcount
+            db.commit()
+    return purged
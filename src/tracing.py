@@ -0,0 +1,343 @@
+import inspect
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "contacts-api"
+HEADER = "x-trace-id"
+
+# OTLP span kinds.
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_MAX_STATEMENT = 1000
+
+
+class Trace:
+    """Spans recorded for one request; `spans` is shared with threadpool workers."""
+
+    __slots__ = ("trace_id", "sampled", "spans")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: int = INTERNAL, attributes=None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.error: Optional[str] = None
+        self.start = time.time_ns()
+        self.end = 0
+
+    def finish(self) -> None:
+        """Record the end time and add the span to its trace."""
+        self.end = time.time_ns()
+        self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        """Convert the span to its OTLP/JSON representation."""
+        data = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("tracing_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    """Return the trace ID of the current request, or None outside a request."""
+    span = _current.get()
+    return span.trace.trace_id if span is not None else None
+
+
+def _recording_parent() -> Optional[Span]:
+    parent = _current.get()
+    return parent if parent is not None and parent.trace.sampled else None
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Record a child span of the current span for the duration of the block.
+
+    Outside a sampled request this yields None and records nothing, so the
+    instrumented code costs one context variable lookup.
+
+    Args:
+        name (str): Span name, e.g. "bcrypt.verify".
+        kind (int, optional): OTLP span kind. Defaults to INTERNAL.
+        **attributes: Span attributes.
+
+    Yields:
+        Optional[Span]: The recorded span, or None when not tracing.
+    """
+    parent = _recording_parent()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.error = repr(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    parent = _recording_parent()
+    if parent is not None and context is not None:
+        context._trace_span = Span(parent.trace, f"db {statement.split(None, 1)[0].upper()}", parent.span_id, CLIENT, {
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:_MAX_STATEMENT],
+        })
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    statement_span = getattr(context, "_trace_span", None)
+    if statement_span is not None:
+        context._trace_span = None
+        statement_span.finish()
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_statement(exception_context):
+    statement_span = getattr(exception_context.execution_context, "_trace_span", None)
+    if statement_span is not None:
+        exception_context.execution_context._trace_span = None
+        statement_span.error = repr(exception_context.original_exception)
+        statement_span.finish()
+
+
+def _traced_command(execute_command):
+    if inspect.iscoroutinefunction(execute_command):
+        @wraps(execute_command)
+        async def traced(*args, **options):
+            with span(f"redis {args[0]}", CLIENT, **{"db.system": "redis"}):
+                return await execute_command(*args, **options)
+    else:
+        @wraps(execute_command)
+        def traced(*args, **options):
+            with span(f"redis {args[0]}", CLIENT, **{"db.system": "redis"}):
+                return execute_command(*args, **options)
+    return traced
+
+
+def _traced_pipeline(pipeline):
+    @wraps(pipeline)
+    def traced(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+        if inspect.iscoroutinefunction(execute):
+            async def traced_execute(*a, **kw):
+                with span("redis pipeline", CLIENT, **{"db.system": "redis", "db.redis.commands": len(pipe)}):
+                    return await execute(*a, **kw)
+        else:
+            def traced_execute(*a, **kw):
+                with span("redis pipeline", CLIENT, **{"db.system": "redis", "db.redis.commands": len(pipe)}):
+                    return execute(*a, **kw)
+        pipe.execute = traced_execute
+        return pipe
+    return traced
+
+
+def instrument_redis(client):
+    """
+    Record a span for every command and pipeline sent through a Redis client.
+
+    Only command names are recorded, never keys or values.
+
+    Args:
+        client: Synchronous or asyncio redis-py client.
+
+    Returns:
+        The same client, instrumented in place.
+    """
+    client.execute_command = _traced_command(client.execute_command)
+    client.pipeline = _traced_pipeline(client.pipeline)
+    return client
+
+
+def parse_traceparent(value: Optional[str]):
+    """
+    Parse a W3C `traceparent` header.
+
+    Args:
+        value (Optional[str]): Header value.
+
+    Returns:
+        Optional[Tuple[str, str, bool]]: Trace ID, parent span ID and sampled
+        flag, or None when the header is missing or malformed.
+    """
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+_queue: "queue.SimpleQueue[Optional[List[Span]]]" = queue.SimpleQueue()
+_exporter: Optional[threading.Thread] = None
+
+
+def _export_request(spans: List[Span]) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": [item.to_otlp() for item in spans]}],
+    }]}
+
+
+def _run_exporter(path: str, url: Optional[str]) -> None:
+    while True:
+        spans = _queue.get()
+        if spans is None:
+            return
+        body = json.dumps(_export_request(spans), separators=(",", ":"))
+        try:
+            if url:
+                request = urllib.request.Request(
+                    url, data=body.encode(), headers={"Content-Type": "application/json"}, method="POST"
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write(body + "\n")
+        except Exception as exc:
+            logger.warning("Could not export trace %s: %r", spans[0].trace.trace_id, exc)
+
+
+def start() -> None:
+    """
+    Start the background thread exporting finished traces.
+
+    Each trace is sent as an OTLP/JSON ExportTraceServiceRequest, POSTed to
+    TRACE_EXPORT_URL when set and otherwise appended as one line to
+    TRACE_EXPORT_PATH, the layout of the OpenTelemetry collector's file
+    exporter.
+    """
+    global _exporter
+    if _exporter is not None:
+        return
+    _exporter = threading.Thread(
+        target=_run_exporter, args=(settings.TRACE_EXPORT_PATH, settings.TRACE_EXPORT_URL),
+        name="trace-exporter", daemon=True,
+    )
+    _exporter.start()
+
+
+def stop() -> None:
+    """Export queued traces and stop the exporter thread."""
+    global _exporter
+    if _exporter is None:
+        return
+    _queue.put(None)
+    _exporter.join()
+    _exporter = None
+
+
+class TracingMiddleware:
+    """
+    Trace requests and return their trace ID.
+
+    Every response carries `X-Trace-Id` and a W3C `traceparent` header; an
+    incoming `traceparent` continues the caller's trace. Spans are recorded
+    for requests the caller marked as sampled and for a TRACE_SAMPLE_RATE
+    fraction of the rest, then handed to the exporter thread.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        rate = settings.TRACE_SAMPLE_RATE
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = f"{random.getrandbits(128):032x}", None, False
+        sampled = _exporter is not None and (sampled or rate >= 1 or random.random() < rate)
+        root = Span(Trace(trace_id, sampled), scope["method"], parent_id, SERVER, {
+            "http.method": scope["method"], "http.target": scope["path"],
+        })
+        response_headers = [
+            (HEADER.encode(), trace_id.encode()),
+            (b"traceparent", f"00-{trace_id}-{root.span_id}-{'01' if sampled else '00'}".encode()),
+        ]
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), *response_headers]
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as exc:
+            root.error = repr(exc)
+            raise
+        finally:
+            _current.reset(token)
+            if sampled:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    root.name = f"{scope['method']} {route}"
+                    root.attributes["http.route"] = route
+                if root.attributes.get("http.status_code", 500) >= 500 and root.error is None:
+                    root.error = "server error"
+                root.finish()
+                _queue.put(root.trace.spans)
@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# Numeric values of the state gauge.
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing dependency and probe it until it recovers.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    calls fail immediately with `CircuitOpenError`. Once `reset_timeout`
+    seconds have passed it half-opens and lets a single probe through: success
+    closes it, failure opens it again. Safe to share between the event loop
+    and threadpool threads.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.counters = {"failures": 0, "rejected": 0, "opened": 0}
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a call may be attempted now, half-opening the breaker when due."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call."""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the breaker at the threshold or after a failed probe."""
+        with self._lock:
+            self.failures += 1
+            self.counters["failures"] += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.counters["opened"] += 1
+
+    def release(self) -> None:
+        """Let another probe through after one ended without an outcome, e.g. when it was cancelled."""
+        with self._lock:
+            self._probing = False
+
+    async def call(self, fn: Callable[..., Awaitable[T]], *args: Any, timeout: Optional[float] = None) -> T:
+        """
+        Await `fn(*args)` through the breaker.
+
+        Args:
+            fn (Callable[..., Awaitable[T]]): Coroutine function to call.
+            *args: Arguments for `fn`.
+            timeout (Optional[float]): Seconds before the call fails with TimeoutError.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+
+        Returns:
+            T: Result of the call. Its exceptions, and TimeoutError, count as failures and
+            propagate; cancellation does not count but frees the probe slot.
+        """
+        import anyio
+
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            if timeout is None:
+                result = await fn(*args)
+            else:
+                with anyio.fail_after(timeout):
+                    result = await fn(*args)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    def call_sync(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Call a blocking `fn(*args)` through the breaker; timeouts belong to the client.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+
+        Returns:
+            T: Result of the call. Its exceptions count as failures and propagate.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = fn(*args)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return the state and counters for monitoring."""
+        with self._lock:
+            return {"state": self.state, **self.counters}
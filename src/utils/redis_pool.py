@@ -1,8 +1,33 @@
 import os
-from redis.asyncio import Redis, from_url
+
+from src.settings import settings
+from src.utils.circuit_breaker import CircuitBreaker
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 _redis = None
+_sync_redis = None
+_redis_breaker = None
+
+
+def get_redis_breaker() -> CircuitBreaker:
+    """
+    Get the circuit breaker shared by the request paths that can do without Redis.
+
+    It is created on first use from REDIS_BREAKER_FAILURES and
+    REDIS_BREAKER_RESET_SECONDS.
+
+    Returns:
+        CircuitBreaker: Process wide Redis circuit breaker.
+    """
+    global _redis_breaker
+    if _redis_breaker is None:
+        _redis_breaker = CircuitBreaker(
+            "redis",
+            failure_threshold=settings.REDIS_BREAKER_FAILURES,
+            reset_timeout=settings.REDIS_BREAKER_RESET_SECONDS,
+        )
+    return _redis_breaker
+
 
 def get_redis():
     """
@@ -16,6 +41,33 @@ def get_redis():
     """
     global _redis
     if _redis is None:
-        _redis = from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+        from redis.asyncio import from_url
+
+        from src.tracing import instrument_redis
+
+        _redis = instrument_redis(from_url(REDIS_URL, encoding="utf-8", decode_responses=True))
     return _redis
 
+
+
+def get_sync_redis():
+    """
+    Get a singleton synchronous Redis client instance.
+
+    Used from synchronous code such as the crud functions, which run in the
+    threadpool. Short socket timeouts keep a slow Redis from stalling writes.
+
+    Returns:
+        redis.Redis: Synchronous Redis client instance.
+    """
+    global _sync_redis
+    if _sync_redis is None:
+        from redis import from_url
+
+        from src.tracing import instrument_redis
+
+        _sync_redis = instrument_redis(from_url(
+            REDIS_URL, encoding="utf-8", decode_responses=True,
+            socket_connect_timeout=1, socket_timeout=1,
+        ))
+    return _sync_redis
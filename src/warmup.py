@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Dict
+
+from starlette.concurrency import run_in_threadpool
+
+from src import crud
+from src.db import SessionLocal, engine, get_shard_map
+from src.revocation import revocations, token_versions
+from src.security import verify_password
+from src.settings import settings
+from src.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# bcrypt hash of "warmup", verified once so the bcrypt backend is loaded before traffic.
+WARMUP_HASH = "$2b$12$3woE4oTSDK2vdFNZMG6iBOHdKZyeEYoyngcIHhf/HhnpC.1HuRTWa"
+
+
+def warm_db_pool(connections: int) -> None:
+    """
+    Open connections to the primary database (and every shard) and return them to the pool.
+
+    Args:
+        connections (int): Number of connections to open per engine.
+    """
+    shard_map = get_shard_map()
+    engines = [engine] + (list(shard_map.engines.values()) if shard_map else [])
+    for target in engines:
+        opened = [target.connect() for _ in range(connections)]
+        for conn in opened:
+            conn.close()
+
+
+async def warm_redis_pool(connections: int) -> None:
+    """
+    Open Redis connections by issuing concurrent PINGs.
+
+    Args:
+        connections (int): Number of connections to open.
+    """
+    redis = get_redis()
+    await asyncio.gather(*(redis.ping() for _ in range(connections)))
+
+
+def warm_password_hashing() -> None:
+    """Load the bcrypt backend by verifying a known hash once."""
+    verify_password("warmup", WARMUP_HASH)
+
+
+def warm_queries() -> None:
+    """Run the hot crud queries once so SQLAlchemy compiles and caches their statements."""
+    db = SessionLocal()
+    try:
+        crud.get_user_by_email(db, "warmup@example.invalid")
+        crud.get_user_by_id(db, 0)
+        crud.get_contact(db, 0, owner_id=0)
+        crud.search_contacts(db, owner_id=0)
+        crud.search_contacts(db, owner_id=0, q="warmup")
+    finally:
+        db.close()
+
+
+async def warm_up() -> Dict[str, str]:
+    """
+    Run all warm-up steps, recording the outcome of each one.
+
+    A failing step is logged and reported but does not stop the others, so a
+    missing Redis does not keep the database-backed routes from serving.
+
+    Returns:
+        Dict[str, str]: Step name mapped to "ok" or the error message.
+    """
+    steps = {
+        "database": lambda: run_in_threadpool(warm_db_pool, settings.WARMUP_DB_CONNECTIONS),
+        "redis": lambda: asyncio.wait_for(
+            warm_redis_pool(settings.WARMUP_REDIS_CONNECTIONS), settings.WARMUP_TIMEOUT
+        ),
+        "password_hashing": lambda: run_in_threadpool(warm_password_hashing),
+        "queries": lambda: run_in_threadpool(warm_queries),
+        "revocations": lambda: asyncio.wait_for(revocations.reload(), settings.WARMUP_TIMEOUT),
+        "token_versions": lambda: run_in_threadpool(token_versions.reload),
+    }
+    checks = {}
+    for name, step in steps.items():
+        try:
+            await step()
+            checks[name] = "ok"
+        except Exception as exc:
+            logger.warning("Warm-up step %s failed: %r", name, exc)
+            checks[name] = f"error: {exc!r}"
+    return checks
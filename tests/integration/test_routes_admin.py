@@ -0,0 +1,95 @@
+import uuid
+
+import fakeredis
+import pytest
+from asgi_lifespan import LifespanManager
+from httpx import AsyncClient
+
+from src import models
+from src.db import SessionLocal
+from src.main import app
+from src.settings import settings
+from src.utils import redis_pool
+
+
+async def _login(ac, role):
+    email = f"{uuid.uuid4().hex[:6]}@test.com"
+    await ac.post("/auth/register", json={"email": email, "password": "pass123"})
+    db = SessionLocal()
+    try:
+        db.query(models.User).filter(models.User.email == email).update({"role": role})
+        db.commit()
+    finally:
+        db.close()
+    resp = await ac.post("/auth/login", data={"username": email, "password": "pass123"})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+@pytest.mark.anyio
+async def test_admin_can_profile_a_request(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_pool, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    async with LifespanManager(app):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            user = await _login(ac, "user")
+            resp = await ac.get("/contacts/", headers={**user, "X-Profile": "1"})
+            assert resp.status_code == 200
+            assert "x-profile-id" not in resp.headers
+
+            admin = await _login(ac, "admin")
+            resp = await ac.get("/contacts/", headers={**admin, "X-Profile": "1"})
+            assert resp.status_code == 200
+            profile_id = resp.headers["x-profile-id"]
+
+            listed = (await ac.get("/admin/profiles", headers=admin)).json()
+            assert listed[0]["id"] == profile_id
+            assert listed[0]["request"] == "GET /contacts/"
+
+            resp = await ac.get(f"/admin/profiles/{profile_id}", headers=admin)
+            assert resp.status_code == 200
+            assert resp.json()["$schema"].startswith("https://www.speedscope.app")
+            assert (await ac.get(f"/admin/profiles/{profile_id}", headers=user)).status_code == 403
+
+
+@pytest.mark.anyio
+async def test_sampled_requests_are_profiled_without_telling_the_client(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_pool, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    async with LifespanManager(app):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            user = await _login(ac, "user")
+            admin = await _login(ac, "admin")
+            monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1)
+            resp = await ac.get("/contacts/", headers=user)
+            monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0)
+            assert "x-profile-id" not in resp.headers
+
+            listed = (await ac.get("/admin/profiles", headers=admin)).json()
+            assert listed[0]["request"] == "GET /contacts/"
+            assert listed[0]["sampled"]
+
+
+@pytest.mark.anyio
+async def test_admin_analytics(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_pool, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await _login(ac, "user")
+        admin = await _login(ac, "admin")
+        assert (await ac.get("/admin/analytics/verification", headers=user)).status_code == 403
+
+        for report in ("contacts-per-user", "verification", "birthdays-by-month"):
+            resp = await ac.get(f"/admin/analytics/{report}", headers=admin)
+            assert resp.status_code == 200
+            assert resp.json() == (await ac.get(f"/admin/analytics/{report}", headers=admin)).json()
+        assert len((await ac.get("/admin/analytics/birthdays-by-month", headers=admin)).json()) == 12
+
+        timeline = (await ac.get("/admin/analytics/signups", params={"days": 7}, headers=admin)).json()
+        assert len(timeline) == 7
+        assert timeline[-1]["signups"] >= 2
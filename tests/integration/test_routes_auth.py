@@ -53,3 +53,28 @@ async def test_register_and_login():
             nonexistent_login = {"username": "noone@test.com", "password": "123456"}
             response_nonexistent = await client.post("/auth/login", data=nonexistent_login)
             assert response_nonexistent.status_code == 401
+
+
+@pytest.mark.anyio("asyncio")
+async def test_password_reset_is_single_use_with_and_without_redis(monkeypatch):
+    import fakeredis
+    from src.utils import redis_pool
+    from src.utils.circuit_breaker import CircuitBreaker
+
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(decode_responses=True))
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.post("/auth/register", json={"email": "reset@example.com", "password": "123456"})
+
+        for breaker_open in (False, True):
+            if breaker_open:
+                breaker = CircuitBreaker("redis", failure_threshold=1, reset_timeout=60)
+                breaker.record_failure()
+                monkeypatch.setattr(redis_pool, "_redis_breaker", breaker)
+            resp = await client.post("/auth/password-reset-request", json={"email": "reset@example.com"})
+            token = resp.json()["reset_token"]
+            reset = {"token": token, "password": f"new-{breaker_open}"}
+            assert (await client.post("/auth/password-reset", json=reset)).status_code == 200
+            assert (await client.post("/auth/password-reset", json=reset)).status_code == 400
+
+        login = {"username": "reset@example.com", "password": "new-True"}
+        assert (await client.post("/auth/login", data=login)).status_code == 200
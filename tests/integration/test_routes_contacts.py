@@ -1,8 +1,11 @@
 import pytest
 import uuid
+import fakeredis
+import msgpack
 from httpx import AsyncClient
 from asgi_lifespan import LifespanManager
 from src.main import app
+from src.utils import redis_pool
 
 @pytest.mark.anyio
 async def test_crud_contacts():
@@ -38,11 +41,27 @@ async def test_crud_contacts():
             assert resp.status_code == 201
             contact_id = resp.json()["id"]
 
+            resp = await ac.get("/contacts/", headers=headers)
+            assert resp.status_code == 200
+            assert resp.headers["X-Total-Count"] == "1"
+            listed = resp.json()
+
+            resp = await ac.get("/contacts/", headers={**headers, "Accept": "application/msgpack"})
+            assert resp.headers["content-type"] == "application/msgpack"
+            assert msgpack.unpackb(resp.content) == listed
+
             
             resp = await ac.get(f"/contacts/{contact_id}", headers=headers)
             assert resp.status_code == 200
             assert resp.json()["first_name"] == "John"
 
+            resp = await ac.get("/contacts/", params={"fields": "first_name,phone"}, headers=headers)
+            assert resp.json() == [{"first_name": "John", "phone": "123456", "id": contact_id}]
+            resp = await ac.get(f"/contacts/{contact_id}", params={"fields": "last_name"}, headers=headers)
+            assert resp.json() == {"last_name": "Doe", "id": contact_id}
+            resp = await ac.get("/contacts/", params={"fields": "hashed_password"}, headers=headers)
+            assert resp.status_code == 400
+
             
             resp = await ac.put(f"/contacts/{contact_id}", json={"first_name": "Jane"}, headers=headers)
             assert resp.status_code == 200
@@ -55,3 +74,51 @@ async def test_crud_contacts():
             
             resp = await ac.get(f"/contacts/{contact_id}", headers=headers)
             assert resp.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_logout_revokes_token(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_pool, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    async with LifespanManager(app):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            email = f"{uuid.uuid4().hex[:6]}@test.com"
+            await ac.post("/auth/register", json={"email": email, "password": "pass123"})
+            login_resp = await ac.post("/auth/login", data={"username": email, "password": "pass123"})
+            headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+            assert (await ac.get("/contacts/", headers=headers)).status_code == 200
+            assert (await ac.post("/auth/logout", headers=headers)).status_code == 200
+            assert (await ac.get("/contacts/", headers=headers)).status_code == 401
+
+
+@pytest.mark.anyio
+async def test_create_contact_idempotency_key(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_pool, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        email = f"{uuid.uuid4().hex[:6]}@test.com"
+        await ac.post("/auth/register", json={"email": email, "password": "pass123"})
+        token = (await ac.post("/auth/login", data={"username": email, "password": "pass123"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": uuid.uuid4().hex}
+        contact = {
+            "first_name": "Retry", "last_name": "Me", "email": f"retry-{uuid.uuid4().hex[:6]}@test.com",
+            "phone": "123456", "birthday": "2000-01-01",
+        }
+
+        first = await ac.post("/contacts/", json=contact, headers=headers)
+        retry = await ac.post("/contacts/", json=contact, headers=headers)
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert first.headers["idempotent-replayed"] == "false"
+        assert retry.headers["idempotent-replayed"] == "true"
+
+        resp = await ac.post("/contacts/", json={**contact, "first_name": "Other"}, headers=headers)
+        assert resp.status_code == 422
+
+        resp = await ac.post("/contacts/", json=contact, headers={"Authorization": headers["Authorization"]})
+        assert resp.status_code == 409
@@ -0,0 +1,38 @@
+import pytest
+from httpx import AsyncClient
+from asgi_lifespan import LifespanManager
+from src.main import app
+
+
+@pytest.mark.anyio
+async def test_live_and_ready_before_warmup():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        resp = await ac.get("/live")
+        assert resp.status_code == 200
+        assert resp.json() == {"status": "alive"}
+
+        resp = await ac.get("/ready")
+        assert resp.status_code == 503
+
+
+@pytest.mark.anyio
+async def test_ready_after_warmup():
+    async with LifespanManager(app):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            resp = await ac.get("/ready")
+            assert resp.status_code == 200
+            checks = resp.json()["checks"]
+            assert checks["database"] == "ok"
+            assert checks["password_hashing"] == "ok"
+            assert checks["queries"] == "ok"
+            assert "redis" in checks
+
+
+@pytest.mark.anyio
+async def test_metrics_expose_redis_circuit_state():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        resp = await ac.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert "\nredis_circuit_state " in resp.text
+        assert "redis_circuit_opened_total" in resp.text
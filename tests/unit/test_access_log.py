@@ -0,0 +1,83 @@
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+from sqlalchemy import create_engine, text
+
+from src import access_log
+from src.settings import settings
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _app():
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        access_log.set_user(7)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    @app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404)
+
+    app.add_middleware(access_log.AccessLogMiddleware)
+    return app
+
+
+@pytest.fixture
+def records(monkeypatch):
+    handler = _Records()
+    logger = logging.getLogger("access")
+    monkeypatch.setattr(logger, "level", logging.INFO)
+    logger.addHandler(handler)
+    logger.manager._clear_cache()
+    yield handler.records
+    logger.removeHandler(handler)
+    logger.manager._clear_cache()
+
+
+@pytest.mark.anyio
+async def test_logs_route_status_user_and_query_count(records):
+    async with AsyncClient(app=_app(), base_url="http://test") as ac:
+        assert (await ac.get("/items/3")).status_code == 200
+
+    [record] = records
+    assert record.levelno == logging.INFO
+    assert record.route == "/items/{item_id}"
+    assert record.path == "/items/3"
+    assert record.status == 200
+    assert record.user_id == 7
+    assert record.db_queries == 2
+    assert record.latency_ms >= 0
+
+    entry = json.loads(access_log.JsonFormatter().format(record))
+    assert entry["route"] == "/items/{item_id}"
+    assert entry["level"] == "INFO"
+
+
+@pytest.mark.anyio
+async def test_sampling_keeps_failed_requests(records, monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    async with AsyncClient(app=_app(), base_url="http://test") as ac:
+        await ac.get("/items/3")
+        await ac.get("/missing")
+
+    [record] = records
+    assert record.levelno == logging.WARNING
+    assert record.status == 404
+    assert record.user_id is None
@@ -0,0 +1,74 @@
+from datetime import date, datetime
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import analytics, crud, models, schemas
+from src.db import Base
+from src.settings import settings
+from src.utils import redis_pool
+
+TODAY = date(2026, 3, 10)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_pool, "_sync_redis", fake)
+    return fake
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def _user(db, email, contacts=0, verified=False, created_at=None):
+    user = models.User(email=email, hashed_password="x", is_verified=verified, created_at=created_at)
+    db.add(user)
+    db.commit()
+    for n in range(contacts):
+        crud.create_contact(db, schemas.ContactCreate(
+            first_name="A", last_name="B", email=f"{n}.{email}", phone="1", birthday=date(1990, 1 + n, 1),
+        ), owner_id=user.id)
+    return user
+
+
+def test_reports(db, redis):
+    _user(db, "a@test.com", contacts=2, verified=True, created_at=datetime(2026, 3, 9, 12))
+    _user(db, "b@test.com", contacts=2, created_at=datetime(2026, 3, 10, 8))
+    _user(db, "c@test.com", contacts=3, created_at=datetime(2026, 1, 1))
+    _user(db, "d@test.com")
+
+    assert analytics.contacts_per_user(db) == [{"contacts": 2, "users": 2}, {"contacts": 3, "users": 1}]
+    assert analytics.signup_timeline(db, days=3, today=TODAY) == [
+        {"date": "2026-03-08", "signups": 0},
+        {"date": "2026-03-09", "signups": 1},
+        {"date": "2026-03-10", "signups": 1},
+    ]
+    assert analytics.verification(db) == {"verified": 1, "unverified": 3, "ratio": 0.25}
+    months = analytics.birthdays_by_month(db)
+    assert len(months) == 12
+    assert months[0] == {"month": 1, "contacts": 3}
+    assert months[2] == {"month": 3, "contacts": 1}
+    assert months[11] == {"month": 12, "contacts": 0}
+
+
+def test_cached_reports_are_reused_until_expiry(redis):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    assert analytics.cached("test", compute) == {"value": 1}
+    assert analytics.cached("test", compute) == {"value": 1}
+    assert 0 < redis.ttl("analytics:test") <= settings.ANALYTICS_CACHE_TTL
+    redis.delete("analytics:test")
+    assert analytics.cached("test", compute) == {"value": 2}
@@ -0,0 +1,69 @@
+from datetime import date
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import autocomplete, crud, models, schemas
+from src.db import Base
+from src.utils import redis_pool
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_pool, "_sync_redis", fake)
+    return fake
+
+
+@pytest.fixture
+def owner():
+    db = TestingSessionLocal()
+    user = models.User(email=f"ac{id(db)}@test.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    yield db, user.id
+    db.close()
+
+
+def _create(db, owner_id, first, last, email):
+    contact_in = schemas.ContactCreate(first_name=first, last_name=last, email=email, phone="1", birthday=date(1990, 1, 1))
+    return crud.create_contact(db, contact_in, owner_id=owner_id)
+
+
+def test_complete_builds_index_and_follows_writes(redis, owner):
+    db, owner_id = owner
+    alice = _create(db, owner_id, "Alice", "Smith", "alice@ac.com")
+    _create(db, owner_id, "Олена", "Коваль", "olena@ac.com")
+
+    assert [s["id"] for s in autocomplete.complete(db, owner_id, "ali")] == [alice.id]
+    assert [s["first_name"] for s in autocomplete.complete(db, owner_id, "ол")] == ["Олена"]
+    assert redis.exists(f"autocomplete:{owner_id}")
+
+    bob = _create(db, owner_id, "Bob", "Alison", "bob@ac.com")
+    assert {s["id"] for s in autocomplete.complete(db, owner_id, "ALI")} == {alice.id, bob.id}
+
+    crud.update_contact(db, alice.id, schemas.ContactUpdate(first_name="Zoe", email="zoe@ac.com"), owner_id=owner_id)
+    assert [s["id"] for s in autocomplete.complete(db, owner_id, "ali")] == [bob.id]
+    assert [s["first_name"] for s in autocomplete.complete(db, owner_id, "zoe smi")] == ["Zoe"]
+
+    crud.delete_contact(db, bob.id, owner_id=owner_id)
+    assert autocomplete.complete(db, owner_id, "ali") == []
+
+
+def test_complete_falls_back_to_sql_without_redis(monkeypatch, owner):
+    db, owner_id = owner
+
+    class DownRedis:
+        def __getattr__(self, name):
+            raise RedisConnectionError("Redis down")
+
+    monkeypatch.setattr(redis_pool, "_sync_redis", DownRedis())
+    contact = _create(db, owner_id, "Fallback", "User", "fallback@ac.com")
+    assert [s["id"] for s in autocomplete.complete(db, owner_id, "fall")] == [contact.id]
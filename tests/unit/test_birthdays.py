@@ -0,0 +1,106 @@
+import uuid
+from datetime import date
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import birthdays, crud, models, schemas
+from src.db import Base
+from src.utils import redis_pool
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+TODAY = date(2026, 3, 10)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_pool, "_sync_redis", fake)
+    return fake
+
+
+@pytest.fixture
+def owner():
+    db = TestingSessionLocal()
+    user = models.User(email=f"bd{uuid.uuid4().hex}@test.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    yield db, user.id
+    db.close()
+
+
+def _create(db, owner_id, name, birthday):
+    contact_in = schemas.ContactCreate(
+        first_name=name, last_name="Bday", email=f"{name}{owner_id}@test.com", phone="1", birthday=birthday
+    )
+    return crud.create_contact(db, contact_in, owner_id=owner_id)
+
+
+def test_digest_is_cached_and_invalidated_on_change(redis, owner):
+    db, owner_id = owner
+    _create(db, owner_id, "later", date(1990, 3, 15))
+    soon = _create(db, owner_id, "soon", date(1985, 3, 11))
+    _create(db, owner_id, "never", date(1990, 9, 1))
+
+    result = birthdays.upcoming(db, owner_id, days=7, today=TODAY)
+    assert [(c["first_name"], c["in_days"]) for c in result] == [("soon", 1), ("later", 5)]
+    assert redis.exists(f"birthdays:{owner_id}")
+    assert [c["first_name"] for c in birthdays.upcoming(db, owner_id, days=2, today=TODAY)] == ["soon"]
+
+    crud.update_contact(db, soon.id, schemas.ContactUpdate(birthday=date(1985, 8, 1)), owner_id=owner_id)
+    assert not redis.exists(f"birthdays:{owner_id}")
+    assert [c["first_name"] for c in birthdays.upcoming(db, owner_id, days=7, today=TODAY)] == ["later"]
+
+
+def test_stale_digest_is_recomputed(redis, owner):
+    db, owner_id = owner
+    _create(db, owner_id, "today", date(2000, 3, 10))
+    birthdays.upcoming(db, owner_id, today=date(2026, 3, 1))
+
+    result = birthdays.upcoming(db, owner_id, days=0, today=TODAY)
+    assert [c["first_name"] for c in result] == ["today"]
+
+
+def test_digest_computed_before_a_change_is_not_stored(redis, owner, monkeypatch):
+    db, owner_id = owner
+    contact = _create(db, owner_id, "moved", date(1990, 3, 12))
+    query = crud.get_upcoming_birthdays
+
+    def change_during_query(*args, **kwargs):
+        result = query(*args, **kwargs)
+        crud.update_contact(db, contact.id, schemas.ContactUpdate(birthday=date(1990, 8, 1)), owner_id=owner_id)
+        return result
+
+    monkeypatch.setattr(crud, "get_upcoming_birthdays", change_during_query)
+    birthdays.upcoming(db, owner_id, days=7, today=TODAY)
+    assert not redis.exists(f"birthdays:{owner_id}")
+
+    monkeypatch.setattr(crud, "get_upcoming_birthdays", query)
+    assert birthdays.upcoming(db, owner_id, days=7, today=TODAY) == []
+    assert redis.exists(f"birthdays:{owner_id}")
+
+
+def test_build_digests_precomputes_every_owner(redis, owner):
+    db, owner_id = owner
+    _create(db, owner_id, "built", date(1990, 3, 12))
+    redis.flushall()
+
+    assert birthdays.build_digests(db, today=TODAY) >= 1
+    assert "built" in redis.get(f"birthdays:{owner_id}")
+
+
+def test_upcoming_falls_back_to_sql_when_redis_is_down(redis, monkeypatch, owner):
+    class Down:
+        def mget(self, keys):
+            raise RedisConnectionError("down")
+
+    db, owner_id = owner
+    _create(db, owner_id, "offline", date(1990, 3, 10))
+    monkeypatch.setattr(redis_pool, "_sync_redis", Down())
+    assert [c["first_name"] for c in birthdays.upcoming(db, owner_id, days=0, today=TODAY)] == ["offline"]
@@ -0,0 +1,58 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from src import changefeed
+from src.utils import redis_pool
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_pool, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(changefeed, "feed", changefeed.ChangeFeed(queue_size=2))
+    return server
+
+
+@pytest.mark.anyio
+async def test_reconnect_replays_missed_events(fake_redis):
+    first = changefeed.publish(1, "created", {"id": 10})
+    second = changefeed.publish(1, "deleted", {"id": 10})
+    changefeed.publish(2, "created", {"id": 20})
+
+    events = changefeed.stream(1, last_event_id=first)
+    assert await events.__anext__() == f"retry: {changefeed.RETRY_MS}\n\n"
+    assert await events.__anext__() == changefeed.format_event(second, "deleted", '{"id":10}')
+    await events.aclose()
+    await changefeed.feed.close()
+
+
+@pytest.mark.anyio
+async def test_live_events_reach_open_streams(fake_redis):
+    events = changefeed.stream(1)
+    await events.__anext__()
+    next_event = asyncio.ensure_future(events.__anext__())
+    # Publish only once the listener has subscribed; earlier events are not delivered live.
+    for _ in range(100):
+        if await redis_pool.get_redis().pubsub_numpat():
+            break
+        await asyncio.sleep(0.05)
+
+    event_id = changefeed.publish(1, "updated", {"id": 10, "first_name": "Ann"})
+    message = await asyncio.wait_for(next_event, 5)
+    assert message == changefeed.format_event(event_id, "updated", '{"id":10,"first_name":"Ann"}')
+    await events.aclose()
+    await changefeed.feed.close()
+
+
+@pytest.mark.anyio
+async def test_slow_stream_is_closed(fake_redis):
+    feed = changefeed.feed
+    queue = feed.subscribe(1)
+    for n in range(3):
+        feed._dispatch({"channel": "contacts:changes:1", "data": f'["1-{n}", "created", "{{}}"]'})
+    assert queue.get_nowait() is None
+    assert 1 not in feed._subscribers
+    await feed.close()
@@ -0,0 +1,137 @@
+import uuid
+
+import anyio
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src import models
+from src.db import SessionLocal
+from src.dependencies import auth
+from src.revocation import revocations
+from src.security import create_access_token
+from src.settings import settings
+from src.utils import redis_pool
+from src.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from src.utils.local_cache import LocalCache
+
+
+def _fail():
+    raise RedisConnectionError("down")
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("src.utils.circuit_breaker.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=5)
+
+    for _ in range(2):
+        with pytest.raises(RedisConnectionError):
+            breaker.call_sync(_fail)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call_sync(lambda: "never called")
+
+    clock[0] += 5
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock[0] += 5
+    assert breaker.call_sync(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+    assert breaker.metrics() == {"state": CLOSED, "failures": 3, "rejected": 2, "opened": 2}
+
+
+@pytest.mark.anyio
+async def test_slow_calls_time_out_and_count_as_failures():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+
+    async def slow():
+        await anyio.sleep(1)
+
+    with pytest.raises(TimeoutError):
+        await breaker.call(slow, timeout=0.01)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.anyio
+async def test_cancelled_probe_frees_the_half_open_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    with pytest.raises(RedisConnectionError):
+        breaker.call_sync(_fail)
+
+    async def slow():
+        await anyio.sleep(1)
+
+    with anyio.move_on_after(0.01):
+        await breaker.call(slow)
+    assert breaker.state == HALF_OPEN
+    assert breaker.call_sync(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_local_cache_expires_and_evicts(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("src.utils.local_cache.time.monotonic", lambda: clock[0])
+    cache = LocalCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    clock[0] = 10
+    assert cache.get("a") is None
+    assert cache.pop("c") == 3
+
+
+class _DownPipeline:
+    def get(self, key):
+        pass
+
+    def ttl(self, key):
+        pass
+
+    async def execute(self):
+        raise RedisConnectionError("down")
+
+
+class _DownRedis:
+    def pipeline(self, transaction=True):
+        return _DownPipeline()
+
+    async def exists(self, key):
+        await anyio.sleep(10)
+
+
+@pytest.mark.anyio
+async def test_current_user_falls_back_to_database_while_redis_is_down(monkeypatch):
+    db = SessionLocal()
+    user = models.User(email=f"{uuid.uuid4().hex[:8]}@test.com", hashed_password="x", role="user")
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+
+    breaker = CircuitBreaker("redis", failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(redis_pool, "_redis_breaker", breaker)
+    monkeypatch.setattr(auth, "_local_users", LocalCache())
+    monkeypatch.setattr(redis_pool, "_redis", _DownRedis())
+    monkeypatch.setattr(settings, "REDIS_CALL_TIMEOUT", 0.01)
+    # The worker started while Redis was down, so revocations are looked up in Redis.
+    monkeypatch.setattr(revocations, "loaded", False)
+    try:
+        # The hanging revocation lookup times out and opens the breaker.
+        current = await auth.get_current_user(token=token, db=db)
+        assert current["id"] == user.id
+        assert breaker.state == OPEN
+        assert auth._local_users.get(user.id) == current
+
+        # While open, the user comes from the in-process cache without trying Redis.
+        db.delete(user)
+        db.commit()
+        assert await auth.get_current_user(token=token, db=db) == current
+        assert breaker.metrics()["rejected"] == 3
+    finally:
+        db.close()
@@ -1,5 +1,5 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert
 from sqlalchemy.orm import sessionmaker
 from fastapi import HTTPException
 from datetime import date, timedelta
@@ -121,6 +121,10 @@ def test_search_contacts(db):
     assert len(results) == 1
     assert results[0].first_name == "Alice"
 
+    rows = crud.search_contacts(db, owner_id=user.id, fields=("first_name", "id"))
+    assert [tuple(row._mapping) for row in rows] == [("first_name", "id")] * 2
+    assert {row.first_name for row in rows} == {"Alice", "Bob"}
+
 def test_get_upcoming_birthdays(db):
     user_in = schemas.UserCreate(email="j@test.com", password="pass123", full_name="Birthday Owner")
     user = crud.create_user(db, user_in)
@@ -134,3 +138,59 @@ def test_get_upcoming_birthdays(db):
     
     results = crud.get_upcoming_birthdays(db, days=2)
     assert any(c.email == "bday@test.com" for c in results)
+
+def test_contact_counter_follows_create_and_delete(db):
+    user = crud.create_user(db, schemas.UserCreate(email="k@test.com", password="pass123", full_name="Counter Owner"))
+    contacts = [
+        crud.create_contact(db, schemas.ContactCreate(
+            first_name=f"Count{i}", last_name="Er", email=f"count{i}@test.com", phone=str(i), birthday=date(1990, 1, 1)
+        ), owner_id=user.id)
+        for i in range(3)
+    ]
+    assert crud.count_contacts(db, owner_id=user.id) == (3, True)
+
+    crud.delete_contact(db, contacts[0].id, owner_id=user.id)
+    assert crud.count_contacts(db, owner_id=user.id) == (2, True)
+    assert crud.count_contacts(db, owner_id=user.id, q="Count1") == (1, True)
+    assert crud.count_contacts(db, owner_id=user.id, q="Count", cap=1) == (1, False)
+
+def test_reconcile_contact_counts(db):
+    user = crud.create_user(db, schemas.UserCreate(email="l@test.com", password="pass123", full_name="Drift Owner"))
+    crud.create_contact(db, schemas.ContactCreate(
+        first_name="Drift", last_name="Er", email="drift@test.com", phone="1", birthday=date(1990, 1, 1)
+    ), owner_id=user.id)
+    db.get(models.ContactCounter, user.id).count = 7
+    db.commit()
+
+    fixed = crud.reconcile_contact_counts(db)
+    assert fixed[user.id] == (7, 1)
+    assert crud.count_contacts(db, owner_id=user.id) == (1, True)
+
+def test_contact_counter_created_by_a_concurrent_write(db, monkeypatch):
+    user = crud.create_user(db, schemas.UserCreate(email="race@test.com", password="pass123", full_name="Race Owner"))
+    begin_nested = db.begin_nested
+
+    def create_counter_first():
+        # Another transaction inserts the missing counter just before this one does.
+        db.connection().execute(insert(models.ContactCounter).values(owner_id=user.id, count=5))
+        return begin_nested()
+
+    monkeypatch.setattr(db, "begin_nested", create_counter_first)
+    crud.create_contact(db, schemas.ContactCreate(
+        first_name="Race", last_name="Er", email="race@test.com", phone="1", birthday=date(1990, 1, 1)
+    ), owner_id=user.id)
+    assert db.get(models.ContactCounter, user.id).count == 6
+
+def test_get_contacts_by_phone(db):
+    user = crud.create_user(db, schemas.UserCreate(email="m@test.com", password="pass123", full_name="Phone Owner"))
+    contact = crud.create_contact(db, schemas.ContactCreate(
+        first_name="Caller", last_name="Id", email="caller@test.com", phone="067 123 45 67", birthday=date(1990, 1, 1)
+    ), owner_id=user.id)
+    assert contact.phone_normalized == "+380671234567"
+
+    assert [c.id for c in crud.get_contacts_by_phone(db, "+380 (67) 123-45-67", owner_id=user.id)] == [contact.id]
+    assert crud.get_contacts_by_phone(db, "not a phone", owner_id=user.id) == []
+
+    crud.update_contact(db, contact.id, schemas.ContactUpdate(phone="+1 202 555 0143"), owner_id=user.id)
+    assert crud.get_contacts_by_phone(db, "0671234567", owner_id=user.id) == []
+    assert len(crud.get_contacts_by_phone(db, "+12025550143", owner_id=user.id)) == 1
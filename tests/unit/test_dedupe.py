@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from src import dedupe
+
+
+def _contact(id, first, last, email, phone):
+    return dedupe.candidate(SimpleNamespace(id=id, first_name=first, last_name=last, email=email, phone=phone))
+
+
+def test_normalizers():
+    assert dedupe.normalize_email(" John.Doe+work@Mail.COM ") == "john.doe@mail.com"
+    assert dedupe.normalize_phone("+380 (67) 123-45-67") == dedupe.normalize_phone("067 123 45 67")
+    assert dedupe.normalize_phone("12") == ""
+    assert dedupe.normalize_name("Zoë", "Smith") == dedupe.normalize_name("smith", "zoe")
+
+
+def test_find_duplicates_clusters_matching_contacts():
+    contacts = [
+        _contact(1, "John", "Doe", "john@x.com", "+380671234567"),
+        _contact(2, "Doe", "John", "john+home@x.com", "067 123 45 67"),
+        _contact(3, "John", "Doe", "jd@y.com", "0671234567"),
+        _contact(6, "Johnny", "Doe", "jd2@y.com", "0671234567"),
+        _contact(4, "John", "Doe", "other@z.com", "555 000 111"),
+        _contact(5, "Jane", "Roe", "jane@x.com", "0509998877"),
+    ]
+    clusters = list(dedupe.find_duplicates(contacts))
+    assert len(clusters) == 1
+    assert clusters[0]["contact_ids"] == [1, 2, 3]
+    assert [1, 2, 1.0] in clusters[0]["pairs"]
+
+
+def test_find_duplicates_scales_with_large_blocks():
+    contacts = [_contact(i, "John", "Smith", f"john{i}@x.com", f"050{i:07d}") for i in range(5000)]
+    assert list(dedupe.find_duplicates(contacts, window=10)) == []
+
+
+def test_find_duplicates_yields_clusters_before_scoring_everything(monkeypatch):
+    contacts = [
+        _contact(1, "John", "Doe", "john@x.com", "0671234567"),
+        _contact(2, "John", "Doe", "john@x.com", "0671234567"),
+    ] + [_contact(i, f"Name{i}", "Roe", f"roe{i}@y.com", "0501234567") for i in range(3, 30)]
+    scored = []
+
+    def fake_score(a, b):
+        scored.append((a.id, b.id))
+        return 1.0 if a.id < 3 else 0.0
+
+    monkeypatch.setattr(dedupe, "score", fake_score)
+    clusters = dedupe.find_duplicates(contacts)
+    assert next(clusters)["contact_ids"] == [1, 2]
+    scored_before_first = len(scored)
+    assert list(clusters) == []
+    assert len(scored) > scored_before_first
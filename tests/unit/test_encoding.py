@@ -0,0 +1,17 @@
+import pytest
+
+from src import encoding
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, encoding.JSON),
+    ("*/*", encoding.JSON),
+    ("application/msgpack", encoding.MSGPACK),
+    ("application/x-msgpack", encoding.MSGPACK),
+    ("application/cbor, application/json;q=0.5", encoding.CBOR),
+    ("application/json, application/msgpack", encoding.JSON),
+    ("application/msgpack;q=0.2, application/json;q=0.9", encoding.JSON),
+    ("application/xml", encoding.JSON),
+])
+def test_negotiate(accept, expected):
+    assert encoding.negotiate(accept) == expected
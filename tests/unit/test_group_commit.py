@@ -0,0 +1,107 @@
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models, schemas
+from src.db import Base
+from src.group_commit import WriteCoalescer
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/group_commit.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    db.add(models.User(id=1, email="owner@test.com", hashed_password="x"))
+    db.commit()
+    db.close()
+    return factory
+
+
+def _contact(email):
+    return schemas.ContactCreate(first_name="A", last_name="B", email=email, phone="1", birthday=date(1990, 1, 1))
+
+
+def test_concurrent_writes_share_commits_and_keep_their_errors(session_factory):
+    commits = []
+    event.listen(session_factory.kw["bind"], "commit", lambda conn: commits.append(1))
+    coalescer = WriteCoalescer(session_factory, window=0.2, max_batch=64)
+    emails = [f"c{n}@test.com" for n in range(8)] + ["c0@test.com"]
+    results = {}
+    barrier = threading.Barrier(len(emails))
+
+    def write(n, email):
+        barrier.wait()
+        try:
+            results[n] = coalescer.submit(1, lambda db: crud.stage_create_contact(db, _contact(email), 1))
+        except Exception as exc:
+            results[n] = exc
+
+    threads = [threading.Thread(target=write, args=(n, email)) for n, email in enumerate(emails)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    coalescer.close()
+
+    failures = [result for result in results.values() if isinstance(result, Exception)]
+    created = [result for result in results.values() if isinstance(result, models.Contact)]
+    assert len(failures) == 1 and isinstance(failures[0], IntegrityError)
+    assert sorted(contact.email for contact in created) == sorted(set(emails))
+    assert all(contact.id is not None for contact in created)
+    assert len(commits) < len(emails)
+
+    db = session_factory()
+    assert db.execute(select(func.count(models.Contact.id))).scalar_one() == 8
+    assert db.get(models.ContactCounter, 1).count == 8
+    db.close()
+
+
+def test_update_through_coalescer(session_factory):
+    coalescer = WriteCoalescer(session_factory, window=0.001, max_batch=8)
+    created = coalescer.submit(1, lambda db: crud.stage_create_contact(db, _contact("u@test.com"), 1))
+    updated, _ = coalescer.submit(
+        1, lambda db: crud.stage_update_contact(db, created.id, schemas.ContactUpdate(first_name="Z"), 1)
+    )
+    assert coalescer.submit(1, lambda db: crud.stage_update_contact(db, 999, schemas.ContactUpdate(), 1)) is None
+    coalescer.close()
+    assert updated.first_name == "Z"
+
+
+def test_dead_background_thread_is_restarted(session_factory):
+    coalescer = WriteCoalescer(session_factory, window=0.001, max_batch=8)
+    coalescer.submit(1, lambda db: crud.stage_create_contact(db, _contact("before@test.com"), 1))
+    # The thread is gone while still recorded, as in a worker forked after it started.
+    coalescer._queue.put(None)
+    coalescer._thread.join()
+
+    created = coalescer.submit(1, lambda db: crud.stage_create_contact(db, _contact("after@test.com"), 1))
+    coalescer.close()
+    assert created.email == "after@test.com"
+
+
+def test_stalled_batch_falls_back_to_a_direct_commit(session_factory):
+    coalescer = WriteCoalescer(session_factory, window=0.001, max_batch=8, timeout=0.05)
+    release = threading.Event()
+    # A live thread that never reads the queue.
+    coalescer._thread = threading.Thread(target=release.wait, daemon=True)
+    coalescer._thread.start()
+    try:
+        created = coalescer.submit(1, lambda db: crud.stage_create_contact(db, _contact("stalled@test.com"), 1))
+    finally:
+        release.set()
+        coalescer._thread.join()
+    assert created.id is not None
+
+    # The abandoned job is skipped once a batch thread runs again.
+    coalescer.close()
+    coalescer.submit(1, lambda db: crud.stage_create_contact(db, _contact("next@test.com"), 1))
+    coalescer.close()
+    db = session_factory()
+    assert db.execute(select(func.count(models.Contact.id))).scalar_one() == 2
+    db.close()
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src import idempotency
+from src.settings import settings
+from src.utils import redis_pool
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_pool, "_sync_redis", fake)
+    return fake
+
+
+def test_retry_is_replayed_without_running_again(redis):
+    calls = []
+    action = lambda: calls.append(1) or {"id": len(calls)}
+    body = idempotency.fingerprint({"email": "a@test.com"})
+
+    assert idempotency.execute("s", "k", body, action) == ({"id": 1}, False)
+    assert idempotency.execute("s", "k", body, action) == ({"id": 1}, True)
+    assert idempotency.execute("s", "other", body, action) == ({"id": 2}, False)
+    assert len(calls) == 2
+    assert 0 < redis.ttl("idempotency:s:k") <= settings.IDEMPOTENCY_TTL
+    assert not redis.exists("idempotency:s:k:lock")
+
+    with pytest.raises(idempotency.KeyReused):
+        idempotency.execute("s", "k", idempotency.fingerprint({"email": "b@test.com"}), action)
+
+
+def test_concurrent_retry_waits_for_the_first_request(redis):
+    started = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"id": 1}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(idempotency.execute("s", "k", "f", slow)))
+    first.start()
+    started.wait()
+    results.append(idempotency.execute("s", "k", "f", slow))
+    first.join()
+
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+
+
+def test_lock_timeout_and_failed_action(redis, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_TIMEOUT", 0.1)
+    redis.set("idempotency:s:k:lock", "f")
+    with pytest.raises(idempotency.RequestInProgress):
+        idempotency.execute("s", "k", "f", lambda: {"id": 1})
+    redis.delete("idempotency:s:k:lock")
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        idempotency.execute("s", "k", "f", fail)
+    assert not redis.exists("idempotency:s:k:lock")
+    assert idempotency.execute("s", "k", "f", lambda: {"id": 2}) == ({"id": 2}, False)
+
+
+def test_lock_is_extended_and_only_released_by_its_holder(redis, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_TTL", 1)
+
+    def slow():
+        time.sleep(1.5)
+        assert redis.exists("idempotency:s:k:lock")
+        # The lock expired anyway and a retry took it over.
+        redis.set("idempotency:s:k:lock", "other", ex=10)
+        return {"id": 1}
+
+    assert idempotency.execute("s", "k", "f", slow) == ({"id": 1}, False)
+    assert redis.get("idempotency:s:k:lock") == "other"
+    assert redis.exists("idempotency:s:k")
+
+
+def test_redis_down_runs_the_action(monkeypatch):
+    class Down:
+        def get(self, *args, **kwargs):
+            raise RedisConnectionError("down")
+
+    monkeypatch.setattr(redis_pool, "_sync_redis", Down())
+    assert idempotency.execute("s", "k", "f", lambda: {"id": 1}) == ({"id": 1}, False)
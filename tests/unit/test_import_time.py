@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+LAZY_MODULES = ("cloudinary", "passlib", "jose", "redis", "itsdangerous")
+
+SCRIPT = (
+    "import src.main, sys; from src.settings import get_settings; "
+    "print(get_settings.cache_info().currsize, ' '.join(sys.modules))"
+)
+
+
+def _import_main(*args):
+    return subprocess.run(
+        [sys.executable, *args, "-c", SCRIPT],
+        capture_output=True, text=True, check=True,
+    )
+
+
+def _cumulative_us(stderr: str, module: str) -> int:
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and line.rsplit("|", 1)[-1].strip() == module:
+            return int(line.split("|")[1])
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def test_heavy_dependencies_are_not_imported_by_main():
+    settings_created, *loaded = _import_main().stdout.split()
+    assert settings_created == "0"
+    assert not set(loaded).intersection(LAZY_MODULES)
+
+
+def test_import_time_budget():
+    best = min(_cumulative_us(_import_main("-X", "importtime").stderr, "src.main") for _ in range(3))
+    assert best / 1000 <= IMPORT_TIME_BUDGET_MS, f"src.main took {best / 1000:.0f} ms to import"
@@ -0,0 +1,24 @@
+import time
+
+from src.profiling import Sampler
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_exports_busy_stacks_to_speedscope():
+    sampler = Sampler(interval=0.001)
+    sampler.start()
+    _spin(0.1)
+    sampler.stop()
+
+    document = sampler.to_speedscope("GET /test")
+    names = {frame["name"] for frame in document["shared"]["frames"]}
+    assert "_spin" in names
+    profile = next(p for p in document["profiles"] if p["name"] == "MainThread")
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert profile["endValue"] > 0
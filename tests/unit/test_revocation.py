@@ -0,0 +1,152 @@
+import time
+import uuid
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src import models, revocation
+from src.db import SessionLocal
+from src.dependencies.auth import get_current_user
+from src.dependencies.roles import admin_required
+from src.revocation import BloomFilter, RevocationList, TokenVersions, token_versions
+from src.security import authorization_claims, create_access_token
+from src.utils import redis_pool
+from src.utils.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_pool, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_pool, "_sync_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(token_versions, "versions", {})
+    return server
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.anyio
+async def test_revoke_and_check(fake_redis):
+    revocations = RevocationList()
+    assert not revocations.is_revoked("abc")
+
+    await revocations.revoke("abc", time.time() + 60)
+    assert revocations.is_revoked("abc")
+    assert await revocations.is_revoked_async("abc")
+    assert not revocations.is_revoked("def")
+
+    other_worker = RevocationList()
+    # Before its first load a worker confirms every jti with Redis.
+    assert other_worker.might_be_revoked("def")
+    assert not other_worker.is_revoked("def")
+    assert other_worker.is_revoked("abc")
+    await other_worker.reload()
+    assert not other_worker.might_be_revoked("def")
+    assert other_worker.is_revoked("abc")
+
+
+class _RedisDown:
+    def exists(self, key):
+        raise RedisConnectionError("down")
+
+
+class _AsyncRedisDown:
+    async def exists(self, key):
+        raise RedisConnectionError("down")
+
+
+@pytest.fixture
+def redis_down(monkeypatch):
+    monkeypatch.setattr(redis_pool, "_sync_redis", _RedisDown())
+    monkeypatch.setattr(redis_pool, "_redis", _AsyncRedisDown())
+    monkeypatch.setattr(redis_pool, "_redis_breaker", CircuitBreaker("redis"))
+    monkeypatch.setattr(token_versions, "versions", {})
+
+
+@pytest.mark.anyio
+async def test_bloom_hits_fail_closed_without_redis(redis_down):
+    revocations = RevocationList()
+    revocations.bloom.add("abc")
+    revocations.loaded = True
+    assert revocations.is_revoked("abc")
+    assert await revocations.is_revoked_async("abc")
+    assert not revocations.is_revoked("def")
+
+
+@pytest.mark.anyio
+async def test_redis_down_at_startup_relies_on_token_versions(redis_down, monkeypatch):
+    monkeypatch.setattr(revocation.revocations, "loaded", False)
+    assert not revocation.revocations.is_revoked("abc")
+
+    user = SimpleNamespace(id=8, email="startup@test.com", role="user", is_verified=True, is_active=True, token_version=1)
+    token = create_access_token({"sub": str(user.id), **authorization_claims(user, embed=True)})
+    assert (await get_current_user(token=token, db=None))["id"] == user.id
+
+    token_versions.update(user.id, 2)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(token=token, db=None)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_expired_tokens_are_not_stored(fake_redis):
+    revocations = RevocationList()
+    await revocations.revoke("old", time.time() - 1)
+    assert not revocations.is_revoked("old")
+
+
+def test_token_versions_invalidate_older_tokens(fake_redis):
+    versions = TokenVersions()
+    assert versions.is_current(1, 0)
+
+    versions.publish(1, 2)
+    assert not versions.is_current(1, 1)
+    assert versions.is_current(1, 2)
+    assert versions.is_current(2, 0)
+
+
+@pytest.mark.anyio
+async def test_embedded_claims_authorize_without_lookup(fake_redis):
+    user = SimpleNamespace(id=7, email="claims@test.com", role="admin", is_verified=True, is_active=True, token_version=3)
+    token = create_access_token({"sub": str(user.id), **authorization_claims(user, embed=True)})
+
+    current = await get_current_user(token=token, db=None)
+    assert current["role"] == "admin"
+    assert await admin_required(current) == current
+
+    token_versions.publish(user.id, 4)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(token=token, db=None)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_loaded_user_row_rejects_outdated_tokens(fake_redis):
+    db = SessionLocal()
+    user = models.User(email=f"{uuid.uuid4().hex[:8]}@test.com", hashed_password="x", token_version=0)
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id), **authorization_claims(user, embed=False)})
+    try:
+        # Bumped without a broadcast, as when Redis was down.
+        user.token_version = 1
+        db.commit()
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token=token, db=db)
+        assert exc_info.value.status_code == 401
+        assert not token_versions.is_current(user.id, 0)
+    finally:
+        db.delete(user)
+        db.commit()
+        db.close()
@@ -0,0 +1,26 @@
+from src import serve
+from src.settings import settings
+
+
+def test_worker_count_from_cores(monkeypatch):
+    monkeypatch.setattr(settings, "WEB_WORKERS", 0)
+    monkeypatch.setattr(settings, "WEB_WORKERS_PER_CORE", 2.0)
+    monkeypatch.setattr(settings, "WEB_MAX_WORKERS", 0)
+    assert serve.worker_count(cores=4) == 8
+
+    monkeypatch.setattr(settings, "WEB_MAX_WORKERS", 6)
+    assert serve.worker_count(cores=4) == 6
+
+
+def test_worker_count_explicit(monkeypatch):
+    monkeypatch.setattr(settings, "WEB_WORKERS", 3)
+    assert serve.worker_count(cores=64) == 3
+
+
+def test_server_options_load_into_gunicorn_config():
+    server = serve.Server()
+    assert server.cfg.worker_class_str == "src.serve.ServerWorker"
+    assert server.cfg.keepalive == settings.WEB_KEEPALIVE
+    assert server.cfg.backlog == settings.WEB_BACKLOG
+    assert server.cfg.graceful_timeout == settings.WEB_GRACEFUL_TIMEOUT
+    assert server.cfg.workers == serve.worker_count()
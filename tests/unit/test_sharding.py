@@ -0,0 +1,139 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models, schemas
+from src.db import Base
+from src.sharding import (
+    IdAllocator, ShardMap, ShardRoutingSession, assign_ids, create_shard_schema, each_shard,
+    parse_shard_urls, rebalance,
+)
+
+
+@pytest.fixture
+def shards(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    Base.metadata.create_all(bind=primary)
+    shard_map = ShardMap({name: f"sqlite:///{tmp_path / name}.db" for name in ("s0", "s1", "s2")})
+    for engine in shard_map.engines.values():
+        create_shard_schema(engine)
+
+    Session = sessionmaker(bind=primary, class_=ShardRoutingSession, info={"shard_map": shard_map})
+    allocator = IdAllocator(block_size=10, shards=shard_map.engines.values())
+    event.listen(Session, "before_flush", lambda session, ctx, inst: assign_ids(session, allocator))
+    return primary, shard_map, Session
+
+
+def _contact(i):
+    return schemas.ContactCreate(
+        first_name=f"Name{i}", last_name="Shard", email=f"c{i}@test.com", phone=str(i),
+        birthday=date.today().replace(year=2000),
+    )
+
+
+def test_parse_shard_urls():
+    assert parse_shard_urls("a=sqlite:///a.db, sqlite:///b.db") == {
+        "a": "sqlite:///a.db", "shard1": "sqlite:///b.db",
+    }
+
+
+def test_shard_map_is_stable_when_adding_a_shard():
+    old = ShardMap({"s0": "sqlite://", "s1": "sqlite://"})
+    new = ShardMap({"s0": "sqlite://", "s1": "sqlite://", "s2": "sqlite://"})
+    moved = [o for o in range(1000) if old.shard_for(o) != new.shard_for(o)]
+    assert all(new.shard_for(o) == "s2" for o in moved)
+    assert len(moved) < 500
+
+
+def test_id_allocator_survives_a_concurrent_first_reservation(tmp_path):
+    url = f"sqlite:///{tmp_path / 'ids.db'}"
+    engine, other_engine = create_engine(url), create_engine(url)
+    models.ContactIdBlock.__table__.create(engine)
+    other_ids = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def reserve_elsewhere_first(conn, cursor, statement, parameters, context, executemany):
+        # Another process creates the counter row between this one's lookup and insert.
+        if statement.startswith("INSERT INTO contact_id_blocks") and not other_ids:
+            other_ids.append(IdAllocator(block_size=10).next_id(other_engine))
+
+    assert IdAllocator(block_size=10).next_id(engine) == 11
+    assert other_ids == [1]
+
+
+def test_contacts_are_stored_on_owner_shard(shards):
+    primary, shard_map, Session = shards
+    db = Session()
+    owners = [crud.create_user(db, schemas.UserCreate(email=f"o{i}@test.com", password="x", full_name=None)) for i in range(6)]
+    for i, owner in enumerate(owners):
+        crud.create_contact(db, _contact(i), owner_id=owner.id)
+
+    for owner in owners:
+        engine = shard_map.engine_for(owner.id)
+        with engine.connect() as conn:
+            rows = conn.execute(select(models.Contact.__table__).where(models.Contact.owner_id == owner.id)).all()
+        assert len(rows) == 1
+        assert len(crud.search_contacts(db, owner_id=owner.id)) == 1
+    assert len({c.id for o in owners for c in crud.search_contacts(db, owner_id=o.id)}) == 6
+    # Counters are keyed by owner and must not draw from the id allocator.
+    assert sorted(c.id for o in owners for c in crud.search_contacts(db, owner_id=o.id)) == list(range(1, 7))
+    assert len(crud.get_upcoming_birthdays(db, days=0)) == 6
+    db.close()
+
+
+def test_upcoming_birthdays_stay_on_the_pinned_shard(shards):
+    primary, shard_map, Session = shards
+    db = Session()
+    for i in range(6):
+        owner = crud.create_user(db, schemas.UserCreate(email=f"b{i}@test.com", password="x", full_name=None))
+        crud.create_contact(db, _contact(50 + i), owner_id=owner.id)
+
+    seen = []
+    with each_shard(db) as names:
+        for name in names:
+            found = crud.get_upcoming_birthdays(db, days=0)
+            assert db.info["shard"] == name
+            assert all(shard_map.shard_for(c.owner_id) == name for c in found)
+            seen += [c.id for c in found]
+    assert len(seen) == len(set(seen)) == 6
+    db.close()
+
+
+def test_rebalance_moves_owner_rows(shards, tmp_path):
+    primary, shard_map, Session = shards
+    db = Session()
+    owner_ids = []
+    for i in range(20):
+        owner = crud.create_user(db, schemas.UserCreate(email=f"r{i}@test.com", password="x", full_name=None))
+        crud.create_contact(db, _contact(100 + i), owner_id=owner.id)
+        owner_ids.append(owner.id)
+    db.close()
+
+    urls = dict(shard_map.urls, s3=f"sqlite:///{tmp_path / 's3'}.db")
+    new_map = ShardMap(urls)
+    moves = rebalance(shard_map, new_map, primary)
+    assert moves
+    assert all(target == "s3" for _, _, target in moves)
+
+    db = Session(info={"shard_map": new_map})
+    for owner_id in owner_ids:
+        assert len(crud.search_contacts(db, owner_id=owner_id)) == 1
+    db.close()
+
+
+def test_rebalance_from_primary_does_not_reuse_contact_ids(shards, tmp_path):
+    primary, shard_map, Session = shards
+    db = sessionmaker(bind=primary)()
+    owner_id = crud.create_user(db, schemas.UserCreate(email="legacy@test.com", password="x", full_name=None)).id
+    legacy_ids = {crud.create_contact(db, _contact(200 + i), owner_id=owner_id).id for i in range(3)}
+    db.close()
+
+    rebalance(ShardMap({"primary": str(primary.url)}), shard_map, primary)
+
+    db = Session()
+    contact = crud.create_contact(db, _contact(300), owner_id=owner_id)
+    assert contact.id not in legacy_ids
+    assert len(crud.search_contacts(db, owner_id=owner_id)) == 4
+    db.close()
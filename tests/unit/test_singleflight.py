@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import models
+from src.singleflight import SingleFlight, shared
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def query():
+        calls.append(1)
+        release.wait()
+        return ["row"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", query))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [["row"]] * 5
+    assert all(result is results[0] for result in results)
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+    with pytest.raises(RuntimeError):
+        flight.do("key", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert flight.do("key", lambda: 1) == 1
+
+
+def test_shared_keys_on_arguments_after_the_session():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    @shared
+    def lookup(db, user_id, fields=None):
+        calls.append((db, user_id))
+        started.set()
+        release.wait()
+        return user_id
+
+    leader = threading.Thread(target=lookup, args=("session-1", 7))
+    leader.start()
+    started.wait()
+    results = []
+    followers = [
+        threading.Thread(target=lambda: results.append(lookup("session-2", 7))),
+        threading.Thread(target=lambda: results.append(lookup("session-3", 8))),
+    ]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    leader.join()
+    for thread in followers:
+        thread.join()
+
+    assert sorted(results) == [7, 8]
+    assert sorted(calls) == [("session-1", 7), ("session-3", 8)]
+
+
+def test_shared_followers_get_instances_of_their_own_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'flight.db'}", connect_args={"check_same_thread": False})
+    models.User.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(models.User(id=1, email="flight@test.com", hashed_password="x"))
+        db.commit()
+    started = threading.Event()
+    release = threading.Event()
+
+    @shared
+    def lookup(db, user_id):
+        started.set()
+        release.wait()
+        return [db.get(models.User, user_id)]
+
+    leader_db, follower_db = Session(), Session()
+    results = {}
+    leader = threading.Thread(target=lambda: results.update(leader=lookup(leader_db, 1)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=lambda: results.update(follower=lookup(follower_db, 1)))
+    follower.start()
+    time.sleep(0.1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    [mine], [theirs] = results["leader"], results["follower"]
+    assert mine in leader_db and theirs in follower_db
+    assert theirs is not mine and theirs.email == mine.email
+
+    # The follower's copy is a regular instance of its session.
+    theirs.full_name = "Follower"
+    follower_db.commit()
+    leader_db.refresh(mine)
+    assert mine.full_name == "Follower"
+    leader_db.close()
+    follower_db.close()
@@ -0,0 +1,125 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models, schemas, sync
+from src.db import Base
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def owner(db):
+    user = models.User(email=f"sync{datetime.utcnow().timestamp()}@test.com", hashed_password="hash")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _contact(owner, n):
+    return schemas.ContactCreate(
+        first_name=f"Name{n}", last_name="Sync", email=f"sync{owner.id}-{n}@test.com",
+        phone="123456", birthday=date(1990, 1, 1),
+    )
+
+
+def test_full_sync_pages_in_keyset_order(db, owner):
+    created = [crud.create_contact(db, _contact(owner, n), owner_id=owner.id) for n in range(5)]
+
+    changed, deleted, cursor, has_more = sync.changes_since(db, owner.id, limit=3)
+    assert [c.id for c in changed] == [c.id for c in created[:3]]
+    assert deleted == [] and has_more
+
+    changed, deleted, cursor, has_more = sync.changes_since(db, owner.id, cursor, limit=3)
+    assert [c.id for c in changed] == [c.id for c in created[3:]]
+    assert not has_more
+
+
+def test_delta_sync_returns_updates_and_deletions(db, owner):
+    first, second, third = (crud.create_contact(db, _contact(owner, n), owner_id=owner.id) for n in range(3))
+    token = sync.encode_token(sync.changes_since(db, owner.id)[2])
+
+    crud.update_contact(db, first.id, schemas.ContactUpdate(first_name="Renamed"), owner_id=owner.id)
+    crud.delete_contact(db, second.id, owner_id=owner.id)
+
+    cursor = sync.decode_token(token, timedelta(days=1))
+    changed, deleted, cursor, has_more = sync.changes_since(db, owner.id, cursor)
+    assert [c.first_name for c in changed] == ["Renamed"]
+    assert deleted == [second.id]
+
+    changed, deleted, _, _ = sync.changes_since(db, owner.id, cursor)
+    assert changed == [] and deleted == []
+
+
+def test_decode_token_rejects_bad_and_expired_tokens():
+    with pytest.raises(sync.SyncTokenError):
+        sync.decode_token("not-a-token", timedelta(days=1))
+
+    old = datetime.utcnow() - timedelta(days=2)
+    token = sync.encode_token(sync.SyncCursor(old, 1, old, 1, old))
+    with pytest.raises(sync.SyncTokenExpired):
+        sync.decode_token(token, timedelta(days=1))
+
+
+def test_purge_tombstones(db, owner):
+    contact = crud.create_contact(db, _contact(owner, 0), owner_id=owner.id)
+    crud.delete_contact(db, contact.id, owner_id=owner.id)
+    assert sync.purge_tombstones(db, timedelta(days=1)) == 0
+    assert sync.purge_tombstones(db, timedelta(days=-1)) >= 1
+    assert db.get(models.ContactTombstone, contact.id) is None
+
+
+def test_lagging_cursor_picks_up_late_commits(db, owner):
+    early = TestingSessionLocal()
+    try:
+        # Stamped first, like a row flushed in a transaction that commits late.
+        late = models.Contact(**_contact(owner, 0).dict(), owner_id=owner.id, updated_at=datetime.utcnow())
+        crud.create_contact(db, _contact(owner, 1), owner_id=owner.id)
+
+        changed, _, cursor, _ = sync.changes_since(db, owner.id, lag=timedelta(seconds=30))
+        assert [c.email for c in changed] == [_contact(owner, 1).email]
+
+        early.add(late)
+        early.commit()
+    finally:
+        early.close()
+
+    changed, _, _, _ = sync.changes_since(db, owner.id, cursor, lag=timedelta(seconds=30))
+    assert _contact(owner, 0).email in [c.email for c in changed]
+
+
+def test_lag_holds_back_contacts_while_deletions_fill_the_page(db, owner):
+    cursor = sync.changes_since(db, owner.id)[2]
+    for contact in [crud.create_contact(db, _contact(owner, 10 + n), owner_id=owner.id) for n in range(3)]:
+        crud.delete_contact(db, contact.id, owner_id=owner.id)
+
+    early = TestingSessionLocal()
+    try:
+        late = models.Contact(**_contact(owner, 0).dict(), owner_id=owner.id, updated_at=datetime.utcnow())
+        crud.create_contact(db, _contact(owner, 1), owner_id=owner.id)
+
+        changed, deleted, cursor, has_more = sync.changes_since(db, owner.id, cursor, limit=2, lag=timedelta(seconds=30))
+        assert [c.email for c in changed] == [_contact(owner, 1).email]
+        assert len(deleted) == 2 and has_more
+
+        early.add(late)
+        early.commit()
+    finally:
+        early.close()
+
+    changed, deleted, _, _ = sync.changes_since(db, owner.id, cursor, limit=2, lag=timedelta(seconds=30))
+    assert _contact(owner, 0).email in [c.email for c in changed]
+    assert len(deleted) == 1
@@ -0,0 +1,91 @@
+import json
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import create_engine, text
+
+from src import tracing
+from src.settings import settings
+
+
+def _app():
+    engine = create_engine("sqlite://")
+    redis = tracing.instrument_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        await redis.set("key", "value")
+        with tracing.span("work"):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    app.add_middleware(tracing.TracingMiddleware)
+    return app
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACE_EXPORT_PATH", str(path))
+    monkeypatch.setattr(settings, "TRACE_EXPORT_URL", None)
+    tracing.start()
+    yield lambda: (tracing.stop(), [json.loads(line) for line in path.read_text().splitlines()])[1]
+    tracing.stop()
+
+
+def _spans(request):
+    return request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+     ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)),
+    ("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00",
+     ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", False)),
+    ("00-00000000000000000000000000000000-00f067aa0ba902b7-01", None),
+    ("garbage", None),
+    (None, None),
+])
+def test_parse_traceparent(value, expected):
+    assert tracing.parse_traceparent(value) == expected
+
+
+@pytest.mark.anyio
+async def test_sampled_request_exports_nested_spans(exported, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 1.0)
+    async with AsyncClient(app=_app(), base_url="http://test") as ac:
+        resp = await ac.get("/items/1")
+
+    trace_id = resp.headers["x-trace-id"]
+    assert resp.headers["traceparent"].startswith(f"00-{trace_id}-")
+    assert resp.headers["traceparent"].endswith("-01")
+
+    [request] = exported()
+    spans = {span["name"]: span for span in _spans(request)}
+    root = spans["GET /items/{item_id}"]
+    assert {span["traceId"] for span in spans.values()} == {trace_id}
+    assert "parentSpanId" not in root
+    assert spans["redis SET"]["parentSpanId"] == root["spanId"]
+    assert spans["work"]["parentSpanId"] == root["spanId"]
+    assert spans["db SELECT"]["parentSpanId"] == spans["work"]["spanId"]
+
+
+@pytest.mark.anyio
+async def test_incoming_traceparent_is_continued(exported, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    parent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7"
+    async with AsyncClient(app=_app(), base_url="http://test") as ac:
+        unsampled = await ac.get("/items/1", headers={"traceparent": f"{parent}-00"})
+        sampled = await ac.get("/items/2", headers={"traceparent": f"{parent}-01"})
+
+    assert unsampled.headers["x-trace-id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert unsampled.headers["traceparent"].endswith("-00")
+    [request] = exported()
+    root = next(span for span in _spans(request) if span["kind"] == tracing.SERVER)
+    assert root["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert root["parentSpanId"] == "00f067aa0ba902b7"
+    assert sampled.headers["traceparent"] == f"00-{root['traceId']}-{root['spanId']}-01"